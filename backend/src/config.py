@@ -180,6 +180,15 @@ class AIConfig:
 # Initialize AI configuration
 ai_config = AIConfig()
 
+# Default cap on in-flight requests per provider; a provider's "max_concurrency" overrides it
+AI_MAX_CONCURRENT_REQUESTS = int(os.getenv("AI_MAX_CONCURRENT_REQUESTS", "3"))
+# Requests per second allowed per provider (a provider's "rps" overrides it; 0 disables)
+AI_RPS = float(os.getenv("AI_RPS", "2"))
+# Retries for rate-limited, 5xx, timed out or unreachable provider calls
+AI_MAX_RETRIES = int(os.getenv("AI_MAX_RETRIES", "3"))
+AI_RETRY_BACKOFF_MIN = 1.0
+AI_RETRY_BACKOFF_MAX = 30.0
+
 # File settings
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
 ALLOWED_EXTENSIONS = {".epub", ".pdf", ".txt", ".mobi", ".azw3"}
@@ -194,7 +203,20 @@ OCR_CONFIDENCE_THRESHOLD = float(os.getenv("OCR_CONFIDENCE_THRESHOLD", "85"))
 IMAGE_MAX_WIDTH_FAST = 600
 IMAGE_MAX_WIDTH_STANDARD = 800
 IMAGE_MAX_WIDTH_HIGH = 1200
+# Encode photographs as WebP (an EPUB 3.3 core media type); set to false for older readers
+IMAGE_ALLOW_WEBP = os.getenv("IMAGE_ALLOW_WEBP", "true").lower() == "true"
 TESSERACT_LANGUAGE_MODELS = os.getenv("TESSERACT_LANGUAGE_MODELS", "chi_sim,chi_tra,eng")
+# Layout-aware OCR results kept in memory per OCR service, keyed by image content (0 disables)
+OCR_LAYOUT_CACHE_SIZE = int(os.getenv("OCR_LAYOUT_CACHE_SIZE", "128"))
+MAX_TASKS_PER_POD = int(os.getenv("MAX_TASKS_PER_POD", "5"))
+# Number of conversions run side by side by an outer wrapper (e.g. `parallel -j N`)
+EBOOK_OUTER_PARALLEL = int(os.getenv("EBOOK_OUTER_PARALLEL", "1"))
+CONVERSION_CACHE_ENABLED = os.getenv("CONVERSION_CACHE_ENABLED", "true").lower() == "true"
+CONVERSION_CACHE_DIR = Path(os.getenv("CONVERSION_CACHE_DIR", str(BASE_DIR / "cache" / "conversion")))
+# Conversion cache bounds: entries older than the age limit are dropped, then the
+# least recently used ones until the directory fits the size limit
+CONVERSION_CACHE_MAX_SIZE_MB = int(os.getenv("CONVERSION_CACHE_MAX_SIZE_MB", "2048"))
+CONVERSION_CACHE_MAX_AGE_DAYS = int(os.getenv("CONVERSION_CACHE_MAX_AGE_DAYS", "30"))
 
 # Calibre fallback settings
 ENABLE_CALIBRE_FALLBACK = os.getenv("ENABLE_CALIBRE_FALLBACK", "true").lower() == "true"
@@ -1,9 +1,17 @@
 import asyncio
+import time
 import httpx
-from typing import Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 from dataclasses import dataclass
 
-from config import ai_config
+from config import (
+    ai_config,
+    AI_MAX_CONCURRENT_REQUESTS,
+    AI_RPS,
+    AI_MAX_RETRIES,
+    AI_RETRY_BACKOFF_MIN,
+    AI_RETRY_BACKOFF_MAX,
+)
 from utils.logging_config import get_logger
 from utils.exceptions import AIServiceError
 
@@ -18,6 +26,66 @@ class AIResult:
     token_usage: Optional[Dict] = None
 
 
+class RetryableAPIError(Exception):
+    """Transient provider failure (rate limit, server error, timeout) worth retrying"""
+
+
+class RateLimitedClient:
+    """Token-bucket rate limiting and retry with exponential backoff for provider calls"""
+
+    def __init__(
+        self,
+        rate: float = AI_RPS,
+        max_retries: int = AI_MAX_RETRIES,
+        backoff_min: float = AI_RETRY_BACKOFF_MIN,
+        backoff_max: float = AI_RETRY_BACKOFF_MAX,
+    ):
+        self.logger = get_logger("ai_service")
+        self.rate = rate
+        self.max_retries = max_retries
+        self.backoff_min = backoff_min
+        self.backoff_max = backoff_max
+
+        # Allow a burst of up to one second's worth of requests
+        self._capacity = max(1.0, rate)
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until the bucket holds a token, then take it"""
+        if self.rate <= 0:
+            return
+
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    async def call(self, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """Await func within the rate limit, retrying transient failures with backoff"""
+        attempt = 0
+        while True:
+            await self.acquire()
+            try:
+                return await func(*args, **kwargs)
+            except RetryableAPIError as e:
+                if attempt >= self.max_retries:
+                    raise
+
+                delay = min(self.backoff_max, self.backoff_min * 2 ** attempt)
+                attempt += 1
+                self.logger.warning(
+                    f"AI request failed ({e}), retry {attempt}/{self.max_retries} in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+
+
 class AIService:
     """Handle AI text processing using multiple providers"""
 
@@ -29,11 +97,16 @@ class AIService:
         if not self.config["api_key"]:
             raise ValueError(f"{self.provider} API key not configured")
 
+        # Shared by every batch so concurrent batches stay within the provider's limit
+        self._request_semaphore = asyncio.Semaphore(
+            int(self.config.get("max_concurrency", AI_MAX_CONCURRENT_REQUESTS))
+        )
+        self._client = RateLimitedClient(rate=float(self.config.get("rps", AI_RPS)))
+
     async def generate_summary(
         self, text: str, max_length: int = 300, provider: str = None
     ) -> AIResult:
         """Generate text summary using specified or default provider"""
-        import time
         start_time = time.time()
 
         provider = provider or self.provider
@@ -54,11 +127,13 @@ class AIService:
         try:
             api_type = config.get("api_type", "openai")
             if api_type == "openai":
-                content, token_usage = await self._call_openai_compatible_api(
-                    config, prompt, max_length
+                content, token_usage = await self._client.call(
+                    self._call_openai_compatible_api, config, prompt, max_length
                 )
             elif api_type == "anthropic":
-                content, token_usage = await self._call_anthropic_api(config, prompt, max_length)
+                content, token_usage = await self._client.call(
+                    self._call_anthropic_api, config, prompt, max_length
+                )
             else:
                 raise ValueError(f"Unsupported api_type: {api_type}")
 
@@ -94,7 +169,6 @@ class AIService:
         self, text: str, enhancement_type: str = "improve_readability", provider: str = None
     ) -> AIResult:
         """Enhance text with various AI improvements"""
-        import time
         start_time = time.time()
 
         provider = provider or self.provider
@@ -119,11 +193,13 @@ class AIService:
         try:
             api_type = config.get("api_type", "openai")
             if api_type == "openai":
-                content, token_usage = await self._call_openai_compatible_api(
-                    config, prompt, max_tokens=1000
+                content, token_usage = await self._client.call(
+                    self._call_openai_compatible_api, config, prompt, max_tokens=1000
                 )
             elif api_type == "anthropic":
-                content, token_usage = await self._call_anthropic_api(config, prompt, max_tokens=1000)
+                content, token_usage = await self._client.call(
+                    self._call_anthropic_api, config, prompt, max_tokens=1000
+                )
             else:
                 raise ValueError(f"Unsupported api_type: {api_type}")
 
@@ -148,10 +224,8 @@ class AIService:
         self, texts: List[str], operation: str = "summary", **kwargs
     ) -> List[AIResult]:
         """Process multiple texts in parallel with rate limiting"""
-        semaphore = asyncio.Semaphore(3)  # Limit concurrent requests
-
         async def process_single_text(text: str) -> AIResult:
-            async with semaphore:
+            async with self._request_semaphore:
                 if operation == "summary":
                     return await self.generate_summary(text, **kwargs)
                 elif operation == "enhance":
@@ -200,6 +274,8 @@ class AIService:
                     except:
                         error_detail += f": {response.text[:200]}"
 
+                    if response.status_code == 429 or response.status_code >= 500:
+                        raise RetryableAPIError(error_detail)
                     raise Exception(error_detail)
 
                 result = response.json()
@@ -210,10 +286,12 @@ class AIService:
 
                 return content, token_usage
 
+        except RetryableAPIError:
+            raise
         except httpx.TimeoutException:
-            raise Exception("API request timed out")
+            raise RetryableAPIError("API request timed out")
         except httpx.ConnectError:
-            raise Exception("Failed to connect to API")
+            raise RetryableAPIError("Failed to connect to API")
         except Exception as e:
             if "API request failed" in str(e) or "timed out" in str(e) or "connect" in str(e):
                 raise
@@ -255,6 +333,8 @@ class AIService:
                     except:
                         error_detail += f": {response.text[:200]}"
 
+                    if response.status_code == 429 or response.status_code >= 500:
+                        raise RetryableAPIError(error_detail)
                     raise Exception(error_detail)
 
                 result = response.json()
@@ -265,10 +345,12 @@ class AIService:
 
                 return content, token_usage
 
+        except RetryableAPIError:
+            raise
         except httpx.TimeoutException:
-            raise Exception("API request timed out")
+            raise RetryableAPIError("API request timed out")
         except httpx.ConnectError:
-            raise Exception("Failed to connect to API")
+            raise RetryableAPIError("Failed to connect to API")
         except Exception as e:
             if "API request failed" in str(e) or "timed out" in str(e) or "connect" in str(e):
                 raise
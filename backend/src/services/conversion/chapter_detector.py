@@ -9,13 +9,39 @@ This module provides sophisticated chapter detection using multiple methods:
 - Confidence scoring for each method
 """
 
+import functools
+import heapq
 import logging
 import re
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Dict, List, Optional, Tuple, Any
 
+import numpy as np
 from utils.logging_config import get_logger
 
+# "Page X: Title" lines in the AI chapter response. Horizontal whitespace
+# only, so a match never spills over into the next line.
+_AI_LINE_PATTERN = re.compile(
+    r'^[^\S\n]*Page[^\S\n]*(\d+):[^\S\n]*(\S.*?)[^\S\n]*$',
+    re.IGNORECASE | re.MULTILINE
+)
+
+
+@functools.lru_cache(maxsize=4096)
+def _title_similarity(title1: str, title2: str) -> float:
+    """Jaccard similarity of the word sets of two normalized titles"""
+    if title1 == title2:
+        return 1.0
+
+    words1 = set(title1.split())
+    words2 = set(title2.split())
+
+    if not words1 or not words2:
+        return 0.0
+
+    return len(words1 & words2) / len(words1 | words2)
+
 
 @dataclass
 class ChapterBoundary:
@@ -39,6 +65,50 @@ class ChapterStructure:
     metadata: Dict[str, Any]
 
 
+@dataclass
+class TextBlockColumns:
+    """Structure-of-arrays view of text blocks used by the numeric detectors"""
+    sizes: np.ndarray  # float64 font sizes
+    bolds: np.ndarray  # bool
+    pages: np.ndarray  # int32 page numbers
+    y0s: np.ndarray  # float64 top coordinates
+    texts: List[str]
+
+    @classmethod
+    def from_blocks(cls, text_blocks: List) -> "TextBlockColumns":
+        """Build the column arrays in a single pass over the blocks"""
+        count = len(text_blocks)
+        return cls(
+            sizes=np.fromiter((b.font_size for b in text_blocks), dtype=np.float64, count=count),
+            bolds=np.fromiter((b.is_bold for b in text_blocks), dtype=np.bool_, count=count),
+            pages=np.fromiter((b.page_num for b in text_blocks), dtype=np.int32, count=count),
+            y0s=np.fromiter((b.y0 for b in text_blocks), dtype=np.float64, count=count),
+            texts=[b.text for b in text_blocks]
+        )
+
+    def page_order(self) -> np.ndarray:
+        """Page numbers in order of first appearance in the block stream"""
+        unique_pages, first_seen = np.unique(self.pages, return_index=True)
+        return unique_pages[np.argsort(first_seen, kind="stable")]
+
+    def largest_per_page(self, indices: np.ndarray) -> Dict[int, int]:
+        """
+        Map each page to the index of its largest-font block among indices
+
+        Ties resolve to the earliest block, matching max() over the blocks.
+        """
+        if not indices.size:
+            return {}
+
+        # Sort by page, then by descending font size; lexsort is stable so
+        # equal sizes keep block order and the first row per page wins
+        ordered = indices[np.lexsort((-self.sizes[indices], self.pages[indices]))]
+        ordered_pages = self.pages[ordered]
+        group_starts = np.flatnonzero(np.r_[True, ordered_pages[1:] != ordered_pages[:-1]])
+
+        return dict(zip(ordered_pages[group_starts].tolist(), ordered[group_starts].tolist()))
+
+
 class ChapterDetector:
     """Intelligent chapter detector using multiple analysis methods"""
 
@@ -61,19 +131,31 @@ class ChapterDetector:
         try:
             self.logger.info("Starting chapter detection")
 
-            # Method 1: Extract bookmarks/outline
-            bookmark_chapters = self._extract_bookmarks(pdf_doc)
+            # Convert the blocks to column arrays once for all numeric detectors
+            columns = TextBlockColumns.from_blocks(text_blocks)
+
+            # The detection methods are independent, so run them concurrently.
+            # Bookmark extraction runs in PyMuPDF C code and the AI call is
+            # network-bound, so both release the GIL while the others work.
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                # Method 1: Extract bookmarks/outline
+                bookmark_future = executor.submit(self._extract_bookmarks, pdf_doc)
+
+                # Method 2: Font-based detection
+                font_future = executor.submit(self._detect_by_font_analysis, columns)
 
-            # Method 2: Font-based detection
-            font_chapters = self._detect_by_font_analysis(text_blocks)
+                # Method 3: Page break pattern analysis
+                pattern_future = executor.submit(self._detect_by_page_patterns, pdf_doc, columns)
 
-            # Method 3: Page break pattern analysis
-            pattern_chapters = self._detect_by_page_patterns(pdf_doc, text_blocks)
+                # Method 4: AI-based analysis (if available)
+                ai_future = None
+                if self.ai_service:
+                    ai_future = executor.submit(self._detect_by_ai_analysis, text_blocks)
 
-            # Method 4: AI-based analysis (if available)
-            ai_chapters = []
-            if self.ai_service:
-                ai_chapters = self._detect_by_ai_analysis(text_blocks)
+                bookmark_chapters = bookmark_future.result()
+                font_chapters = font_future.result()
+                pattern_chapters = pattern_future.result()
+                ai_chapters = ai_future.result() if ai_future else []
 
             # Combine results from all methods
             combined_chapters = self._combine_detection_methods(
@@ -98,13 +180,13 @@ class ChapterDetector:
                 }
             )
 
-            self.logger.info(f"Chapter detection complete: {len(combined_chapters)} chapters, "
-                           f"confidence: {total_confidence:.1f}%")
+            self.logger.info("Chapter detection complete: %d chapters, confidence: %.1f%%",
+                             len(combined_chapters), total_confidence)
 
             return structure
 
         except Exception as e:
-            self.logger.error(f"Chapter detection failed: {str(e)}")
+            self.logger.error("Chapter detection failed: %s", e)
             # Return empty structure with low confidence
             return ChapterStructure(
                 chapters=[],
@@ -113,6 +195,30 @@ class ChapterDetector:
                 metadata={'error': str(e)}
             )
 
+    def detect_chapters_from_bookmarks(self, pdf_doc) -> ChapterStructure:
+        """
+        Build the chapter structure from the PDF outline alone
+
+        Used for born-digital documents whose bookmarks already describe the
+        chapters, skipping the font, pattern and AI detectors.
+
+        Args:
+            pdf_doc: PDF document object (PyMuPDF)
+
+        Returns:
+            ChapterStructure with the bookmark chapters
+        """
+        bookmark_chapters = self._deduplicate_and_improve(
+            sorted(self._extract_bookmarks(pdf_doc), key=lambda c: c.page_num)
+        )
+
+        return ChapterStructure(
+            chapters=bookmark_chapters,
+            total_confidence=self._calculate_overall_confidence(bookmark_chapters),
+            detection_methods_used=['bookmark'] if bookmark_chapters else [],
+            metadata={'bookmark_count': len(bookmark_chapters)}
+        )
+
     def _extract_bookmarks(self, pdf_doc) -> List[ChapterBoundary]:
         """Extract chapter information from PDF bookmarks/outline"""
         chapters = []
@@ -144,11 +250,11 @@ class ChapterDetector:
                 )
                 chapters.append(chapter)
 
-            self.logger.debug(f"Extracted {len(chapters)} bookmarks")
+            self.logger.debug("Extracted %d bookmarks", len(chapters))
             return chapters
 
         except Exception as e:
-            self.logger.warning(f"Bookmark extraction failed: {str(e)}")
+            self.logger.warning("Bookmark extraction failed: %s", e)
             return []
 
     def _calculate_bookmark_confidence(self, title: str, level: int) -> float:
@@ -169,71 +275,65 @@ class ChapterDetector:
 
         return max(0, min(100, confidence))
 
-    def _detect_by_font_analysis(self, text_blocks: List) -> List[ChapterBoundary]:
+    def _detect_by_font_analysis(self, columns: TextBlockColumns) -> List[ChapterBoundary]:
         """Detect chapters based on font size and style analysis"""
         chapters = []
 
-        if not text_blocks:
+        if not columns.texts:
             return chapters
 
         try:
             # Analyze font sizes to identify headings
-            font_sizes = [block.font_size for block in text_blocks if block.font_size > 0]
+            sizes = columns.sizes
+            font_sizes = sizes[sizes > 0]
 
-            if not font_sizes:
+            if not font_sizes.size:
                 return chapters
 
             # Calculate statistics
-            avg_font_size = sum(font_sizes) / len(font_sizes)
-            max_font_size = max(font_sizes)
+            avg_font_size = float(font_sizes.mean())
+            max_font_size = float(font_sizes.max())
 
             # Potential heading threshold (significantly larger than average)
             heading_threshold = avg_font_size + (max_font_size - avg_font_size) * 0.3
 
-            # Group text blocks by page
-            pages = {}
-            for block in text_blocks:
-                if block.page_num not in pages:
-                    pages[block.page_num] = []
-                pages[block.page_num].append(block)
-
-            # Look for headings on each page
-            for page_num, page_blocks in pages.items():
-                page_headings = []
-
-                for block in page_blocks:
-                    if (block.font_size >= heading_threshold and
-                        block.is_bold and
-                        len(block.text.strip()) > 2):
-
-                        # Additional checks for heading quality
-                        if self._is_likely_heading(block.text):
-                            confidence = self._calculate_font_confidence(
-                                block.font_size, avg_font_size, max_font_size, block.is_bold
-                            )
-
-                            heading = ChapterBoundary(
-                                page_num=page_num,
-                                title=block.text.strip(),
-                                confidence=confidence,
-                                detection_method="font_analysis",
-                                level=1,  # Default level
-                                position_y=block.y0,
-                                font_size=block.font_size,
-                                is_bold=block.is_bold
-                            )
-                            page_headings.append(heading)
-
-                # Keep the best heading per page (largest font size)
-                if page_headings:
-                    best_heading = max(page_headings, key=lambda h: h.font_size)
-                    chapters.append(best_heading)
-
-            self.logger.debug(f"Font analysis detected {len(chapters)} chapters")
+            # Numeric predicates are evaluated as one boolean mask; only the
+            # surviving candidates need the text-based checks
+            candidates = np.flatnonzero((sizes >= heading_threshold) & columns.bolds)
+
+            headings = np.fromiter(
+                (idx for idx in candidates
+                 if len(columns.texts[idx].strip()) > 2 and self._is_likely_heading(columns.texts[idx])),
+                dtype=np.intp
+            )
+
+            # Keep the best heading per page (largest font size)
+            best_per_page = columns.largest_per_page(headings)
+            for page_num in columns.page_order().tolist():
+                best = best_per_page.get(page_num)
+                if best is None:
+                    continue
+                font_size = float(sizes[best])
+                confidence = self._calculate_font_confidence(
+                    font_size, avg_font_size, max_font_size, True
+                )
+
+                chapters.append(ChapterBoundary(
+                    page_num=page_num,
+                    title=columns.texts[best].strip(),
+                    confidence=confidence,
+                    detection_method="font_analysis",
+                    level=1,  # Default level
+                    position_y=float(columns.y0s[best]),
+                    font_size=font_size,
+                    is_bold=True
+                ))
+
+            self.logger.debug("Font analysis detected %d chapters", len(chapters))
             return chapters
 
         except Exception as e:
-            self.logger.warning(f"Font analysis failed: {str(e)}")
+            self.logger.warning("Font analysis failed: %s", e)
             return []
 
     def _is_likely_heading(self, text: str) -> bool:
@@ -272,51 +372,42 @@ class ChapterDetector:
 
         return max(0, min(100, confidence))
 
-    def _detect_by_page_patterns(self, pdf_doc, text_blocks: List) -> List[ChapterBoundary]:
+    def _detect_by_page_patterns(self, pdf_doc, columns: TextBlockColumns) -> List[ChapterBoundary]:
         """Detect chapters based on page break patterns and content analysis"""
         chapters = []
 
         try:
-            # Look for pages that start with larger fonts
-            pages = {}
-            for block in text_blocks:
-                if block.page_num not in pages:
-                    pages[block.page_num] = []
-                pages[block.page_num].append(block)
+            # Look for pages that start with larger fonts: find the largest
+            # block at the top of each page (top 200 points)
+            sizes = columns.sizes
+            top_blocks = columns.largest_per_page(np.flatnonzero(columns.y0s < 200))
 
             # Analyze page starts for chapter indicators
-            for page_num in sorted(pages.keys()):
-                page_blocks = pages[page_num]
-
-                # Get blocks at the top of the page
-                top_blocks = [b for b in page_blocks if b.y0 < 200]  # Top 200 points
-
-                if top_blocks:
-                    # Find the largest block at the top
-                    top_block = max(top_blocks, key=lambda b: b.font_size)
-
-                    # Check if it looks like a chapter start
-                    if (top_block.font_size > 14 and
-                        self._is_likely_heading(top_block.text)):
-
-                        confidence = 60  # Moderate confidence for pattern detection
-
-                        chapter = ChapterBoundary(
-                            page_num=page_num,
-                            title=top_block.text.strip(),
-                            confidence=confidence,
-                            detection_method="page_pattern",
-                            level=1,
-                            position_y=top_block.y0,
-                            font_size=top_block.font_size
-                        )
-                        chapters.append(chapter)
-
-            self.logger.debug(f"Pattern analysis detected {len(chapters)} chapters")
+            for page_num in sorted(top_blocks.keys()):
+                top_idx = top_blocks[page_num]
+                top_text = columns.texts[top_idx]
+
+                # Check if it looks like a chapter start
+                if sizes[top_idx] > 14 and self._is_likely_heading(top_text):
+
+                    confidence = 60  # Moderate confidence for pattern detection
+
+                    chapter = ChapterBoundary(
+                        page_num=page_num,
+                        title=top_text.strip(),
+                        confidence=confidence,
+                        detection_method="page_pattern",
+                        level=1,
+                        position_y=float(columns.y0s[top_idx]),
+                        font_size=float(sizes[top_idx])
+                    )
+                    chapters.append(chapter)
+
+            self.logger.debug("Pattern analysis detected %d chapters", len(chapters))
             return chapters
 
         except Exception as e:
-            self.logger.warning(f"Page pattern analysis failed: {str(e)}")
+            self.logger.warning("Page pattern analysis failed: %s", e)
             return []
 
     def _detect_by_ai_analysis(self, text_blocks: List) -> List[ChapterBoundary]:
@@ -335,7 +426,7 @@ class ChapterDetector:
                 pages_text[block.page_num].append(block.text)
 
             # Analyze first few pages for chapter boundaries
-            sample_pages = sorted(pages_text.keys())[:20]  # First 20 pages
+            sample_pages = heapq.nsmallest(20, pages_text.keys())  # First 20 pages, ascending
 
             if len(sample_pages) < 3:
                 return chapters
@@ -382,13 +473,13 @@ class ChapterDetector:
                     chapters.append(chapter)
 
             except Exception as e:
-                self.logger.warning(f"AI service call failed: {str(e)}")
+                self.logger.warning("AI service call failed: %s", e)
 
-            self.logger.debug(f"AI analysis detected {len(chapters)} chapters")
+            self.logger.debug("AI analysis detected %d chapters", len(chapters))
             return chapters
 
         except Exception as e:
-            self.logger.warning(f"AI analysis failed: {str(e)}")
+            self.logger.warning("AI analysis failed: %s", e)
             return []
 
     def _parse_ai_response(self, response: str, pages_text: Dict) -> List[Tuple[int, str]]:
@@ -396,26 +487,23 @@ class ChapterDetector:
         chapters = []
 
         try:
-            lines = response.strip().split('\n')
-            for line in lines:
-                # Look for "Page X: Title" pattern
-                match = re.match(r'Page\s*(\d+):\s*(.+)', line.strip(), re.IGNORECASE)
-                if match:
-                    page_num = int(match.group(1)) - 1  # Convert to 0-indexed
-                    title = match.group(2).strip()
-
-                    # Verify page exists and get actual title
-                    if page_num in pages_text and pages_text[page_num]:
-                        # Use first few words from actual page as title if AI response is too generic
-                        if len(title) < 3 or title.lower() in ['chapter', 'section', 'part']:
-                            actual_text = ' '.join(pages_text[page_num])[:100]
-                            title = actual_text.split('.')[0].strip()
-
-                        if title and len(title) > 2:
-                            chapters.append((page_num, title))
+            # Extract every "Page X: Title" pair in a single scan
+            for page_str, title in _AI_LINE_PATTERN.findall(response):
+                page_num = int(page_str) - 1  # Convert to 0-indexed
+                title = title.strip()
+
+                # Verify page exists and get actual title
+                if page_num in pages_text and pages_text[page_num]:
+                    # Use first few words from actual page as title if AI response is too generic
+                    if len(title) < 3 or title.lower() in ['chapter', 'section', 'part']:
+                        actual_text = ' '.join(pages_text[page_num])[:100]
+                        title = actual_text.split('.')[0].strip()
+
+                    if title and len(title) > 2:
+                        chapters.append((page_num, title))
 
         except Exception as e:
-            self.logger.warning(f"Failed to parse AI response: {str(e)}")
+            self.logger.warning("Failed to parse AI response: %s", e)
 
         return chapters
 
@@ -475,21 +563,11 @@ class ChapterDetector:
         title1 = title1.lower().strip()
         title2 = title2.lower().strip()
 
-        if title1 == title2:
-            return True
-
-        # Simple similarity check
-        words1 = set(title1.split())
-        words2 = set(title2.split())
-
-        if not words1 or not words2:
-            return False
-
-        intersection = words1.intersection(words2)
-        union = words1.union(words2)
+        # Similarity is symmetric, so order the pair to share cache entries
+        if title2 < title1:
+            title1, title2 = title2, title1
 
-        similarity = len(intersection) / len(union)
-        return similarity >= threshold
+        return _title_similarity(title1, title2) >= threshold
 
     def _deduplicate_and_improve(self, chapters: List[ChapterBoundary]) -> List[ChapterBoundary]:
         """Remove duplicates and improve chapter titles"""
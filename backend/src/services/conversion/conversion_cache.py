@@ -0,0 +1,187 @@
+"""
+Conversion Cache Module - Persistent cache for deterministic pipeline outputs
+
+This module provides a disk cache used by the conversion pipeline:
+- Content hashing of input PDFs
+- OCR text cached per page fingerprint
+- Generated chapters cached per extracted text, structure and metadata
+- Size and age limits, pruning the least recently used entries
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from utils.logging_config import get_logger
+
+# Import configuration
+from config import (
+    CONVERSION_CACHE_DIR,
+    CONVERSION_CACHE_ENABLED,
+    CONVERSION_CACHE_MAX_SIZE_MB,
+    CONVERSION_CACHE_MAX_AGE_DAYS
+)
+
+# Part of every cache file name; bump it when a cached format or the code
+# producing cached results changes, and entries of other versions age out unread
+_CACHE_VERSION = 1
+
+# The cache is pruned each time this share of the size limit has been written
+_PRUNE_WRITE_FRACTION = 0.1
+
+
+class ConversionCache:
+    """Disk cache of OCR text and generated chapters, keyed by content hashes"""
+
+    def __init__(self,
+                 cache_dir: Path = CONVERSION_CACHE_DIR,
+                 enabled: bool = CONVERSION_CACHE_ENABLED,
+                 max_size_mb: int = CONVERSION_CACHE_MAX_SIZE_MB,
+                 max_age_days: int = CONVERSION_CACHE_MAX_AGE_DAYS):
+        self.logger = get_logger("conversion_cache")
+        self.cache_dir = Path(cache_dir)
+        self.enabled = enabled
+        self.max_size = max_size_mb * 1024 * 1024
+        self.max_age = max_age_days * 24 * 3600
+        self._bytes_since_prune = 0
+        self._prune_lock = threading.Lock()
+        self.prune()
+
+    @staticmethod
+    def hash_bytes(data: bytes) -> str:
+        """Return the SHA1 of raw file contents"""
+        return hashlib.sha1(data).hexdigest()
+
+    @staticmethod
+    def hash_text(text: str) -> str:
+        """Return the SHA1 of a string"""
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def load_text(self, key: str) -> Optional[str]:
+        """Load cached text (e.g. OCR output), or None on a miss"""
+        data = self._read(f"{key}.ocr.json")
+        if data is None:
+            return None
+
+        try:
+            return json.loads(data)['text']
+        except Exception as e:
+            self.logger.warning("Discarding corrupt cache entry %s: %s", key, e)
+            return None
+
+    def save_text(self, key: str, text: str) -> None:
+        """Cache text under key"""
+        self._write(f"{key}.ocr.json", json.dumps({'text': text}, ensure_ascii=False).encode('utf-8'))
+
+    def load_object(self, key: str) -> Any:
+        """Load a cached Python object, or None on a miss"""
+        data = self._read(f"{key}.pkl")
+        if data is None:
+            return None
+
+        try:
+            return pickle.loads(data)
+        except Exception as e:
+            self.logger.warning("Discarding corrupt cache entry %s: %s", key, e)
+            return None
+
+    def save_object(self, key: str, obj: Any) -> None:
+        """Cache a picklable Python object under key"""
+        self._write(f"{key}.pkl", pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def _read(self, file_name: str) -> Optional[bytes]:
+        """Read a cache file, or None if caching is disabled or the file is missing"""
+        if not self.enabled:
+            return None
+
+        path = self._path(file_name)
+        try:
+            data = path.read_bytes()
+            # Pruning evicts by modification time, so a hit marks the entry as used
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            self.logger.warning("Failed to read cache file %s: %s", file_name, e)
+            return None
+
+    def _write(self, file_name: str, data: bytes) -> None:
+        """Atomically write a cache file so concurrent readers never see partial data"""
+        if not self.enabled:
+            return
+
+        tmp_path = None
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(file_name))
+        except Exception as e:
+            self.logger.warning("Failed to write cache file %s: %s", file_name, e)
+            if tmp_path is not None:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+            return
+
+        with self._prune_lock:
+            self._bytes_since_prune += len(data)
+            if self._bytes_since_prune < self.max_size * _PRUNE_WRITE_FRACTION:
+                return
+            self._bytes_since_prune = 0
+        self.prune()
+
+    def prune(self) -> None:
+        """Drop entries past the age limit, then the least recently used ones until under the size limit"""
+        if not self.enabled:
+            return
+
+        try:
+            entries = []
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            self.logger.warning("Failed to scan cache directory %s: %s", self.cache_dir, e)
+            return
+
+        # Oldest first, so eviction can stop at the first entry that may stay
+        entries.sort()
+        cutoff = time.time() - self.max_age
+        total_size = sum(size for _, size, _ in entries)
+        removed = 0
+        for mtime, size, path in entries:
+            if mtime >= cutoff and total_size <= self.max_size:
+                break
+            if path.endswith('.tmp') and mtime >= cutoff:
+                # A write still in progress
+                continue
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                self.logger.warning("Failed to remove cache file %s: %s", path, e)
+                continue
+            total_size -= size
+            removed += 1
+
+        if removed:
+            self.logger.info("Pruned %d cache files, %d bytes remain", removed, total_size)
+
+    def _path(self, file_name: str) -> Path:
+        """Location of a cache file under the current cache version"""
+        return self.cache_dir / f"v{_CACHE_VERSION}-{file_name}"
@@ -8,9 +8,20 @@ This module provides the main conversion pipeline that coordinates all component
 - Quality assessment and comparison
 """
 
+import asyncio
+import gc
 import logging
+import math
+import os
+import queue
+import threading
 import time
-from dataclasses import dataclass
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass
+from itertools import chain
+import multiprocessing
+from multiprocessing import resource_tracker, shared_memory
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Any
 
@@ -18,13 +29,14 @@ from utils.logging_config import get_logger
 from utils.progress_tracker import progress_tracker
 
 # Import all conversion components
-from pdf_parser import PDFParser, PDFMetadata
+from pdf_parser import PDFParser, PDFMetadata, PDFSource, text_block_lengths
 from layout_analyzer import LayoutAnalyzer
 from ocr_service import OCRService
 from chapter_detector import ChapterDetector
 from image_processor import ImageProcessor, ProcessedImage
 from epub_generator import EpubGenerator, EpubChapter, EpubMetadata
 from calibre_fallback import CalibreFallback
+from conversion_cache import ConversionCache
 
 # Import configuration
 from config import (
@@ -32,9 +44,236 @@ from config import (
     CONVERSION_QUALITY_LEVEL,
     OCR_CONFIDENCE_THRESHOLD,
     ENABLE_CALIBRE_FALLBACK,
-    CALIBRE_QUALITY_THRESHOLD
+    CALIBRE_QUALITY_THRESHOLD,
+    MAX_TASKS_PER_POD,
+    EBOOK_OUTER_PARALLEL
 )
 
+# Limits concurrent conversions hosted by one worker process
+_conversion_semaphore = asyncio.Semaphore(MAX_TASKS_PER_POD)
+
+# OCR service reused across tasks within a worker process
+_worker_ocr_service = None
+
+# Page ranges buffered between the parse and OCR stages
+_PIPELINE_QUEUE_SIZE = 4
+
+# Fewer pages than this per worker is not worth a separate process
+_MIN_PAGES_PER_WORKER = 8
+
+# Rough peak memory of one page-range worker
+_EST_GB_PER_WORKER = 0.5
+
+# Pool workers are replaced after this many tasks to bound their memory growth
+_MAX_TASKS_PER_CHILD = 50
+
+# Lowest estimate_scan_probability bucket, i.e. text on nearly every page
+_FAST_PATH_MAX_SCAN_PROBABILITY = 0.1
+
+# Placeholder OCR job of a range parsed while the document still qualified for
+# the fast path; the OCR is only submitted if the document stops qualifying
+_OCR_DEFERRED = object()
+
+
+def _available_ram_gb() -> Optional[float]:
+    """Available physical memory in GB, or None where the platform does not report it"""
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') / 1024 ** 3
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def _get_cpu_budget() -> int:
+    """CPUs available to this pipeline, leaving room for outer parallel conversions"""
+    cpu = os.cpu_count() or 1
+    if EBOOK_OUTER_PARALLEL > 1:
+        # Split the machine between outer and inner concurrency
+        return max(1, math.isqrt(cpu))
+    return cpu
+
+
+def _create_executor() -> ProcessPoolExecutor:
+    """
+    Process pool for page-range, OCR and image workers
+
+    Recycling workers needs a non-fork start method; forkserver also avoids
+    forking this multi-threaded process, and spawn is used where it is not
+    available (Windows).
+    """
+    start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(
+        max_workers=_get_cpu_budget(),
+        mp_context=multiprocessing.get_context(start_method),
+        max_tasks_per_child=_MAX_TASKS_PER_CHILD
+    )
+
+
+def _get_max_workers(page_count: int, ram_gb_free: Optional[float] = None) -> int:
+    """Worker count bounded by CPUs, by the amount of work and by free memory"""
+    by_pages = max(1, page_count // _MIN_PAGES_PER_WORKER)
+    workers = min(_get_cpu_budget(), by_pages)
+    if ram_gb_free is not None:
+        workers = min(workers, int(ram_gb_free // _EST_GB_PER_WORKER))
+    return max(1, workers)
+
+
+def _split_page_ranges(page_count: int, workers: int) -> List[Tuple[int, int]]:
+    """
+    Split pages into contiguous, inclusive (first_page, last_page) ranges
+
+    Several ranges per worker keep the pool balanced and let parsed ranges
+    reach the OCR stage early; a single worker gets the whole document.
+    """
+    if workers <= 1:
+        return [(0, page_count - 1)]
+
+    chunk_size = max(1, page_count // (workers * 4))
+    return [
+        (first_page, min(first_page + chunk_size, page_count) - 1)
+        for first_page in range(0, page_count, chunk_size)
+    ]
+
+
+@dataclass
+class PageChunkResult:
+    """Parsed content of one page range, as returned by a parse worker"""
+    page_range: Tuple[int, int]
+    metadata: PDFMetadata
+    text_blocks: List
+    images: List
+    total_text_len: int
+    block_count: int
+    shared_images: Optional[Tuple[str, List[Tuple[int, int]]]] = None
+
+
+def _parse_page_range(pdf_source: PDFSource,
+                      page_range: Tuple[int, int],
+                      share_images: bool = False) -> PageChunkResult:
+    """
+    Worker: parse text blocks and images for one page range
+
+    The text totals are summed here so the parent never iterates the blocks
+    to size them. With share_images, the image bytes are returned in a shared
+    memory block instead of being pickled back (see _read_shared_images).
+    """
+    metadata, text_blocks, images = PDFParser().parse_pdf(pdf_source, page_range)
+    return PageChunkResult(
+        page_range=page_range,
+        metadata=metadata,
+        text_blocks=text_blocks,
+        images=images,
+        total_text_len=int(text_block_lengths(text_blocks).sum()),
+        block_count=len(text_blocks),
+        shared_images=_share_image_data(images) if share_images else None
+    )
+
+
+def _share_image_data(images: List) -> Optional[Tuple[str, List[Tuple[int, int]]]]:
+    """
+    Move the bytes of all images into one shared memory block, returning (name, spans)
+
+    spans holds each image's (offset, size) in the block. Placements of one
+    image share a bytes object (see PDFParser._extract_images) and are stored once.
+    """
+    # Offset of each distinct bytes object, by identity
+    offsets = {}
+    spans = []
+    total_size = 0
+    for image in images:
+        offset = offsets.get(id(image.image_data))
+        if offset is None:
+            offset = offsets[id(image.image_data)] = total_size
+            total_size += len(image.image_data)
+        spans.append((offset, len(image.image_data)))
+    if not total_size:
+        return None
+
+    shm = shared_memory.SharedMemory(create=True, size=total_size)
+    for image, (offset, size) in zip(images, spans):
+        shm.buf[offset:offset + size] = image.image_data
+        image.image_data = b""
+
+    # The parent unlinks the block once read; keep this process's tracker from removing it first
+    resource_tracker.unregister(shm._name, "shared_memory")
+    shm.close()
+    return shm.name, spans
+
+
+def _read_shared_images(images: List, shared_images: Optional[Tuple[str, List[Tuple[int, int]]]]) -> None:
+    """Restore image bytes from a worker's shared memory block and free the block"""
+    if shared_images is None:
+        return
+
+    shm_name, spans = shared_images
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        # Images stored once in the block share one bytes object again
+        image_data = {}
+        for image, span in zip(images, spans):
+            if span not in image_data:
+                offset, size = span
+                image_data[span] = bytes(shm.buf[offset:offset + size])
+            image.image_data = image_data[span]
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _discard_shared_images(future: Future) -> None:
+    """Free the shared memory block of a parse result that will never be read"""
+    if not future.cancelled() and future.exception() is None:
+        chunk = future.result()
+        _read_shared_images(chunk.images, chunk.shared_images)
+
+
+def _contiguous_runs(page_numbers: List[int]) -> List[Tuple[int, int]]:
+    """Group ascending page numbers into inclusive (first_page, last_page) runs"""
+    runs = []
+    for page_num in page_numbers:
+        if runs and runs[-1][1] == page_num - 1:
+            runs[-1] = (runs[-1][0], page_num)
+        else:
+            runs.append((page_num, page_num))
+    return runs
+
+
+def _ocr_page_range(pdf_source: PDFSource, page_range: Tuple[int, int]) -> List[Tuple[int, str]]:
+    """Worker: run OCR for one page range and return (page_num, text) per page"""
+    global _worker_ocr_service
+    if _worker_ocr_service is None:
+        _worker_ocr_service = OCRService()
+    ocr_results = _worker_ocr_service.process_document(pdf_source, page_range)
+    return [(result.page_num, result.result.text) for result in ocr_results]
+
+
+def _score_kernel(has_title_author: bool,
+                  has_bookmarks: bool,
+                  chapter_confidence: float,
+                  image_count: int,
+                  scan_probability: float) -> float:
+    """Quality score arithmetic on plain values, kept free of pipeline objects"""
+    score = 50.0  # Base score
+
+    # Metadata quality
+    if has_title_author:
+        score += 10
+    if has_bookmarks:
+        score += 15
+
+    # Chapter detection quality
+    score += chapter_confidence * 0.2
+
+    # Image processing quality
+    score += min(image_count * 2, 15)  # Up to 15 points for images
+
+    # Text extraction quality
+    if scan_probability < 0.3:  # Low scan probability = good text extraction
+        score += 10
+    elif scan_probability < 0.7:
+        score += 5
+
+    return min(100.0, score)
+
 
 @dataclass
 class ConversionStage:
@@ -72,10 +311,19 @@ class ConversionPipeline:
         self.layout_analyzer = LayoutAnalyzer()
         self.ocr_service = OCRService()
         self.chapter_detector = ChapterDetector(ai_service)
-        self.image_processor = ImageProcessor(ai_service)
+        self.cache = ConversionCache()
+        self.image_processor = ImageProcessor(ai_service, cache=self.cache)
         self.epub_generator = EpubGenerator()
         self.calibre_fallback = CalibreFallback()
 
+        # Validation results handed from the suitability check to stage 1, keyed by file hash
+        self._validation_cache: Dict[str, Dict[str, Any]] = {}
+
+        # Process pool shared by every conversion run through this pipeline,
+        # replaced under the lock when a crashed worker breaks it
+        self.executor = _create_executor()
+        self._executor_lock = threading.Lock()
+
         # Define pipeline stages
         self.stages = [
             ConversionStage("pdf_analysis", "Analyzing PDF structure", 0.1),
@@ -85,12 +333,45 @@ class ConversionPipeline:
             ConversionStage("epub_generation", "Generating EPUB", 0.2)
         ]
 
+    def close(self):
+        """Shut down the shared worker pool"""
+        with self._executor_lock:
+            self.executor.shutdown(wait=True)
+
+    def _replace_broken_executor(self, broken: ProcessPoolExecutor) -> ProcessPoolExecutor:
+        """Swap in a fresh pool for one a crashed worker broke, once across threads"""
+        with self._executor_lock:
+            if self.executor is broken:
+                self.logger.warning("Process pool broken by a crashed worker, starting a new one")
+                broken.shutdown(wait=False, cancel_futures=True)
+                self.executor = _create_executor()
+            return self.executor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
     def convert_pdf_to_epub(self,
                             input_path: Path,
                             output_path: Path,
                             quality_level: str = None,
                             use_calibre: bool = False) -> ConversionResult:
         """
+        Synchronous wrapper around aconvert_pdf_to_epub for legacy callers
+
+        Each call runs its own event loop, so it bypasses the per-worker
+        concurrency limit and must not be called from a running loop.
+        """
+        return asyncio.run(self._convert(input_path, output_path, quality_level, use_calibre))
+
+    async def aconvert_pdf_to_epub(self,
+                                   input_path: Path,
+                                   output_path: Path,
+                                   quality_level: str = None,
+                                   use_calibre: bool = False) -> ConversionResult:
+        """
         Convert PDF to EPUB using the enhanced pipeline
 
         Args:
@@ -102,82 +383,147 @@ class ConversionPipeline:
         Returns:
             ConversionResult with conversion details
         """
+        async with _conversion_semaphore:
+            return await self._convert(input_path, output_path, quality_level, use_calibre)
+
+    async def _convert(self,
+                       input_path: Path,
+                       output_path: Path,
+                       quality_level: str,
+                       use_calibre: bool) -> ConversionResult:
+        """Run the conversion, offloading blocking stages to worker threads"""
         if not ENHANCED_PDF_CONVERSION:
             # Fallback to old implementation if feature flag is disabled
-            return self._fallback_to_old_implementation(input_path, output_path)
+            return await asyncio.to_thread(self._fallback_to_old_implementation, input_path, output_path)
 
         start_time = time.time()
         task_id = output_path.stem
 
         try:
-            self.logger.info(f"Starting enhanced PDF to EPUB conversion: {input_path.name}")
+            self.logger.info("Starting enhanced PDF to EPUB conversion: %s", input_path.name)
             progress_tracker.start_task(task_id, input_path.name, '.pdf', 'epub', 5)
 
-            # Check if we should use Calibre directly
-            if use_calibre or not self._is_custom_pipeline_suitable(input_path):
-                return self._convert_with_calibre(input_path, output_path, task_id, start_time)
-
-            # Run custom pipeline stages
-            pipeline_result = self._run_custom_pipeline(input_path, output_path, quality_level, task_id)
+            # Read the PDF once; in-process stages work on the in-memory copy
+            pdf_bytes = await asyncio.to_thread(input_path.read_bytes)
 
-            # Check if we need Calibre fallback
-            if not pipeline_result.success or self._should_trigger_fallback(pipeline_result):
-                self.logger.info("Triggering Calibre fallback")
-                calibre_result = self._convert_with_calibre(input_path, output_path, task_id, start_time)
+            # Keys the validation handed from the suitability check to stage 1
+            file_hash = await asyncio.to_thread(self.cache.hash_bytes, pdf_bytes)
 
-                if calibre_result.success:
-                    return calibre_result
-                elif pipeline_result.success:
-                    # Fallback failed, return custom result
-                    return pipeline_result
-                else:
-                    # Both failed
-                    return self._create_failure_result("Both custom pipeline and Calibre failed", start_time)
-
-            return pipeline_result
+            return await self._run_conversion(
+                input_path, pdf_bytes, output_path, quality_level, use_calibre, task_id, start_time, file_hash
+            )
 
         except Exception as e:
-            self.logger.error(f"Pipeline conversion failed: {str(e)}")
+            self.logger.error("Pipeline conversion failed: %s", e)
             return self._create_failure_result(str(e), start_time)
 
-    def _run_custom_pipeline(self,
-                            input_path: Path,
-                            output_path: Path,
-                            quality_level: str,
-                            task_id: str) -> ConversionResult:
+    async def _run_conversion(self,
+                              input_path: Path,
+                              pdf_bytes: bytes,
+                              output_path: Path,
+                              quality_level: str,
+                              use_calibre: bool,
+                              task_id: str,
+                              start_time: float,
+                              file_hash: str) -> ConversionResult:
+        """Choose between the custom pipeline and Calibre, falling back when needed"""
+        # Check if we should use Calibre directly
+        if use_calibre or not await asyncio.to_thread(self._is_custom_pipeline_suitable, pdf_bytes, file_hash):
+            return await asyncio.to_thread(
+                self._convert_with_calibre, input_path, output_path, task_id, start_time
+            )
+
+        # Run custom pipeline stages
+        pipeline_result = await self._run_custom_pipeline(
+            input_path, pdf_bytes, output_path, quality_level, task_id, file_hash
+        )
+
+        # Check if we need Calibre fallback
+        if not pipeline_result.success or self._should_trigger_fallback(pipeline_result):
+            self.logger.info("Triggering Calibre fallback")
+            calibre_result = await asyncio.to_thread(
+                self._convert_with_calibre, input_path, output_path, task_id, start_time
+            )
+
+            if calibre_result.success:
+                return calibre_result
+            elif pipeline_result.success:
+                # Fallback failed, return custom result
+                return pipeline_result
+            else:
+                # Both failed
+                return self._create_failure_result("Both custom pipeline and Calibre failed", start_time)
+
+        return pipeline_result
+
+    async def _run_custom_pipeline(self,
+                                  input_path: Path,
+                                  pdf_bytes: bytes,
+                                  output_path: Path,
+                                  quality_level: str,
+                                  task_id: str,
+                                  file_hash: str) -> ConversionResult:
         """Run the custom conversion pipeline"""
         start_time = time.time()
         completed_stages = []
 
-        # Stage 1: PDF Analysis
-        metadata, text_blocks, images = self._stage_1_pdf_analysis(input_path, task_id)
+        # Stages 1-2: PDF Analysis and Content Extraction
+        metadata, text_blocks, extracted_text, processed_images, deferred_ranges = await asyncio.to_thread(
+            self._run_extraction_stages, input_path, pdf_bytes, quality_level, task_id, file_hash
+        )
         if metadata is None:
             return self._create_failure_result("PDF analysis failed", start_time)
-        completed_stages.append("pdf_analysis")
+        completed_stages.extend(["pdf_analysis", "content_extraction"])
 
-        # Stage 2: Content Extraction
-        extracted_text, processed_images = self._stage_2_content_extraction(
-            input_path, text_blocks, images, quality_level, task_id
-        )
-        completed_stages.append("content_extraction")
+        # Plain-dict view of the metadata shared by the remaining stages
+        metadata_dict = asdict(metadata)
 
-        # Stage 3: Structure Recognition
-        chapter_structure = self._stage_3_structure_recognition(text_blocks, metadata, task_id)
-        completed_stages.append("structure_recognition")
+        # Born-digital PDFs with an outline: the bookmarks are the chapters
+        chapter_structure = None
+        if deferred_ranges:
+            chapter_structure = await asyncio.to_thread(
+                self._fast_path_generate, pdf_bytes, text_blocks, processed_images, metadata_dict, output_path, task_id
+            )
+            if chapter_structure is None:
+                # Extraction skipped OCR and alt text for the fast path; the full pipeline needs both
+                extracted_text = await asyncio.to_thread(
+                    self._run_deferred_ocr, input_path, pdf_bytes, deferred_ranges, extracted_text
+                )
+                await asyncio.to_thread(self.image_processor.generate_alt_text, processed_images)
+            del deferred_ranges
+
+        if chapter_structure is not None:
+            completed_stages.extend(["structure_recognition", "epub_generation"])
+            enhanced_metadata = None
+        else:
+            # Stage 3: Structure Recognition
+            chapter_structure = await asyncio.to_thread(
+                self._stage_3_structure_recognition, text_blocks, metadata_dict, task_id
+            )
+            completed_stages.append("structure_recognition")
 
-        # Stage 4: AI Enhancement
-        enhanced_metadata, enhanced_chapters = self._stage_4_ai_enhancement(
-            extracted_text, chapter_structure, metadata, task_id
-        )
-        completed_stages.append("ai_enhancement")
+            # Stage 4: AI Enhancement
+            enhanced_metadata, enhanced_chapters = await asyncio.to_thread(
+                self._stage_4_ai_enhancement,
+                text_blocks, extracted_text, chapter_structure, metadata_dict, task_id
+            )
+            completed_stages.append("ai_enhancement")
 
-        # Stage 5: EPUB Generation
-        success = self._stage_5_epub_generation(
-            output_path, enhanced_chapters, enhanced_metadata, processed_images, task_id
-        )
-        if not success:
-            return self._create_failure_result("EPUB generation failed", start_time)
-        completed_stages.append("epub_generation")
+            # The chapters now hold the text; drop the raw blocks before generating
+            del text_blocks, extracted_text
+
+            # Stage 5: EPUB Generation
+            success = await asyncio.to_thread(
+                self._stage_5_epub_generation,
+                output_path, enhanced_chapters, enhanced_metadata, processed_images, task_id
+            )
+            if not success:
+                return self._create_failure_result("EPUB generation failed", start_time)
+            completed_stages.append("epub_generation")
+            del enhanced_chapters
+
+        # Reclaim cyclic garbage (documents, EPUB trees) before the next conversion
+        gc.collect()
 
         # Calculate quality score
         quality_score = self._calculate_quality_score(
@@ -205,65 +551,376 @@ class ConversionPipeline:
             }
         )
 
-    def _stage_1_pdf_analysis(self, input_path: Path, task_id: str) -> Tuple[Optional[PDFMetadata], List, List]:
-        """Stage 1: Analyze PDF structure and extract basic information"""
+    def _run_extraction_stages(self,
+                             input_path: Path,
+                             pdf_bytes: bytes,
+                             quality_level: str,
+                             task_id: str,
+                             file_hash: str) -> Tuple[Optional[PDFMetadata], List, str, List[ProcessedImage], List[PageChunkResult]]:
+        """
+        Run stages 1 and 2 as a parse -> OCR thread pipeline over page ranges
+
+        A parser thread streams parsed page ranges into a bounded queue, an OCR
+        thread submits OCR for the ranges that need it, and the calling thread
+        merges everything in page order, so OCR of early pages overlaps parsing
+        of later ones. Documents that qualify for the fast path range by range
+        get neither OCR nor alt text; the last value returned lists their
+        ranges, so OCR can still be run if the fast path fails, and is empty
+        otherwise.
+        """
         try:
             progress_tracker.update_progress(task_id, 1, "Analyzing PDF structure...")
+            validation = self._validation_cache.pop(file_hash, None)
+            if validation is not None:
+                page_count = validation['page_count']
+            else:
+                page_count = self.pdf_parser.get_page_count(pdf_bytes)
+            page_ranges = self._get_page_ranges(page_count)
+        except Exception as e:
+            self.logger.error("PDF analysis failed: %s", e)
+            progress_tracker.fail_task(task_id, f"PDF analysis failed: {str(e)}")
+            return None, [], "", [], []
+
+        # A single range runs in-process to avoid the cost of starting pool workers
+        executor = self.executor if len(page_ranges) > 1 else None
+
+        # Pool workers reopen the file instead of receiving a pickled copy of the bytes
+        pdf_source = input_path if executor is not None else pdf_bytes
+        parse_queue = queue.Queue(maxsize=_PIPELINE_QUEUE_SIZE)
+        ocr_queue = queue.Queue(maxsize=_PIPELINE_QUEUE_SIZE)
+
+        threading.Thread(
+            target=self._stage_1_pdf_analysis,
+            args=(pdf_source, page_ranges, executor, parse_queue),
+            daemon=True
+        ).start()
+        threading.Thread(
+            target=self._stage_2_ocr_dispatch,
+            args=(pdf_source, executor, parse_queue, ocr_queue),
+            daemon=True
+        ).start()
+
+        range_results = []
+        analysis_error = None
+        while (item := ocr_queue.get()) is not None:
+            if isinstance(item, Exception):
+                analysis_error = item
+            else:
+                range_results.append(item)
+
+        if analysis_error is not None:
+            self.logger.error("PDF analysis failed: %s", analysis_error)
+            progress_tracker.fail_task(task_id, f"PDF analysis failed: {str(analysis_error)}")
+            return None, [], "", [], []
+
+        # The fast path holds only if every range qualified; otherwise the
+        # ranges that still qualified get the OCR they were spared
+        fast_path = all(ocr_job is _OCR_DEFERRED for _, ocr_job in range_results)
+        page_hashes = None
+        for index, (chunk, ocr_job) in enumerate(range_results):
+            if ocr_job is _OCR_DEFERRED:
+                ocr_job = None
+                if not fast_path:
+                    ocr_job, page_hashes = self._start_ocr(pdf_source, executor, chunk, page_hashes)
+                range_results[index] = (chunk, ocr_job)
+
+        chunks = [chunk for chunk, _ in range_results]
+        metadata = chunks[0].metadata
+        text_blocks = list(chain.from_iterable(chunk.text_blocks for chunk in chunks))
+        images = list(chain.from_iterable(chunk.images for chunk in chunks))
+
+        # Per-range scan probabilities only cover their own pages
+        metadata.scan_probability = self.pdf_parser.estimate_scan_probability(
+            sum(chunk.total_text_len for chunk in chunks), metadata.page_count
+        )
 
-            # Parse PDF
-            metadata, text_blocks, images = self.pdf_parser.parse_pdf(input_path)
+        # Log analysis results
+        self.logger.info("PDF Analysis: %d pages, %d text blocks, %d images",
+                         metadata.page_count, len(text_blocks), len(images))
+        self.logger.info("Scan probability: %.2f", metadata.scan_probability)
 
-            # Log analysis results
-            self.logger.info(f"PDF Analysis: {metadata.page_count} pages, "
-                           f"{len(text_blocks)} text blocks, {len(images)} images")
-            self.logger.info(f"Scan probability: {metadata.scan_probability:.2f}")
+        extracted_text, processed_images = self._stage_2_content_extraction(
+            range_results, text_blocks, images, executor, quality_level, task_id, not fast_path
+        )
 
-            return metadata, text_blocks, images
+        if not fast_path:
+            return metadata, text_blocks, extracted_text, processed_images, []
+
+        # The deferred ranges outlive extraction; do not keep their raw images alive
+        for chunk in chunks:
+            chunk.images = []
+        return metadata, text_blocks, extracted_text, processed_images, chunks
+
+    def _stage_1_pdf_analysis(self,
+                            pdf_source: PDFSource,
+                            page_ranges: List[Tuple[int, int]],
+                            executor: Optional[ProcessPoolExecutor],
+                            parse_queue: queue.Queue) -> None:
+        """Stage 1 (parser thread): parse page ranges and queue them in page order"""
+        futures = []
+        read_count = 0
+        try:
+            # Image bytes only need shared memory when they cross a process boundary
+            futures = [
+                self._submit(executor, _parse_page_range, pdf_source, page_range, executor is not None)
+                for page_range in page_ranges
+            ]
+            for future in futures:
+                chunk = future.result()
+                read_count += 1
+                _read_shared_images(chunk.images, chunk.shared_images)
+                chunk.shared_images = None
+                parse_queue.put(chunk)
+        except Exception as e:
+            # Do not leave the shared pool busy with ranges nobody will read,
+            # and free the image blocks of ranges that already finished
+            for future in futures[read_count:]:
+                if not future.cancel():
+                    future.add_done_callback(_discard_shared_images)
+            if isinstance(e, BrokenProcessPool):
+                self._replace_broken_executor(executor)
+            parse_queue.put(e)
+        finally:
+            parse_queue.put(None)
+
+    def _stage_2_ocr_dispatch(self,
+                            pdf_source: PDFSource,
+                            executor: Optional[ProcessPoolExecutor],
+                            parse_queue: queue.Queue,
+                            ocr_queue: queue.Queue) -> None:
+        """
+        Stage 2 (OCR thread): start OCR for parsed ranges whose text layer is too thin
+
+        The fast path is decided from each range's metadata as soon as it is
+        parsed. While every range so far qualifies, OCR is deferred; once one
+        does not, OCR is submitted as usual from then on.
+        """
+        page_hashes = None
+        fast_path = True
+        try:
+            while (chunk := parse_queue.get()) is not None:
+                if isinstance(chunk, Exception):
+                    ocr_queue.put(chunk)
+                    continue
+
+                fast_path = fast_path and self._is_fast_path_eligible(chunk.metadata)
+                if fast_path:
+                    ocr_queue.put((chunk, _OCR_DEFERRED))
+                    continue
+
+                ocr_job, page_hashes = self._start_ocr(pdf_source, executor, chunk, page_hashes)
+                ocr_queue.put((chunk, ocr_job))
+        except Exception as e:
+            ocr_queue.put(e)
+            # Keep draining so the parser thread is not left blocked on a full queue
+            while parse_queue.get() is not None:
+                pass
+        finally:
+            ocr_queue.put(None)
+
+    def _start_ocr(self,
+                   pdf_source: PDFSource,
+                   executor: Optional[ProcessPoolExecutor],
+                   chunk: PageChunkResult,
+                   page_hashes: Optional[List[str]]) -> Tuple[Optional[Tuple], Optional[List[str]]]:
+        """
+        Submit OCR for a parsed range if its text layer is too thin
 
+        Returns:
+            Tuple of (OCR job or None, page fingerprints, computed on first need)
+        """
+        if not self._determine_ocr_need(chunk.total_text_len, chunk.block_count):
+            return None, page_hashes
+        if page_hashes is None:
+            page_hashes = self._get_page_hashes(pdf_source)
+        return self._submit_page_ocr(pdf_source, executor, chunk.page_range, page_hashes), page_hashes
+
+    def _get_page_hashes(self, pdf_source: PDFSource) -> List[str]:
+        """Page fingerprints for the OCR cache, or an empty list if they cannot be computed"""
+        try:
+            return self.pdf_parser.get_page_stream_hashes(pdf_source)
         except Exception as e:
-            self.logger.error(f"PDF analysis failed: {str(e)}")
-            progress_tracker.fail_task(task_id, f"PDF analysis failed: {str(e)}")
-            return None, [], []
+            self.logger.warning("Page fingerprinting failed, OCR results will not be cached: %s", e)
+            return []
+
+    def _submit_page_ocr(self,
+                         pdf_source: PDFSource,
+                         executor: Optional[ProcessPoolExecutor],
+                         page_range: Tuple[int, int],
+                         page_hashes: List[str]) -> Tuple[Dict[int, str], List[Future], Dict[int, str]]:
+        """
+        Look up cached OCR text per page and submit OCR for the remaining pages
+
+        Returns:
+            Tuple of (cached text by page, OCR futures for uncached runs of
+            pages, fingerprints of the uncached pages)
+        """
+        page_texts = {}
+        uncached_hashes = {}
+        uncached_pages = []
+        for page_num in range(page_range[0], page_range[1] + 1):
+            page_hash = page_hashes[page_num] if page_num < len(page_hashes) else None
+            cached_text = self.cache.load_text(f"page-{page_hash}") if page_hash else None
+            if cached_text is not None:
+                page_texts[page_num] = cached_text
+            else:
+                uncached_pages.append(page_num)
+                if page_hash:
+                    uncached_hashes[page_num] = page_hash
+
+        ocr_futures = [
+            self._submit(executor, _ocr_page_range, pdf_source, run)
+            for run in _contiguous_runs(uncached_pages)
+        ]
+        return page_texts, ocr_futures, uncached_hashes
 
     def _stage_2_content_extraction(self,
-                                  input_path: Path,
+                                  range_results: List[Tuple[PageChunkResult, Optional[Tuple]]],
                                   text_blocks: List,
                                   images: List,
+                                  executor: Optional[ProcessPoolExecutor],
                                   quality_level: str,
-                                  task_id: str) -> Tuple[str, List[ProcessedImage]]:
-        """Stage 2: Extract and process content including OCR if needed"""
+                                  task_id: str,
+                                  generate_alt_text: bool = True) -> Tuple[str, List[ProcessedImage]]:
+        """Stage 2: Merge extracted and OCR text per page range and process images"""
         try:
             progress_tracker.update_progress(task_id, 2, "Extracting content...")
 
-            # Determine if OCR is needed
-            ocr_needed = self._determine_ocr_need(text_blocks)
-
-            extracted_text = " ".join(block.text for block in text_blocks)
-
-            # Apply OCR if needed
-            if ocr_needed:
-                progress_tracker.update_progress(task_id, 2, "Applying OCR for scanned content...")
-                ocr_results = self.ocr_service.process_document(input_path)
-
-                # Combine OCR results with existing text
-                ocr_text = " ".join(result.result.text for result in ocr_results)
-                if ocr_text and len(ocr_text) > len(extracted_text):
-                    extracted_text = ocr_text
-                    self.logger.info("Used OCR text due to better extraction")
+            extracted_text = self._merge_range_text(range_results)
 
             # Process images
-            processed_images = self.image_processor.process_images(images, text_blocks, quality_level)
+            processed_images = self.image_processor.process_images(
+                images, text_blocks, quality_level,
+                executor=self.executor, generate_alt_text=generate_alt_text
+            )
 
             return extracted_text, processed_images
 
         except Exception as e:
-            self.logger.error(f"Content extraction failed: {str(e)}")
+            if isinstance(e, BrokenProcessPool):
+                self._replace_broken_executor(executor)
+            self.logger.error("Content extraction failed: %s", e)
             progress_tracker.fail_task(task_id, f"Content extraction failed: {str(e)}")
             return "", []
 
+    def _merge_range_text(self, range_results: List[Tuple[PageChunkResult, Optional[Tuple]]]) -> str:
+        """Join the text of each page range, using its OCR text where that is longer"""
+        # Compare lengths without joining, then join the winning pieces once
+        text_pieces = []
+        for chunk, ocr_job in range_results:
+            if ocr_job is not None:
+                page_texts, ocr_futures, uncached_hashes = ocr_job
+                for future in ocr_futures:
+                    for page_num, page_text in future.result():
+                        page_texts[page_num] = page_text
+                        if page_num in uncached_hashes:
+                            self.cache.save_text(f"page-{uncached_hashes[page_num]}", page_text)
+                ocr_text = " ".join(page_texts[page_num] for page_num in sorted(page_texts))
+
+                # Length of " ".join(block.text for block in blocks)
+                range_length = chunk.total_text_len + max(chunk.block_count - 1, 0)
+                if ocr_text and len(ocr_text) > range_length:
+                    text_pieces.append(ocr_text)
+                    self.logger.info("Used OCR text due to better extraction")
+                    continue
+
+            text_pieces.extend(block.text for block in chunk.text_blocks)
+
+        return " ".join(text_pieces)
+
+    def _run_deferred_ocr(self,
+                          input_path: Path,
+                          pdf_bytes: bytes,
+                          deferred_ranges: List[PageChunkResult],
+                          extracted_text: str) -> str:
+        """
+        Run the OCR held back for the fast path once it has failed
+
+        Returns:
+            Extracted text merged with the OCR results, or the text as it was
+            if OCR fails
+        """
+        executor = self.executor if len(deferred_ranges) > 1 else None
+        pdf_source = input_path if executor is not None else pdf_bytes
+        try:
+            page_hashes = None
+            range_results = []
+            for chunk in deferred_ranges:
+                ocr_job, page_hashes = self._start_ocr(pdf_source, executor, chunk, page_hashes)
+                range_results.append((chunk, ocr_job))
+
+            if all(ocr_job is None for _, ocr_job in range_results):
+                return extracted_text
+            return self._merge_range_text(range_results)
+
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                self._replace_broken_executor(executor)
+            self.logger.warning("Deferred OCR failed, keeping the extracted text: %s", e)
+            return extracted_text
+
+    def _get_page_ranges(self, page_count: int) -> List[Tuple[int, int]]:
+        """Split the document into one page range per worker"""
+        return _split_page_ranges(page_count, _get_max_workers(page_count, _available_ram_gb()))
+
+    def _submit(self, executor: Optional[ProcessPoolExecutor], worker, *args) -> Future:
+        """Submit a worker to the pool, or run it inline when there is no pool"""
+        if executor is not None:
+            try:
+                return executor.submit(worker, *args)
+            except BrokenProcessPool:
+                return self._replace_broken_executor(executor).submit(worker, *args)
+
+        future = Future()
+        try:
+            future.set_result(worker(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def _is_fast_path_eligible(self, metadata: PDFMetadata) -> bool:
+        """Check if the PDF has a text layer throughout and a bookmark outline"""
+        return metadata.has_bookmarks and metadata.scan_probability <= _FAST_PATH_MAX_SCAN_PROBABILITY
+
+    def _fast_path_generate(self,
+                            pdf_bytes: bytes,
+                            text_blocks: List,
+                            images: List[ProcessedImage],
+                            metadata_dict: Dict[str, Any],
+                            output_path: Path,
+                            task_id: str) -> Any:
+        """
+        Generate the EPUB straight from the bookmark outline
+
+        Skips chapter detection and AI enhancement. Returns the chapter
+        structure on success, or None so the caller runs the full pipeline.
+        """
+        try:
+            progress_tracker.update_progress(task_id, 3, "Reading document outline...")
+
+            with self.pdf_parser.open_document(pdf_bytes) as doc:
+                chapter_structure = self.chapter_detector.detect_chapters_from_bookmarks(doc)
+            if not chapter_structure.chapters:
+                return None
+
+            epub_metadata = self.epub_generator.generate_metadata(metadata_dict)
+            chapters = self.epub_generator.create_chapters_from_text_blocks(
+                text_blocks, chapter_structure.chapters, metadata_dict
+            )
+
+            if not self._stage_5_epub_generation(output_path, chapters, epub_metadata, images, task_id):
+                return None
+
+            self.logger.info("Fast path: %d chapters from bookmarks", len(chapters))
+            return chapter_structure
+
+        except Exception as e:
+            self.logger.warning("Fast path failed, running full pipeline: %s", e)
+            return None
+
     def _stage_3_structure_recognition(self,
                                     text_blocks: List,
-                                    metadata: PDFMetadata,
+                                    metadata_dict: Dict[str, Any],
                                     task_id: str) -> Any:
         """Stage 3: Recognize document structure and chapters"""
         try:
@@ -272,38 +929,47 @@ class ConversionPipeline:
             # Use chapter detector to find structure
             # Note: This would need the actual PDF document object
             # For now, return a simple structure
-            chapter_structure = self.chapter_detector.detect_chapters(None, text_blocks, metadata.__dict__)
+            chapter_structure = self.chapter_detector.detect_chapters(None, text_blocks, metadata_dict)
 
-            self.logger.info(f"Structure recognition: {len(chapter_structure.chapters)} chapters detected")
+            self.logger.info("Structure recognition: %d chapters detected", len(chapter_structure.chapters))
             return chapter_structure
 
         except Exception as e:
-            self.logger.error(f"Structure recognition failed: {str(e)}")
+            self.logger.error("Structure recognition failed: %s", e)
             progress_tracker.fail_task(task_id, f"Structure recognition failed: {str(e)}")
             return None
 
     def _stage_4_ai_enhancement(self,
+                              text_blocks: List,
                               extracted_text: str,
                               chapter_structure: Any,
-                              metadata: PDFMetadata,
+                              metadata_dict: Dict[str, Any],
                               task_id: str) -> Tuple[EpubMetadata, List[EpubChapter]]:
         """Stage 4: Enhance content using AI"""
         try:
             progress_tracker.update_progress(task_id, 4, "Enhancing content with AI...")
 
-            # Generate metadata
-            epub_metadata = self.epub_generator.generate_metadata(metadata.__dict__)
+            # Generate metadata; not cached, since its identifier and dates are per conversion
+            epub_metadata = self.epub_generator.generate_metadata(metadata_dict)
+
+            # Chapters are deterministic for the same text, structure and metadata
+            cache_key = self.cache.hash_text(
+                extracted_text + repr(chapter_structure) + repr(metadata_dict)
+            ) + ".ai"
+            cached_chapters = self.cache.load_object(cache_key)
+            if cached_chapters is not None:
+                return epub_metadata, cached_chapters
 
             # Create chapters
             if chapter_structure and hasattr(chapter_structure, 'chapters'):
                 chapters = self.epub_generator.create_chapters_from_text_blocks(
-                    [], chapter_structure.chapters, metadata.__dict__
+                    text_blocks, chapter_structure.chapters, metadata_dict
                 )
             else:
                 # Create single chapter if no structure detected
                 chapters = [EpubChapter(
                     chapter_id="chapter_001",
-                    title=metadata.title or "Document",
+                    title=metadata_dict.get('title') or "Document",
                     content=extracted_text,
                     file_name="chapter_001.xhtml",
                     level=1,
@@ -311,10 +977,11 @@ class ConversionPipeline:
                     images=[]
                 )]
 
+            self.cache.save_object(cache_key, chapters)
             return epub_metadata, chapters
 
         except Exception as e:
-            self.logger.error(f"AI enhancement failed: {str(e)}")
+            self.logger.error("AI enhancement failed: %s", e)
             progress_tracker.fail_task(task_id, f"AI enhancement failed: {str(e)}")
             return None, []
 
@@ -333,17 +1000,17 @@ class ConversionPipeline:
 
             # Generate EPUB
             success = self.epub_generator.generate_epub(
-                output_path, chapters, metadata, image_bytes
+                output_path, chapters, metadata, image_bytes, executor=self.executor
             )
 
             if success:
                 progress_tracker.update_progress(task_id, 5, "EPUB generation completed", 100)
-                self.logger.info(f"EPUB generated successfully: {output_path}")
+                self.logger.info("EPUB generated successfully: %s", output_path)
 
             return success
 
         except Exception as e:
-            self.logger.error(f"EPUB generation failed: {str(e)}")
+            self.logger.error("EPUB generation failed: %s", e)
             progress_tracker.fail_task(task_id, f"EPUB generation failed: {str(e)}")
             return False
 
@@ -381,19 +1048,16 @@ class ConversionPipeline:
                 return self._create_failure_result(f"Calibre conversion failed: {calibre_result.error_message}", start_time)
 
         except Exception as e:
-            self.logger.error(f"Calibre conversion failed: {str(e)}")
+            self.logger.error("Calibre conversion failed: %s", e)
             return self._create_failure_result(f"Calibre conversion exception: {str(e)}", start_time)
 
-    def _determine_ocr_need(self, text_blocks: List) -> bool:
-        """Determine if OCR is needed based on text extraction results"""
-        if not text_blocks:
+    def _determine_ocr_need(self, total_text_len: int, block_count: int) -> bool:
+        """Determine if OCR is needed based on the extracted text length and block count"""
+        if not block_count:
             return True
 
-        total_text = sum(len(block.text) for block in text_blocks)
-        avg_text_per_block = total_text / len(text_blocks)
-
-        # If very little text extracted, likely need OCR
-        return avg_text_per_block < 50
+        # If very little text extracted per block, likely need OCR
+        return total_text_len / block_count < 50
 
     def _calculate_quality_score(self,
                                metadata: PDFMetadata,
@@ -401,29 +1065,17 @@ class ConversionPipeline:
                                images: List[ProcessedImage],
                                enhanced_metadata: EpubMetadata) -> float:
         """Calculate overall quality score for the conversion"""
-        score = 50.0  # Base score
-
-        # Metadata quality
-        if metadata.title and metadata.author:
-            score += 10
-        if metadata.has_bookmarks:
-            score += 15
-
-        # Chapter detection quality
+        chapter_confidence = 0.0
         if chapter_structure and hasattr(chapter_structure, 'total_confidence'):
-            score += chapter_structure.total_confidence * 0.2
-
-        # Image processing quality
-        if images:
-            score += min(len(images) * 2, 15)  # Up to 15 points for images
-
-        # Text extraction quality
-        if metadata.scan_probability < 0.3:  # Low scan probability = good text extraction
-            score += 10
-        elif metadata.scan_probability < 0.7:
-            score += 5
-
-        return min(100.0, score)
+            chapter_confidence = chapter_structure.total_confidence
+
+        return _score_kernel(
+            bool(metadata.title and metadata.author),
+            bool(metadata.has_bookmarks),
+            float(chapter_confidence),
+            len(images) if images else 0,
+            float(metadata.scan_probability)
+        )
 
     def _should_trigger_fallback(self, result: ConversionResult) -> bool:
         """Determine if Calibre fallback should be triggered"""
@@ -435,11 +1087,17 @@ class ConversionPipeline:
 
         return False
 
-    def _is_custom_pipeline_suitable(self, input_path: Path) -> bool:
+    def _is_custom_pipeline_suitable(self, pdf_source: PDFSource, file_hash: str = None) -> bool:
         """Check if custom pipeline is suitable for this PDF"""
         try:
+            # Rule out non-PDFs without opening the document; an /Encrypt marker
+            # alone is not enough, as files with only an owner password open fine
+            header = self.pdf_parser.peek_header(pdf_source)
+            if not header['has_pdf_header']:
+                return False
+
             # Quick validation
-            validation = self.pdf_parser.validate_pdf(input_path)
+            validation = self.pdf_parser.validate_pdf(pdf_source)
             if not validation.get('is_valid', False):
                 return False
 
@@ -447,6 +1105,10 @@ class ConversionPipeline:
             if validation.get('is_encrypted', False):
                 return False
 
+            # Keep the validation so stage 1 does not reopen the document for it
+            if file_hash is not None:
+                self._validation_cache[file_hash] = validation
+
             return True
 
         except Exception:
@@ -9,8 +9,18 @@ This module provides comprehensive EPUB generation capabilities:
 - Navigation and reading order management
 """
 
+import bisect
+import hashlib
+import os
+import re
+import tempfile
 import uuid
+import zipfile
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from itertools import repeat
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Any
@@ -19,285 +29,64 @@ import ebooklib
 from ebooklib import epub
 from utils.logging_config import get_logger
 
+# Buffer size for writing the EPUB archive
+_EPUB_WRITE_BUFFER_SIZE = 1024 * 1024
 
-@dataclass
-class EpubChapter:
-    """Represents a chapter in the EPUB"""
-    chapter_id: str
-    title: str
-    content: str
-    file_name: str
-    level: int  # 1 for main chapters, 2 for subsections
-    page_num: int
-    images: List[str]  # List of image IDs
-
-
-@dataclass
-class EpubMetadata:
-    """EPUB metadata information"""
-    title: str
-    author: str
-    language: str
-    identifier: str
-    publisher: str
-    description: str
-    creation_date: datetime
-    modification_date: datetime
-    tags: List[str]
-    source_info: Dict[str, Any]
-
-
-class EpubGenerator:
-    """Advanced EPUB generator with professional formatting"""
-
-    def __init__(self):
-        self.logger = get_logger("epub_generator")
-        self.chinese_css = self._create_chinese_css()
-        self.english_css = self._create_english_css()
-
-    def generate_epub(self,
-                     output_path: Path,
-                     chapters: List[EpubChapter],
-                     metadata: EpubMetadata,
-                     images: Dict[str, bytes] = None,
-                     toc_structure: List[Dict] = None) -> bool:
-        """
-        Generate EPUB file from chapters and metadata
-
-        Args:
-            output_path: Path where EPUB should be saved
-            chapters: List of EpubChapter objects
-            metadata: EpubMetadata object
-            images: Dictionary of image_id -> image_data
-            toc_structure: Optional custom table of contents structure
-
-        Returns:
-            True if generation successful, False otherwise
-        """
-        try:
-            self.logger.info(f"Generating EPUB: {len(chapters)} chapters, {len(images) if images else 0} images")
-
-            # Create EPUB book
-            book = epub.EpubBook()
-
-            # Set metadata
-            self._set_metadata(book, metadata)
-
-            # Add CSS styles
-            self._add_styles(book, metadata.language)
-
-            # Add chapters
-            epub_chapters = []
-            for chapter in chapters:
-                epub_chapter = self._create_epub_chapter(chapter, images)
-                book.add_item(epub_chapter)
-                epub_chapters.append(epub_chapter)
-
-            # Add images
-            if images:
-                self._add_images(book, images)
-
-            # Create table of contents
-            toc = self._create_table_of_contents(epub_chapters, toc_structure)
-            book.toc = toc
-
-            # Add navigation
-            book.add_item(epub.EpubNcx())
-            book.add_item(epub.EpubNav())
-
-            # Define spine
-            book.spine = ['nav'] + epub_chapters
-
-            # Write EPUB file
-            epub.write_epub(str(output_path), book)
-
-            self.logger.info(f"EPUB generated successfully: {output_path}")
-            return True
-
-        except Exception as e:
-            self.logger.error(f"EPUB generation failed: {str(e)}")
-            return False
-
-    def _set_metadata(self, book: epub.EpubBook, metadata: EpubMetadata):
-        """Set EPUB metadata"""
-        book.set_identifier(metadata.identifier)
-        book.set_title(metadata.title)
-        book.set_language(metadata.language)
-        book.add_author(metadata.author)
-
-        # Optional metadata
-        if metadata.publisher:
-            book.add_metadata('DC', 'publisher', metadata.publisher)
+# Chapter XHTML larger than this spills from memory to a temp file
+_CHAPTER_SPOOL_MAX_SIZE = 4 * 1024 * 1024
 
-        if metadata.description:
-            book.add_metadata('DC', 'description', metadata.description)
+# Books with less chapter text than this render faster in-process than in a pool
+_PARALLEL_RENDER_MIN_CHARS = 8 * 1024 * 1024
+_PARALLEL_RENDER_CHUNKSIZE = 8
 
-        if metadata.tags:
-            for tag in metadata.tags:
-                book.add_metadata('DC', 'subject', tag)
+# HTML special characters and their entities; "&" must be replaced first.
+# Chained str.replace scans with memchr and beats str.translate by an order
+# of magnitude on chapter-sized text, since translate maps one char at a time
+_HTML_ESCAPES = (
+    ("&", "&amp;"),
+    ('"', "&quot;"),
+    ("'", "&#39;"),
+    (">", "&gt;"),
+    ("<", "&lt;"),
+)
 
-        # Dates
-        book.add_metadata('DC', 'date', metadata.creation_date.strftime('%Y-%m-%d'))
-        book.add_metadata('DC', 'modified', metadata.modification_date.strftime('%Y-%m-%d'))
+# Any character _escape_html would replace
+_HTML_SPECIAL_RE = re.compile(r'[&<>"\']')
 
-        # Source information
-        if metadata.source_info:
-            for key, value in metadata.source_info.items():
-                book.add_metadata('DC', f'source-{key}', str(value))
-
-    def _add_styles(self, book: epub.EpubBook, language: str):
-        """Add CSS styles based on language"""
-        if 'zh' in language.lower():
-            # Chinese styles
-            nav_css = epub.EpubItem(
-                uid="nav_css",
-                file_name="style/nav.css",
-                media_type="text/css",
-                content=self.chinese_css
-            )
-        else:
-            # English styles
-            nav_css = epub.EpubItem(
-                uid="nav_css",
-                file_name="style/nav.css",
-                media_type="text/css",
-                content=self.english_css
-            )
-
-        book.add_item(nav_css)
-
-    def _create_chapter_html(self, chapter: EpubChapter, images: Dict[str, bytes] = None) -> str:
-        """Create HTML content for a chapter"""
-        # Start HTML document
-        html_content = f"""<!DOCTYPE html>
+# Fixed chapter XHTML around the content; the head takes the escaped title twice
+_CHAPTER_HEAD_TEMPLATE = """<!DOCTYPE html>
 <html xmlns="http://www.w3.org/1999/xhtml">
 <head>
-    <title>{self._escape_html(chapter.title)}</title>
+    <title>%s</title>
     <meta charset="utf-8"/>
     <link rel="stylesheet" type="text/css" href="../style/nav.css"/>
 </head>
 <body>
     <div class="chapter">
-        <h1 class="chapter-title">{self._escape_html(chapter.title)}</h1>
+        <h1 class="chapter-title">%s</h1>
         <div class="chapter-content">
 """
-
-        # Add chapter content with image processing
-        processed_content = self._process_chapter_content(chapter.content, images)
-        html_content += processed_content
-
-        # Close HTML
-        html_content += """
+_CHAPTER_TAIL = """
         </div>
     </div>
 </body>
 </html>
 """
 
-        return html_content
-
-    def _process_chapter_content(self, content: str, images: Dict[str, bytes] = None) -> str:
-        """Process chapter content and embed images"""
-        if not images:
-            return f"<p>{self._escape_html(content)}</p>"
-
-        # For now, simple paragraph processing
-        # In a more advanced implementation, you'd parse and process images
-        paragraphs = content.split('\n\n')
-        html_paragraphs = []
-
-        for paragraph in paragraphs:
-            paragraph = paragraph.strip()
-            if paragraph:
-                html_paragraphs.append(f"<p>{self._escape_html(paragraph)}</p>")
-
-        return '\n'.join(html_paragraphs)
+# CJK Unified Ideographs, used to sniff Chinese text
+_CJK_RE = re.compile(r'[\u4e00-\u9fff]')
 
-    def _escape_html(self, text: str) -> str:
-        """Escape HTML special characters"""
-        html_escape_table = {
-            "&": "&amp;",
-            '"': "&quot;",
-            "'": "&#39;",
-            ">": "&gt;",
-            "<": "&lt;",
-        }
-        return "".join(html_escape_table.get(c, c) for c in text)
-
-    def _create_epub_chapter(self, chapter: EpubChapter, images: Dict[str, bytes] = None) -> epub.EpubHtml:
-        """Create an EPUB chapter"""
-        # Generate HTML content
-        html_content = self._create_chapter_html(chapter, images)
-
-        # Create EPUB HTML object
-        epub_chapter = epub.EpubHtml(
-            title=chapter.title,
-            file_name=chapter.file_name,
-            content=html_content,
-            lang='zh' if 'zh' in chapter.title else 'en'
-        )
-
-        return epub_chapter
-
-    def _add_images(self, book: epub.EpubBook, images: Dict[str, bytes]):
-        """Add images to EPUB"""
-        for image_id, image_data in images.items():
-            try:
-                # Determine image format
-                if image_data.startswith(b'\x89PNG'):
-                    media_type = 'image/png'
-                    file_ext = 'png'
-                elif image_data.startswith(b'\xff\xd8'):
-                    media_type = 'image/jpeg'
-                    file_ext = 'jpg'
-                else:
-                    # Default to PNG
-                    media_type = 'image/png'
-                    file_ext = 'png'
-
-                # Create image item
-                image_item = epub.EpubItem(
-                    uid=image_id,
-                    file_name=f"images/{image_id}.{file_ext}",
-                    media_type=media_type,
-                    content=image_data
-                )
-
-                book.add_item(image_item)
-
-            except Exception as e:
-                self.logger.warning(f"Failed to add image {image_id}: {str(e)}")
-
-    def _create_table_of_contents(self, chapters: List[epub.EpubHtml], custom_structure: List[Dict] = None) -> List:
-        """Create table of contents structure"""
-        if custom_structure:
-            # Use custom structure if provided
-            return self._build_custom_toc(custom_structure, chapters)
-        else:
-            # Build TOC from chapters
-            toc = []
-            for chapter in chapters:
-                toc.append(chapter)
-            return toc
-
-    def _build_custom_toc(self, structure: List[Dict], chapters: List[epub.EpubHtml]) -> List:
-        """Build table of contents from custom structure"""
-        # This is a simplified implementation
-        # In practice, you'd parse the custom structure and build nested TOC
-        toc = []
-
-        for item in structure:
-            if item.get('type') == 'chapter':
-                # Find corresponding chapter
-                chapter = next((c for c in chapters if c.title == item.get('title')), None)
-                if chapter:
-                    toc.append(chapter)
-
-        return toc
+# Image media type and file extension keyed by leading magic bytes
+_IMAGE_MAGIC = {
+    b'\x89PNG': ('image/png', 'png'),
+    b'\xff\xd8\xff': ('image/jpeg', 'jpg'),
+    b'GIF8': ('image/gif', 'gif'),
+    b'RIFF': ('image/webp', 'webp'),
+}
+_DEFAULT_IMAGE_TYPE = ('image/png', 'png')
 
-    def _create_chinese_css(self) -> str:
-        """Create CSS styles optimized for Chinese content"""
-        return """
+# CSS styles optimized for Chinese content
+_CHINESE_CSS = """
 /* Chinese optimized EPUB styles */
 body {
     font-family: "Noto Sans CJK SC", "PingFang SC", "Microsoft YaHei", sans-serif;
@@ -440,9 +229,8 @@ pre {
 }
 """
 
-    def _create_english_css(self) -> str:
-        """Create CSS styles optimized for English content"""
-        return """
+# CSS styles optimized for English content
+_ENGLISH_CSS = """
 /* English optimized EPUB styles */
 body {
     font-family: "Georgia", "Times New Roman", serif;
@@ -580,6 +368,416 @@ pre {
 }
 """
 
+# Stylesheets encoded once for every generated book
+_CHINESE_CSS_BYTES = _CHINESE_CSS.encode('utf-8')
+_ENGLISH_CSS_BYTES = _ENGLISH_CSS.encode('utf-8')
+
+
+@dataclass
+class EpubChapter:
+    """Represents a chapter in the EPUB"""
+    chapter_id: str
+    title: str
+    content: str
+    file_name: str
+    level: int  # 1 for main chapters, 2 for subsections
+    page_num: int
+    images: List[str]  # List of image IDs
+
+
+@dataclass
+class EpubMetadata:
+    """EPUB metadata information"""
+    title: str
+    author: str
+    language: str
+    identifier: str
+    publisher: str
+    description: str
+    creation_date: datetime
+    modification_date: datetime
+    tags: List[str]
+    source_info: Dict[str, Any]
+
+    def __post_init__(self):
+        # Date strings written to the OPF, formatted once per metadata object
+        self._creation_date_str = self.creation_date.date().isoformat()
+        self._modification_date_str = self.modification_date.date().isoformat()
+
+    def __setstate__(self, state):
+        # Objects pickled before the date strings existed still get them
+        self.__dict__.update(state)
+        self.__post_init__()
+
+
+class _EpubWriter(epub.EpubWriter):
+    """EPUB writer that stores image members instead of deflating them"""
+
+    def _write_items(self):
+        # Same layout as ebooklib's writer; PNG/JPEG/GIF/WebP data is already
+        # compressed, so deflating it again costs CPU without saving bytes
+        for item in self.book.get_items():
+            if isinstance(item, epub.EpubNcx):
+                self.out.writestr(f"{self.book.FOLDER_NAME}/{item.file_name}", self._get_ncx())
+            elif isinstance(item, epub.EpubNav):
+                self.out.writestr(f"{self.book.FOLDER_NAME}/{item.file_name}", self._get_nav(item))
+            elif item.manifest:
+                compress_type = zipfile.ZIP_STORED if item.media_type.startswith('image/') else None
+                self.out.writestr(
+                    f"{self.book.FOLDER_NAME}/{item.file_name}", item.get_content(), compress_type=compress_type
+                )
+            else:
+                self.out.writestr(item.file_name, item.get_content())
+
+
+class _SpooledEpubHtml(epub.EpubHtml):
+    """
+    EpubHtml whose XHTML source waits in a spooled temp file until written
+
+    The source is only read back while ebooklib serializes this chapter, so
+    a book's chapters are never all resident as strings at once.
+    """
+
+    def __init__(self, spool, **kwargs):
+        super().__init__(**kwargs)
+        self._spool = spool
+
+    def get_content(self, default=None):
+        with self._source_loaded():
+            return super().get_content(default)
+
+    def get_body_content(self):
+        with self._source_loaded():
+            return super().get_body_content()
+
+    @contextmanager
+    def _source_loaded(self):
+        """Hold the UTF-8 XHTML source in content only for the duration of a read"""
+        self._spool.seek(0)
+        self.content = self._spool.read()
+        try:
+            yield
+        finally:
+            self.content = b''
+
+    def close(self):
+        """Release the spooled source"""
+        self._spool.close()
+
+
+# Generator reused by every chapter a render worker handles
+_worker_generator = None
+
+
+def _render_chapter(chapter: EpubChapter, image_ids: Dict[str, None]) -> bytes:
+    """Worker: render one chapter's XHTML source as UTF-8 bytes"""
+    global _worker_generator
+    if _worker_generator is None:
+        _worker_generator = EpubGenerator()
+    return _worker_generator._create_chapter_html(chapter, image_ids)
+
+
+class EpubGenerator:
+    """Advanced EPUB generator with professional formatting"""
+
+    def __init__(self):
+        self.logger = get_logger("epub_generator")
+
+    def generate_epub(self,
+                     output_path: Path,
+                     chapters: List[EpubChapter],
+                     metadata: EpubMetadata,
+                     images: Dict[str, bytes] = None,
+                     toc_structure: List[Dict] = None,
+                     executor: Optional[ProcessPoolExecutor] = None) -> bool:
+        """
+        Generate EPUB file from chapters and metadata
+
+        Args:
+            output_path: Path where EPUB should be saved
+            chapters: List of EpubChapter objects
+            metadata: EpubMetadata object
+            images: Dictionary of image_id -> image_data
+            toc_structure: Optional custom table of contents structure
+            executor: Process pool owned by the caller for rendering large
+                books; chapters are rendered in-process when it is None
+
+        Returns:
+            True if generation successful, False otherwise
+        """
+        epub_chapters = []
+        try:
+            self.logger.info(f"Generating EPUB: {len(chapters)} chapters, {len(images) if images else 0} images")
+
+            # Create EPUB book
+            book = epub.EpubBook()
+
+            # Set metadata
+            self._set_metadata(book, metadata)
+
+            # Add CSS styles
+            self._add_styles(book, metadata.language)
+
+            # Add chapters
+            for epub_chapter in self._create_epub_chapters(chapters, metadata.language, images, executor):
+                book.add_item(epub_chapter)
+                epub_chapters.append(epub_chapter)
+
+            # Add images
+            if images:
+                self._add_images(book, images)
+
+            # Create table of contents
+            toc = self._create_table_of_contents(epub_chapters, toc_structure)
+            book.toc = toc
+
+            # Add navigation
+            book.add_item(epub.EpubNcx())
+            book.add_item(epub.EpubNav())
+
+            # Define spine
+            book.spine = ['nav'] + epub_chapters
+
+            # Write EPUB file
+            self._write_epub_file(output_path, book)
+
+            self.logger.info(f"EPUB generated successfully: {output_path}")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"EPUB generation failed: {str(e)}")
+            return False
+
+        finally:
+            for epub_chapter in epub_chapters:
+                epub_chapter.close()
+
+    def _write_epub_file(self, output_path: Path, book: epub.EpubBook):
+        """
+        Write the EPUB through a large buffer into a temp file, then move it into place
+
+        Batching the many small zip writes cuts syscalls, and readers never see
+        a partially written EPUB at output_path.
+        """
+        output_path = Path(output_path)
+        fd, tmp_path = tempfile.mkstemp(dir=output_path.parent, suffix='.epub.tmp')
+        try:
+            with os.fdopen(fd, 'wb', buffering=_EPUB_WRITE_BUFFER_SIZE) as f:
+                writer = _EpubWriter(f, book)
+                writer.process()
+                writer.write()
+            os.replace(tmp_path, output_path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _set_metadata(self, book: epub.EpubBook, metadata: EpubMetadata):
+        """Set EPUB metadata"""
+        book.set_identifier(metadata.identifier)
+        book.set_title(metadata.title)
+        book.set_language(metadata.language)
+        book.add_author(metadata.author)
+
+        # Write the remaining DC entries straight into the metadata map,
+        # in the same (value, attributes) form add_metadata would store
+        dc = book.metadata.setdefault(epub.NAMESPACES['DC'], {})
+
+        # Optional metadata
+        if metadata.publisher:
+            dc.setdefault('publisher', []).append((metadata.publisher, None))
+
+        if metadata.description:
+            dc.setdefault('description', []).append((metadata.description, None))
+
+        if metadata.tags:
+            dc.setdefault('subject', []).extend((tag, None) for tag in metadata.tags)
+
+        # Dates
+        dc.setdefault('date', []).append((metadata._creation_date_str, None))
+        dc.setdefault('modified', []).append((metadata._modification_date_str, None))
+
+        # Source information
+        if metadata.source_info:
+            for key, value in metadata.source_info.items():
+                dc.setdefault(f'source-{key}', []).append((str(value), None))
+
+    def _add_styles(self, book: epub.EpubBook, language: str):
+        """Add CSS styles based on language"""
+        # Each book needs its own item, but the encoded stylesheets are shared
+        nav_css = epub.EpubItem(
+            uid="nav_css",
+            file_name="style/nav.css",
+            media_type="text/css",
+            content=_CHINESE_CSS_BYTES if 'zh' in language.lower() else _ENGLISH_CSS_BYTES
+        )
+
+        book.add_item(nav_css)
+
+    def _create_chapter_html(self, chapter: EpubChapter, images: Dict[str, bytes] = None) -> bytes:
+        """Create HTML content for a chapter, encoded as UTF-8"""
+        return ''.join(self._chapter_html_parts(chapter, images)).encode('utf-8')
+
+    def _render_chapter_to_spool(self, chapter: EpubChapter, images: Dict[str, bytes] = None) -> tempfile.SpooledTemporaryFile:
+        """Write a chapter's HTML to a temp file that stays in memory unless it is large"""
+        spool = tempfile.SpooledTemporaryFile(max_size=_CHAPTER_SPOOL_MAX_SIZE, mode='w+b')
+        for part in self._chapter_html_parts(chapter, images):
+            spool.write(part.encode('utf-8'))
+        return spool
+
+    def _chapter_html_parts(self, chapter: EpubChapter, images: Dict[str, bytes] = None) -> List[str]:
+        """HTML fragments of a chapter document, in order"""
+        title = self._escape_html(chapter.title)
+
+        return [
+            # Start HTML document
+            _CHAPTER_HEAD_TEMPLATE % (title, title),
+            # Add chapter content with image processing
+            self._process_chapter_content(chapter.content, images),
+            # Close HTML
+            _CHAPTER_TAIL,
+        ]
+
+    def _process_chapter_content(self, content: str, images: Dict[str, bytes] = None) -> str:
+        """Process chapter content and embed images"""
+        if not images:
+            return f"<p>{self._escape_html(content)}</p>"
+
+        # For now, simple paragraph processing
+        # In a more advanced implementation, you'd parse and process images
+        # Escaping leaves newlines alone, so escape the whole text once and split after
+        paragraphs = (paragraph.strip() for paragraph in self._escape_html(content).split('\n\n'))
+
+        return '\n'.join(f"<p>{paragraph}</p>" for paragraph in paragraphs if paragraph)
+
+    def _escape_html(self, text: str) -> str:
+        """Escape HTML special characters"""
+        # Most prose has nothing to escape; return it as-is without a copy
+        if _HTML_SPECIAL_RE.search(text) is None:
+            return text
+        for char, entity in _HTML_ESCAPES:
+            text = text.replace(char, entity)
+        return text
+
+    def _create_epub_chapters(self, chapters: List[EpubChapter], language: str,
+                              images: Dict[str, bytes] = None,
+                              executor: Optional[ProcessPoolExecutor] = None) -> List[epub.EpubHtml]:
+        """Create the EPUB chapters, rendering large books in the caller's pool"""
+        total_chars = sum(len(chapter.content) for chapter in chapters)
+        if (executor is None or (os.cpu_count() or 1) < 2 or len(chapters) < 2
+                or total_chars < _PARALLEL_RENDER_MIN_CHARS):
+            return [self._create_epub_chapter(chapter, language, images) for chapter in chapters]
+
+        # Chapter HTML never embeds image bytes, so workers only get the image ids
+        image_ids = dict.fromkeys(images or ())
+        try:
+            rendered = executor.map(
+                _render_chapter, chapters, repeat(image_ids), chunksize=_PARALLEL_RENDER_CHUNKSIZE
+            )
+        except Exception as e:
+            # A broken or shut down pool is the owner's to replace
+            self.logger.warning(f"Render pool unavailable, rendering in-process: {str(e)}")
+            return [self._create_epub_chapter(chapter, language, images) for chapter in chapters]
+
+        epub_chapters = []
+        for chapter, html_bytes in zip(chapters, rendered):
+            spool = tempfile.SpooledTemporaryFile(max_size=_CHAPTER_SPOOL_MAX_SIZE, mode='w+b')
+            spool.write(html_bytes)
+            epub_chapters.append(self._wrap_chapter(chapter, spool, language))
+        return epub_chapters
+
+    def _create_epub_chapter(self, chapter: EpubChapter, language: str,
+                             images: Dict[str, bytes] = None) -> epub.EpubHtml:
+        """Create an EPUB chapter"""
+        # Render HTML content to a spool instead of keeping it as a string
+        return self._wrap_chapter(chapter, self._render_chapter_to_spool(chapter, images), language)
+
+    def _wrap_chapter(self, chapter: EpubChapter, spool: tempfile.SpooledTemporaryFile,
+                      language: str) -> epub.EpubHtml:
+        """Create the EPUB HTML object for a chapter rendered to spool"""
+        epub_chapter = _SpooledEpubHtml(
+            spool,
+            title=chapter.title,
+            file_name=chapter.file_name,
+            lang=language
+        )
+
+        return epub_chapter
+
+    def _add_images(self, book: epub.EpubBook, images: Dict[str, bytes]):
+        """Add images to EPUB"""
+        failed = []
+        # Repeated figures (logos, page ornaments) are stored once, under the first id seen
+        seen_digests = set()
+        duplicates = 0
+        for image_id, image_data in images.items():
+            digest = hashlib.blake2b(image_data, digest_size=16).digest()
+            if digest in seen_digests:
+                duplicates += 1
+                continue
+            seen_digests.add(digest)
+
+            # Determine image format from the magic bytes, defaulting to PNG
+            head = image_data[:4]
+            media_type, file_ext = _IMAGE_MAGIC.get(head) or _IMAGE_MAGIC.get(head[:3]) or _DEFAULT_IMAGE_TYPE
+            if file_ext == 'webp' and image_data[8:12] != b'WEBP':
+                media_type, file_ext = _DEFAULT_IMAGE_TYPE
+
+            try:
+                book.add_item(epub.EpubItem(
+                    uid=image_id,
+                    file_name=f"images/{image_id}.{file_ext}",
+                    media_type=media_type,
+                    content=image_data
+                ))
+            except Exception as e:
+                failed.append(f"{image_id} ({str(e)})")
+
+        if duplicates:
+            self.logger.debug(f"Skipped {duplicates} duplicate images")
+        if failed:
+            self.logger.warning(f"Failed to add {len(failed)} images: {', '.join(failed)}")
+
+    def _create_table_of_contents(self, chapters: List[epub.EpubHtml], custom_structure: List[Dict] = None) -> List:
+        """Create table of contents structure"""
+        if custom_structure:
+            # Use custom structure if provided
+            return self._build_custom_toc(custom_structure, chapters)
+        else:
+            # Build TOC from chapters
+            toc = []
+            for chapter in chapters:
+                toc.append(chapter)
+            return toc
+
+    def _build_custom_toc(self, structure: List[Dict], chapters: List[epub.EpubHtml]) -> List:
+        """Build table of contents from custom structure"""
+        # This is a simplified implementation
+        # In practice, you'd parse the custom structure and build nested TOC
+        toc = []
+
+        # Index chapters by title; built in reverse so the first chapter wins on duplicates
+        by_title = {c.title: c for c in reversed(chapters)}
+
+        for item in structure:
+            if item.get('type') == 'chapter':
+                # Find corresponding chapter
+                chapter = by_title.get(item.get('title'))
+                if chapter:
+                    toc.append(chapter)
+
+        return toc
+
+    def _create_chinese_css(self) -> str:
+        """Create CSS styles optimized for Chinese content"""
+        return _CHINESE_CSS
+
+    def _create_english_css(self) -> str:
+        """Create CSS styles optimized for English content"""
+        return _ENGLISH_CSS
+
     def create_chapters_from_text_blocks(self,
                                         text_blocks: List,
                                         chapter_boundaries: List,
@@ -587,13 +785,6 @@ pre {
         """Create EPUB chapters from text blocks and chapter boundaries"""
         chapters = []
 
-        # Group text blocks by pages
-        pages = {}
-        for block in text_blocks:
-            if block.page_num not in pages:
-                pages[block.page_num] = []
-            pages[block.page_num].append(block)
-
         if not chapter_boundaries:
             # No chapters detected, create one big chapter
             all_text = " ".join(block.text for block in text_blocks)
@@ -611,23 +802,23 @@ pre {
             # Create chapters based on boundaries
             sorted_boundaries = sorted(chapter_boundaries, key=lambda b: b.page_num)
 
+            # Stable sort keeps the reading order of blocks within a page
+            sorted_blocks = sorted(text_blocks, key=lambda b: b.page_num)
+            block_pages = [block.page_num for block in sorted_blocks]
+
             for i, boundary in enumerate(sorted_boundaries):
-                # Determine page range for this chapter
+                # Determine the blocks in this chapter's page range
                 start_page = boundary.page_num
+                lo = bisect.bisect_left(block_pages, start_page)
                 if i + 1 < len(sorted_boundaries):
-                    end_page = sorted_boundaries[i + 1].page_num - 1
+                    hi = bisect.bisect_left(block_pages, sorted_boundaries[i + 1].page_num, lo)
                 else:
-                    end_page = max(pages.keys())
+                    hi = len(block_pages)
 
                 # Collect text for this chapter
-                chapter_text = []
+                chapter_text = [block.text for block in sorted_blocks[lo:hi]]
                 chapter_images = []
 
-                for page_num in range(start_page, end_page + 1):
-                    if page_num in pages:
-                        for block in pages[page_num]:
-                            chapter_text.append(block.text)
-
                 # Create chapter
                 chapter_id = f"chapter_{i+1:03d}"
                 chapter = EpubChapter(
@@ -670,8 +861,5 @@ pre {
     def _contains_chinese(self, metadata: Dict) -> bool:
         """Check if metadata contains Chinese characters"""
         text_to_check = f"{metadata.get('title', '')} {metadata.get('author', '')}"
-        return any('\u4e00' <= char <= '\u9fff' for char in text_to_check)
-
+        return _CJK_RE.search(text_to_check) is not None
 
-# Import dataclass
-from dataclasses import dataclass
\ No newline at end of file
@@ -4,34 +4,105 @@ Image Processor Module - Advanced image extraction and optimization
 This module provides comprehensive image processing capabilities:
 - Image extraction from PDF with format detection
 - Size optimization for different quality levels
-- Format conversion (JPEG/PNG optimization)
+- Format conversion (WebP/JPEG/PNG optimization)
 - Image-text association analysis
 - Alt text generation for accessibility
 """
 
+import hashlib
 import io
 import logging
-from dataclasses import dataclass
+import os
+import weakref
+from array import array
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass, replace
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any, Union
+from typing import Dict, List, NamedTuple, Optional, Tuple, Any, Union
 
+import numpy as np
 from PIL import Image, ImageFilter, ImageEnhance
 from utils.logging_config import get_logger
+from conversion_cache import ConversionCache
 
 # Import configuration
 from config import (
     IMAGE_MAX_WIDTH_FAST,
     IMAGE_MAX_WIDTH_STANDARD,
     IMAGE_MAX_WIDTH_HIGH,
+    IMAGE_ALLOW_WEBP,
     CONVERSION_QUALITY_LEVEL
 )
 
+# Colors are counted on a thumbnail no larger than this on either side
+_COLOR_SAMPLE_SIZE = 128
+
+# Images below this size that fit the target width and format are embedded unchanged
+_PASSTHROUGH_MAX_FILE_SIZE = 256 * 1024
+
+# Source formats EPUB readers can display as they are
+_EPUB_IMAGE_FORMATS = {'jpeg', 'png', 'gif', 'webp'}
+
+# Large downscales box-reduce by an integer factor first, leaving LANCZOS at least
+# this much scaling to do; the same default Image.thumbnail uses
+_RESIZE_REDUCING_GAP = 2.0
+
+# Lowest lossy quality tried when searching for the smallest acceptable encode
+_DYNAMIC_QUALITY_FLOOR = 60
+# Side of the square windows SSIM is computed over
+_SSIM_BLOCK = 8
+
+
+
+class _QualitySettings(NamedTuple):
+    """Resize, filter and encoder settings for one quality level"""
+    target_width: int
+    # Built once; None skips sharpening
+    sharpen: Optional[ImageFilter.Filter]
+    jpeg_quality: int
+    webp_quality: int
+    webp_method: int
+    png_optimize: bool
+    png_compress_level: int
+    # SSIM a lossy encode must keep; None encodes once at the maximum quality
+    min_ssim: Optional[float]
+
+
+# Settings per quality level, resolved once per image instead of re-dispatched per step
+_QUALITY_SETTINGS = {
+    # Fast: aggressive sharpening, low compression effort
+    'fast': _QualitySettings(IMAGE_MAX_WIDTH_FAST, ImageFilter.UnsharpMask(radius=1, percent=150, threshold=5),
+                             70, 75, 0, False, 3, None),
+    # Standard: mild sharpening, balanced compression
+    'standard': _QualitySettings(IMAGE_MAX_WIDTH_STANDARD, ImageFilter.UnsharpMask(radius=1, percent=120, threshold=3),
+                                 85, 82, 4, True, 6, 0.94),
+    # High: no extra processing, maximum compression
+    'high': _QualitySettings(IMAGE_MAX_WIDTH_HIGH, None, 95, 90, 6, True, 9, 0.97),
+}
+
+
+def _resolve_settings(quality_level: str) -> _QualitySettings:
+    """Settings for a quality level; unknown levels get the standard settings"""
+    return _QUALITY_SETTINGS.get(quality_level, _QUALITY_SETTINGS['standard'])
+
+
+# Fewer images than this are processed in-process; pool dispatch would cost more
+_PARALLEL_MIN_IMAGES = 4
+
+# Concurrent alt text requests, images per batched request, and seconds allowed per call
+_ALT_TEXT_MAX_WORKERS = 8
+_ALT_TEXT_BATCH_SIZE = 8
+_ALT_TEXT_CALL_TIMEOUT = 30
+
+# Threads writing images to disk in save_images_to_directory
+_SAVE_MAX_WORKERS = 16
+
 
 @dataclass
 class ProcessedImage:
     """Represents a processed image ready for EPUB embedding"""
     image_id: str
-    original_data: bytes
     processed_data: bytes
     original_format: str
     final_format: str
@@ -44,6 +115,11 @@ class ProcessedImage:
     alt_text: Optional[str] = None
     associated_text: Optional[str] = None
     quality_level: str = "standard"
+    # blake2b hex digest of the source bytes, which are not kept once processed
+    source_digest: Optional[str] = None
+    original_data: Optional[bytes] = None
+    # Downscaled JPEG sent for alt text, made while the decoded image is at hand
+    ai_thumbnail_bytes: Optional[bytes] = None
 
 
 @dataclass
@@ -56,16 +132,69 @@ class ImageAssociation:
     suggested_caption: Optional[str] = None
 
 
+def _block_ssim(reference: np.ndarray, candidate: np.ndarray) -> float:
+    """Mean SSIM of two grayscale images over non-overlapping square windows"""
+    height = reference.shape[0] // _SSIM_BLOCK * _SSIM_BLOCK
+    width = reference.shape[1] // _SSIM_BLOCK * _SSIM_BLOCK
+    shape = (height // _SSIM_BLOCK, _SSIM_BLOCK, width // _SSIM_BLOCK, _SSIM_BLOCK)
+    a = reference[:height, :width].reshape(shape)
+    b = candidate[:height, :width].reshape(shape)
+
+    mean_a = a.mean(axis=(1, 3))
+    mean_b = b.mean(axis=(1, 3))
+    var_a = a.var(axis=(1, 3))
+    var_b = b.var(axis=(1, 3))
+    covariance = (a * b).mean(axis=(1, 3)) - mean_a * mean_b
+
+    c1 = (0.01 * 255) ** 2
+    c2 = (0.03 * 255) ** 2
+    ssim = ((2 * mean_a * mean_b + c1) * (2 * covariance + c2)) / (
+        (mean_a ** 2 + mean_b ** 2 + c1) * (var_a + var_b + c2)
+    )
+    return float(ssim.mean())
+
+
+# Processor reused by every image a pool worker handles
+_worker_processor = None
+
+
+def _process_image_worker(pdf_image, quality_level: str, image_id: str, allow_webp: bool,
+                          make_ai_thumbnails: bool) -> 'ProcessedImage':
+    """Worker: decode, resize and re-encode one image"""
+    global _worker_processor
+    if _worker_processor is None:
+        _worker_processor = ImageProcessor()
+    _worker_processor.allow_webp = allow_webp
+    _worker_processor.make_ai_thumbnails = make_ai_thumbnails
+    return _worker_processor._process_single_image(pdf_image, quality_level, image_id)
+
+
 class ImageProcessor:
     """Advanced image processor for PDF to EPUB conversion"""
 
-    def __init__(self, ai_service=None):
+    def __init__(self, ai_service=None, allow_webp: bool = IMAGE_ALLOW_WEBP,
+                 cache: Optional[ConversionCache] = None):
         self.logger = get_logger("image_processor")
         self.ai_service = ai_service
+        self.allow_webp = allow_webp
+        # Alt text requests need a thumbnail of every image
+        self.make_ai_thumbnails = ai_service is not None
+        # Optional disk cache of processed images and alt text, keyed by content hash
+        self.cache = cache
+        # (weak reference to image, color count) of the last image classified
+        self._color_count_cache = None
         self.processed_images = {}
+        # Per-image statistics columns, appended in step with processed_images
+        self._original_sizes = array('q')
+        self._final_sizes = array('q')
+        self._compression_ratios = array('d')
+        self._format_counts: Dict[str, int] = {}
+        self._quality_level_counts: Dict[str, int] = {}
         self.image_counter = 0
 
-    def process_images(self, pdf_images: List, text_blocks: List, quality_level: str = None) -> List[ProcessedImage]:
+    def process_images(self, pdf_images: List, text_blocks: List, quality_level: str = None,
+                       executor: Optional[ProcessPoolExecutor] = None,
+                       generate_alt_text: bool = True) -> List[ProcessedImage]:
         """
         Process and optimize all images from PDF
 
@@ -73,6 +202,10 @@ class ImageProcessor:
             pdf_images: List of image information from PDF parser
             text_blocks: List of text blocks for association analysis
             quality_level: Image quality level (fast/standard/high)
+            executor: Process pool owned by the caller; images are processed
+                serially when it is None
+            generate_alt_text: Whether to request alt text from the AI service;
+                generate_alt_text() can add it later
 
         Returns:
             List of processed images
@@ -85,25 +218,22 @@ class ImageProcessor:
 
             processed_images = []
 
-            for pdf_image in pdf_images:
-                try:
-                    processed_image = self._process_single_image(pdf_image, quality_level)
-                    processed_images.append(processed_image)
-
-                    # Store for reference
-                    self.processed_images[processed_image.image_id] = processed_image
-
-                except Exception as e:
-                    self.logger.warning(f"Failed to process image: {str(e)}")
+            for processed_image in self._process_each_image(pdf_images, quality_level, executor):
+                if processed_image is None:
                     continue
+                processed_images.append(processed_image)
+
+                # Store for reference; repeats share the id of their first occurrence
+                if processed_image.image_id not in self.processed_images:
+                    self._record_processed_image(processed_image)
 
             # Analyze image-text associations
             if processed_images and text_blocks:
                 self._analyze_text_associations(processed_images, text_blocks)
 
             # Generate alt text using AI if available
-            if self.ai_service:
-                self._generate_alt_text(processed_images)
+            if generate_alt_text:
+                self.generate_alt_text(processed_images)
 
             self.logger.info(f"Image processing complete: {len(processed_images)} images processed")
             return processed_images
@@ -112,10 +242,143 @@ class ImageProcessor:
             self.logger.error(f"Image processing failed: {str(e)}")
             return []
 
-    def _process_single_image(self, pdf_image, quality_level: str) -> ProcessedImage:
+    def _process_each_image(self, pdf_images: List, quality_level: str,
+                            executor: Optional[ProcessPoolExecutor] = None) -> List[Optional[ProcessedImage]]:
+        """
+        Process images in order, each distinct image once
+
+        Repeats of an image within the batch (headers, logos) reuse its result
+        and its image id, so the EPUB embeds it once; images seen in an
+        earlier run are taken from the cache. The work is CPU-bound PIL code,
+        so the caller's pool scales it across cores. Failed images are logged
+        and come back as None, for every repeat.
+        """
+        results: List[Optional[ProcessedImage]] = [None] * len(pdf_images)
+        digests = [hashlib.blake2b(pdf_image.image_data, digest_size=16).hexdigest() for pdf_image in pdf_images]
+        cache_keys = [self._image_cache_key(digest, quality_level) for digest in digests]
+        first_index = {}
+        for index, cache_key in enumerate(cache_keys):
+            first_index.setdefault(cache_key, index)
+
+        if len(first_index) < len(pdf_images):
+            self.logger.info(f"Processing {len(first_index)} unique images out of {len(pdf_images)}")
+
+        # Ids are assigned up front so they do not depend on completion order
+        image_ids = {}
+        for index in first_index.values():
+            self.image_counter += 1
+            image_ids[index] = f"img_{self.image_counter:04d}"
+
+        to_process = []
+        for index in first_index.values():
+            cached = self._load_cached_image(cache_keys[index])
+            if cached is not None:
+                results[index] = self._reuse_processed_image(cached, pdf_images[index], image_ids[index])
+            else:
+                to_process.append(index)
+
+        processed = self._run_image_jobs(
+            [pdf_images[index] for index in to_process], quality_level, [image_ids[index] for index in to_process],
+            executor
+        )
+        for index, processed_image in zip(to_process, processed):
+            results[index] = processed_image
+            if processed_image is not None:
+                self._save_cached_image(cache_keys[index], processed_image)
+
+        for index, cache_key in enumerate(cache_keys):
+            first = first_index[cache_key]
+            if first != index and results[first] is not None:
+                results[index] = self._reuse_processed_image(results[first], pdf_images[index], image_ids[first])
+            if results[index] is not None:
+                results[index].source_digest = digests[index]
+
+        return results
+
+    def _run_image_jobs(self, pdf_images: List, quality_level: str, image_ids: List[str],
+                        executor: Optional[ProcessPoolExecutor] = None) -> List[Optional[ProcessedImage]]:
+        """Process images under the given ids, in the pool when there is one and enough images"""
+        futures = None
+        if executor is not None and len(pdf_images) >= _PARALLEL_MIN_IMAGES and (os.cpu_count() or 1) >= 2:
+            futures = []
+            try:
+                for pdf_image, image_id in zip(pdf_images, image_ids):
+                    futures.append(executor.submit(_process_image_worker, pdf_image, quality_level, image_id,
+                                                   self.allow_webp, self.make_ai_thumbnails))
+            except Exception as e:
+                # A broken or shut down pool is the owner's to replace
+                self.logger.warning(f"Image pool unavailable, processing serially: {str(e)}")
+                for future in futures:
+                    future.cancel()
+                futures = None
+
+        if futures is None:
+            results = []
+            for pdf_image, image_id in zip(pdf_images, image_ids):
+                try:
+                    results.append(self._process_single_image(pdf_image, quality_level, image_id))
+                except Exception as e:
+                    self.logger.warning(f"Failed to process image: {str(e)}")
+                    results.append(None)
+            return results
+
+        results = []
+        for image_id, future in zip(image_ids, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                self.logger.warning(f"Failed to process image {image_id}: {str(e)}")
+                results.append(None)
+        return results
+
+    def _image_cache_key(self, digest: str, quality_level: str) -> str:
+        """Cache key covering the image bytes and every setting that affects the output"""
+        lossy_format = 'webp' if self.allow_webp else 'jpeg'
+        return f"image-{digest}.{quality_level}.{lossy_format}"
+
+    def _load_cached_image(self, cache_key: str) -> Optional[ProcessedImage]:
+        """Processed image stored under cache_key, or None on a miss"""
+        if self.cache is None:
+            return None
+        cached = self.cache.load_object(cache_key)
+        return cached if isinstance(cached, ProcessedImage) else None
+
+    def _save_cached_image(self, cache_key: str, processed_image: ProcessedImage):
+        """Store the encoded result of an image, without per-occurrence details"""
+        if self.cache is None:
+            return
+        self.cache.save_object(cache_key, replace(
+            processed_image, position_info={}, alt_text=None, associated_text=None
+        ))
+
+    def _reuse_processed_image(self, processed_image: ProcessedImage, pdf_image, image_id: str) -> ProcessedImage:
+        """Copy of an already processed image for another occurrence of the same bytes"""
+        return replace(
+            processed_image,
+            image_id=image_id,
+            position_info=self._position_info(pdf_image),
+            alt_text=None,
+            associated_text=None
+        )
+
+    def _position_info(self, pdf_image) -> Dict[str, Any]:
+        """Placement of an image on its PDF page"""
+        return {
+            'page_num': pdf_image.page_num,
+            'x0': pdf_image.x0,
+            'y0': pdf_image.y0,
+            'x1': pdf_image.x1,
+            'y1': pdf_image.y1,
+            'width': pdf_image.width,
+            'height': pdf_image.height,
+            'is_color': pdf_image.is_color
+        }
+
+    def _process_single_image(self, pdf_image, quality_level: str, image_id: str = None) -> ProcessedImage:
         """Process a single image with optimization"""
-        self.image_counter += 1
-        image_id = f"img_{self.image_counter:04d}"
+        if image_id is None:
+            self.image_counter += 1
+            image_id = f"img_{self.image_counter:04d}"
 
         try:
             # Convert image data to PIL Image
@@ -127,35 +390,48 @@ class ImageProcessor:
             original_file_size = len(pdf_image.image_data)
 
             # Determine optimal format and size
-            target_width = self._get_target_width(quality_level)
+            settings = _resolve_settings(quality_level)
+            target_width = settings.target_width
             optimal_format = self._determine_optimal_format(original_image, original_format)
 
-            # Process image (resize, optimize)
-            processed_image = self._resize_and_optimize(original_image, target_width, quality_level)
+            # Images that need no resize and are already in the chosen format
+            # are embedded as they are; re-encoding would only cost time
+            fits_width = original_size[0] <= target_width
+            if (fits_width and original_format == optimal_format
+                    and original_file_size < _PASSTHROUGH_MAX_FILE_SIZE):
+                final_data = pdf_image.image_data
+                final_size = original_size
+                ai_source = original_image
+            else:
+                # Let libjpeg decode large JPEGs at a reduced scale
+                self._draft_jpeg(original_image, target_width)
+
+                # Process image (resize, optimize)
+                processed_image = self._resize_and_optimize(original_image, settings)
 
-            # Convert to target format
-            final_data = self._convert_to_format(processed_image, optimal_format, quality_level)
+                # Convert to target format
+                final_data = self._convert_to_format(processed_image, optimal_format, settings)
+                final_size = processed_image.size
+                ai_source = processed_image
+
+                # Keep the original when re-encoding an image that needed no resize made it bigger
+                if (fits_width and original_format in _EPUB_IMAGE_FORMATS
+                        and len(final_data) >= original_file_size):
+                    final_data = pdf_image.image_data
+                    optimal_format = original_format
+                    final_size = original_size
 
             # Calculate compression metrics
-            final_size = processed_image.size
             final_file_size = len(final_data)
             compression_ratio = final_file_size / original_file_size if original_file_size > 0 else 1.0
 
             # Create position info
-            position_info = {
-                'page_num': pdf_image.page_num,
-                'x0': pdf_image.x0,
-                'y0': pdf_image.y0,
-                'x1': pdf_image.x1,
-                'y1': pdf_image.y1,
-                'width': pdf_image.width,
-                'height': pdf_image.height,
-                'is_color': pdf_image.is_color
-            }
+            position_info = self._position_info(pdf_image)
+
+            ai_thumbnail = self._encode_ai_thumbnail(ai_source) if self.make_ai_thumbnails else None
 
             return ProcessedImage(
                 image_id=image_id,
-                original_data=pdf_image.image_data,
                 processed_data=final_data,
                 original_format=original_format,
                 final_format=optimal_format,
@@ -165,21 +441,31 @@ class ImageProcessor:
                 final_file_size=final_file_size,
                 compression_ratio=compression_ratio,
                 position_info=position_info,
-                quality_level=quality_level
+                quality_level=quality_level,
+                ai_thumbnail_bytes=ai_thumbnail
             )
 
         except Exception as e:
             self.logger.error(f"Failed to process image {image_id}: {str(e)}")
             raise
 
-    def _get_target_width(self, quality_level: str) -> int:
-        """Get target width based on quality level"""
-        width_map = {
-            'fast': IMAGE_MAX_WIDTH_FAST,
-            'standard': IMAGE_MAX_WIDTH_STANDARD,
-            'high': IMAGE_MAX_WIDTH_HIGH
-        }
-        return width_map.get(quality_level, IMAGE_MAX_WIDTH_STANDARD)
+    def _draft_jpeg(self, image: Image.Image, target_width: int):
+        """
+        Have a JPEG decode straight to 1/2, 1/4 or 1/8 scale when it is far wider than needed
+
+        Pillow's libjpeg-turbo skips most of the IDCT work at reduced scales,
+        and the decoded image is never smaller than the requested size, so the
+        later resize still produces target_width. No-op for other formats
+        and for images that have already been decoded.
+        """
+        if image.format != 'JPEG':
+            return
+
+        width, height = image.size
+        if width < 2 * target_width:
+            return
+
+        image.draft(None, (target_width, max(1, height * target_width // width)))
 
     def _determine_optimal_format(self, image: Image.Image, original_format: str) -> str:
         """Determine optimal output format for the image"""
@@ -187,16 +473,19 @@ class ImageProcessor:
         if original_format == 'png' and image.mode in ('RGBA', 'LA'):
             return 'png'
 
-        # For photographs and complex images, use JPEG
+        # WebP is 25-35% smaller than JPEG at the same visual quality
+        lossy_format = 'webp' if self.allow_webp else 'jpeg'
+
+        # For photographs and complex images, use lossy compression
         if self._is_photograph(image):
-            return 'jpeg'
+            return lossy_format
 
         # For diagrams, charts, and simple graphics, use PNG
         if self._is_diagram(image):
             return 'png'
 
-        # Default to JPEG for better compression
-        return 'jpeg'
+        # Default to lossy compression for better compression
+        return lossy_format
 
     def _is_photograph(self, image: Image.Image) -> bool:
         """Determine if image is a photograph"""
@@ -212,8 +501,7 @@ class ImageProcessor:
 
         # Check color diversity
         try:
-            colors = image.getcolors(maxcolors=256)
-            if colors and len(colors) > 100:
+            if self._color_count(image) > 100:
                 return True
         except Exception:
             pass
@@ -231,78 +519,129 @@ class ImageProcessor:
 
         # Limited color palette suggests diagram
         try:
-            colors = image.getcolors(maxcolors=256)
-            if colors and len(colors) <= 16:
+            if self._color_count(image) <= 16:
                 return True
         except Exception:
             pass
 
         return False
 
-    def _resize_and_optimize(self, image: Image.Image, target_width: int, quality_level: str) -> Image.Image:
+    def _color_count(self, image: Image.Image) -> int:
+        """
+        Count distinct RGB colors on a nearest-neighbour thumbnail of the image
+
+        The thumbnail keeps the count cheap for large images; the last
+        result is kept so the photograph and diagram checks share one count.
+        """
+        if self._color_count_cache is not None:
+            image_ref, count = self._color_count_cache
+            if image_ref() is image:
+                return count
+
+        sample = image
+        width, height = image.size
+        if max(width, height) > _COLOR_SAMPLE_SIZE:
+            scale = _COLOR_SAMPLE_SIZE / max(width, height)
+            sample = image.resize(
+                (max(1, round(width * scale)), max(1, round(height * scale))),
+                Image.Resampling.NEAREST
+            )
+
+        pixels = np.asarray(sample.convert('RGB'), dtype=np.uint32)
+        packed = (pixels[..., 0] << 16) | (pixels[..., 1] << 8) | pixels[..., 2]
+        count = int(np.unique(packed).size)
+
+        self._color_count_cache = (weakref.ref(image), count)
+        return count
+
+    def _resize_and_optimize(self, image: Image.Image, settings: _QualitySettings) -> Image.Image:
         """Resize and optimize image"""
+        # Ensure RGB mode for JPEG. Flattening first means resize and sharpen
+        # run on three channels instead of four, transparent pixels' hidden
+        # colors can't bleed into edges, and palette images can be sharpened
+        if image.mode == 'P' and 'transparency' not in image.info:
+            # Opaque palette images only need their palette expanded
+            image = image.convert('RGB')
+        elif image.mode in ('RGBA', 'LA', 'P'):
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            if image.mode == 'P':
+                image = image.convert('RGBA')
+            # getchannel copies only the alpha band, where split() copied all four
+            background.paste(image, mask=image.getchannel('A') if image.mode == 'RGBA' else None)
+            image = background
+
         # Calculate new dimensions maintaining aspect ratio
+        target_width = settings.target_width
         width, height = image.size
         if width > target_width:
             ratio = target_width / width
             new_width = target_width
             new_height = int(height * ratio)
-            image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+            image = image.resize((new_width, new_height), Image.Resampling.LANCZOS,
+                                 reducing_gap=_RESIZE_REDUCING_GAP)
 
-        # Apply quality-specific optimizations
-        if quality_level == 'high':
-            # High quality: minimal processing
-            pass
-        elif quality_level == 'standard':
-            # Standard: mild sharpening
-            image = image.filter(ImageFilter.UnsharpMask(radius=1, percent=120, threshold=3))
-        else:  # fast
-            # Fast: aggressive optimization
-            image = image.filter(ImageFilter.UnsharpMask(radius=1, percent=150, threshold=5))
-
-        # Ensure RGB mode for JPEG
-        if image.mode in ('RGBA', 'LA', 'P'):
-            background = Image.new('RGB', image.size, (255, 255, 255))
-            if image.mode == 'P':
-                image = image.convert('RGBA')
-            background.paste(image, mask=image.split()[-1] if image.mode == 'RGBA' else None)
-            image = background
+        # Apply quality-specific sharpening
+        if settings.sharpen is not None:
+            image = image.filter(settings.sharpen)
 
         return image
 
-    def _convert_to_format(self, image: Image.Image, target_format: str, quality_level: str) -> bytes:
+    def _convert_to_format(self, image: Image.Image, target_format: str, settings: _QualitySettings) -> bytes:
         """Convert image to target format and return bytes"""
         buffer = io.BytesIO()
 
         if target_format.lower() == 'jpeg':
-            # JPEG settings based on quality level
-            quality_map = {
-                'fast': 70,
-                'standard': 85,
-                'high': 95
-            }
-            quality = quality_map.get(quality_level, 85)
-
-            image.save(buffer, format='JPEG', quality=quality, optimize=True)
+            return self._encode_lossy(image, settings, settings.jpeg_quality, format='JPEG', optimize=True)
+        elif target_format.lower() == 'webp':
+            # WebP quality and encoder effort based on quality level
+            return self._encode_lossy(image, settings, settings.webp_quality,
+                                      format='WEBP', method=settings.webp_method)
         else:  # PNG
-            # PNG settings based on quality level
-            if quality_level == 'fast':
-                # Fast: lower compression
-                image.save(buffer, format='PNG', optimize=False, compress_level=3)
-            elif quality_level == 'standard':
-                # Standard: balanced compression
-                image.save(buffer, format='PNG', optimize=True, compress_level=6)
-            else:  # high
-                # High: maximum compression
-                image.save(buffer, format='PNG', optimize=True, compress_level=9)
+            image.save(buffer, format='PNG', optimize=settings.png_optimize,
+                       compress_level=settings.png_compress_level)
 
         buffer.seek(0)
         return buffer.getvalue()
 
+    def _encode_lossy(self, image: Image.Image, settings: _QualitySettings, max_quality: int, **save_options) -> bytes:
+        """
+        Encode with the lowest quality that still looks like the source, up to max_quality
+
+        Simple images survive far lower quality settings than photographs, so
+        standard and high quality binary-search the setting against a
+        block SSIM threshold; fast quality encodes once at max_quality.
+        """
+        def encode(quality: int) -> bytes:
+            buffer = io.BytesIO()
+            image.save(buffer, quality=quality, **save_options)
+            return buffer.getvalue()
+
+        min_ssim = settings.min_ssim
+        best = encode(max_quality)
+        if min_ssim is None or min(image.size) < _SSIM_BLOCK:
+            return best
+
+        reference = np.asarray(image.convert('L'), dtype=np.float64)
+        low, high = _DYNAMIC_QUALITY_FLOOR, max_quality
+        # Stop within a few quality steps; each probe is a full encode and decode
+        while high - low > 2:
+            quality = (low + high) // 2
+            data = encode(quality)
+            candidate = np.asarray(Image.open(io.BytesIO(data)).convert('L'), dtype=np.float64)
+            if _block_ssim(reference, candidate) >= min_ssim:
+                high, best = quality, data
+            else:
+                low = quality + 1
+
+        return best
+
     def _analyze_text_associations(self, processed_images: List[ProcessedImage], text_blocks: List):
         """Analyze how images relate to surrounding text"""
+        # Index the blocks by page once instead of scanning them all per image
+        block_index = self._index_blocks_by_page(text_blocks)
+
         for image in processed_images:
-            associations = self._find_nearest_text_blocks(image, text_blocks)
+            associations = self._find_nearest_text_blocks(image, text_blocks, block_index)
 
             if associations:
                 # Store association information
@@ -312,52 +651,65 @@ class ImageProcessor:
                 if associations['nearest_text_blocks']:
                     image.position_info['suggested_caption'] = associations['nearest_text_blocks'][0][:100]
 
-    def _find_nearest_text_blocks(self, image: ProcessedImage, text_blocks: List) -> Dict[str, Any]:
+    def _index_blocks_by_page(self, text_blocks: List) -> Dict[int, Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Block indices with their y0 and x0 coordinates, grouped by page in text order"""
+        indices_by_page = defaultdict(list)
+        for index, block in enumerate(text_blocks):
+            indices_by_page[block.page_num].append(index)
+
+        return {
+            page_num: (
+                np.array(indices, dtype=np.int64),
+                np.array([text_blocks[i].y0 for i in indices], dtype=np.float64),
+                np.array([text_blocks[i].x0 for i in indices], dtype=np.float64),
+            )
+            for page_num, indices in indices_by_page.items()
+        }
+
+    def _find_nearest_text_blocks(self, image: ProcessedImage, text_blocks: List,
+                                  block_index: Dict[int, Tuple[np.ndarray, np.ndarray, np.ndarray]] = None) -> Dict[str, Any]:
         """Find text blocks nearest to an image"""
         if not text_blocks:
             return {}
 
+        if block_index is None:
+            block_index = self._index_blocks_by_page(text_blocks)
+
         # Get image position
         img_page = image.position_info['page_num']
         img_y0 = image.position_info['y0']
         img_x0 = image.position_info['x0']
 
         # Find text blocks on the same or nearby pages
-        nearby_blocks = []
-        for block in text_blocks:
-            if abs(block.page_num - img_page) <= 1:  # Same page or adjacent pages
-                nearby_blocks.append(block)
-
-        if not nearby_blocks:
+        nearby_pages = [page for page in (img_page - 1, img_page, img_page + 1) if page in block_index]
+        if not nearby_pages:
             return {}
 
-        # Calculate distances and sort by proximity
-        blocks_with_distance = []
-        for block in nearby_blocks:
-            # Simple distance calculation
-            if block.page_num == img_page:
-                # Same page - calculate actual distance
-                distance = abs(block.y0 - img_y0) + abs(block.x0 - img_x0)
-            else:
-                # Different page - large distance
-                distance = 1000 + abs(block.page_num - img_page) * 100
-
-            blocks_with_distance.append((distance, block))
-
-        blocks_with_distance.sort(key=lambda x: x[0])
+        # Calculate distances: actual distance on the same page, a large
+        # fixed distance on adjacent pages
+        indices = np.concatenate([block_index[page][0] for page in nearby_pages])
+        distances = np.concatenate([
+            np.abs(block_index[page][1] - img_y0) + np.abs(block_index[page][2] - img_x0)
+            if page == img_page
+            else np.full(len(block_index[page][0]), 1000 + abs(page - img_page) * 100, dtype=np.float64)
+            for page in nearby_pages
+        ])
+
+        # Back in text order, a stable sort breaks distance ties by block order
+        text_order = np.argsort(indices, kind='stable')
+        indices = indices[text_order]
+        distances = distances[text_order]
+        nearest_indices = indices[np.argsort(distances, kind='stable')[:3]]
 
         # Get nearest blocks
-        nearest_blocks = [block.text for distance, block in blocks_with_distance[:3]]
+        nearest_blocks = [text_blocks[i].text for i in nearest_indices]
 
         # Determine position relative to text
-        if blocks_with_distance:
-            nearest_block = blocks_with_distance[0][1]
-            if nearest_block.y0 < img_y0:
-                position = 'after'
-            else:
-                position = 'before'
+        nearest_block = text_blocks[nearest_indices[0]]
+        if nearest_block.y0 < img_y0:
+            position = 'after'
         else:
-            position = 'unknown'
+            position = 'before'
 
         return {
             'nearest_text_blocks': nearest_blocks,
@@ -365,27 +717,102 @@ class ImageProcessor:
             'contextual_relevance': 0.8  # Simple relevance score
         }
 
-    def _generate_alt_text(self, processed_images: List[ProcessedImage]):
+    def generate_alt_text(self, processed_images: List[ProcessedImage]):
         """Generate alt text for images using AI"""
         if not self.ai_service:
             return
 
+        # Identical images share one description, cached across runs by content hash
+        images_by_digest = {}
         for image in processed_images:
+            digest = hashlib.blake2b(image.processed_data, digest_size=16).hexdigest()
+            cached = self.cache.load_text(f"alt-{digest}") if self.cache is not None else None
+            if cached:
+                image.alt_text = cached
+            else:
+                images_by_digest.setdefault(digest, []).append(image)
+
+        # Build every request up front so the latency-bound AI calls can overlap
+        requests = []
+        for digest, images in images_by_digest.items():
             try:
-                # Prepare image for AI analysis
-                image_for_ai = Image.open(io.BytesIO(image.processed_data))
+                requests.append(((digest, images), self._prepare_alt_text_request(images[0])))
+            except Exception as e:
+                self.logger.warning(f"Failed to generate alt text for {images[0].image_id}: {str(e)}")
 
-                # Resize for AI processing (smaller for efficiency)
-                max_size = (512, 512)
-                image_for_ai.thumbnail(max_size, Image.Resampling.LANCZOS)
+        if not requests:
+            return
 
-                # Convert to bytes
-                buffer = io.BytesIO()
-                image_for_ai.save(buffer, format='JPEG', quality=85)
-                image_bytes = buffer.getvalue()
+        # Prefer a batched endpoint when the AI service offers one
+        analyze_batch = getattr(self.ai_service, 'analyze_images_batch', None)
+        if analyze_batch is not None:
+            for start in range(0, len(requests), _ALT_TEXT_BATCH_SIZE):
+                batch = requests[start:start + _ALT_TEXT_BATCH_SIZE]
+                try:
+                    alt_texts = analyze_batch([payload for _, payload in batch])
+                except Exception as e:
+                    self.logger.warning(f"AI alt text generation failed for a batch of {len(batch)} images: {str(e)}")
+                    continue
+                for (group, _), alt_text in zip(batch, alt_texts):
+                    self._set_alt_text(group, alt_text)
+            return
 
-                # Prepare prompt for AI
-                prompt = f"""
+        # Otherwise issue the per-image calls concurrently, each round of
+        # workers getting its own timeout
+        executor = ThreadPoolExecutor(max_workers=_ALT_TEXT_MAX_WORKERS)
+        try:
+            futures = {
+                executor.submit(self.ai_service.analyze_image, image_bytes, prompt): group
+                for group, (image_bytes, prompt) in requests
+            }
+            rounds = -(-len(futures) // _ALT_TEXT_MAX_WORKERS)
+            _, not_done = wait(futures, timeout=_ALT_TEXT_CALL_TIMEOUT * rounds)
+
+            for future, group in futures.items():
+                image_id = group[1][0].image_id
+                if future in not_done:
+                    self.logger.warning(f"AI alt text generation timed out for {image_id}")
+                    continue
+                try:
+                    self._set_alt_text(group, future.result())
+                except Exception as e:
+                    self.logger.warning(f"AI alt text generation failed for {image_id}: {str(e)}")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _set_alt_text(self, group: Tuple[str, List[ProcessedImage]], alt_text: Optional[str]):
+        """Apply a generated description to every image sharing its content, and cache it"""
+        digest, images = group
+        alt_text = (alt_text or '').strip() or None
+        for image in images:
+            image.alt_text = alt_text
+        # An empty answer is not cached, so the next run asks again
+        if alt_text and self.cache is not None:
+            self.cache.save_text(f"alt-{digest}", alt_text)
+
+    def _encode_ai_thumbnail(self, image: Image.Image) -> bytes:
+        """Downscale an image for AI analysis and encode it as JPEG"""
+        # Resize for AI processing (smaller for efficiency)
+        image_for_ai = image.copy()
+        max_size = (512, 512)
+        image_for_ai.thumbnail(max_size, Image.Resampling.LANCZOS, reducing_gap=_RESIZE_REDUCING_GAP)
+        if image_for_ai.mode not in ('RGB', 'L'):
+            image_for_ai = image_for_ai.convert('RGB')
+
+        # Convert to bytes
+        buffer = io.BytesIO()
+        image_for_ai.save(buffer, format='JPEG', quality=85)
+        return buffer.getvalue()
+
+    def _prepare_alt_text_request(self, image: ProcessedImage) -> Tuple[bytes, str]:
+        """Downscaled JPEG bytes and prompt for an image's alt text request"""
+        # Prepare image for AI analysis, unless processing already did
+        image_bytes = image.ai_thumbnail_bytes
+        if image_bytes is None:
+            image_bytes = self._encode_ai_thumbnail(Image.open(io.BytesIO(image.processed_data)))
+
+        # Prepare prompt for AI
+        prompt = f"""
                 Describe this image in detail for accessibility purposes.
                 Focus on what's important for understanding the content.
                 Keep the description concise but informative.
@@ -393,49 +820,36 @@ class ImageProcessor:
                 Context: This image appears in a document about {image.associated_text or 'various topics'}.
                 """
 
-                # Call AI service (implementation depends on your AI service interface)
-                try:
-                    alt_text = self.ai_service.analyze_image(image_bytes, prompt)
-                    image.alt_text = alt_text.strip() if alt_text else None
-                except Exception as e:
-                    self.logger.warning(f"AI alt text generation failed for {image.image_id}: {str(e)}")
+        return image_bytes, prompt
 
-            except Exception as e:
-                self.logger.warning(f"Failed to generate alt text for {image.image_id}: {str(e)}")
+    def _record_processed_image(self, image: ProcessedImage):
+        """Store a processed image and append its figures to the statistics columns"""
+        self.processed_images[image.image_id] = image
+        self._original_sizes.append(image.original_file_size)
+        self._final_sizes.append(image.final_file_size)
+        self._compression_ratios.append(image.compression_ratio)
+        self._format_counts[image.final_format] = self._format_counts.get(image.final_format, 0) + 1
+        self._quality_level_counts[image.quality_level] = self._quality_level_counts.get(image.quality_level, 0) + 1
 
     def get_image_statistics(self) -> Dict[str, Any]:
-        """Get statistics about processed images"""
+        """
+        Get statistics about processed images
+
+        Totals are summed over the columns kept by _record_processed_image,
+        so polling this during a large job does not walk every image.
+        """
         if not self.processed_images:
             return {}
 
         stats = {
             'total_images': len(self.processed_images),
-            'total_original_size': 0,
-            'total_final_size': 0,
-            'format_counts': {},
-            'quality_levels': {},
-            'average_compression': 0.0
+            'total_original_size': int(np.frombuffer(self._original_sizes, dtype=np.int64).sum()),
+            'total_final_size': int(np.frombuffer(self._final_sizes, dtype=np.int64).sum()),
+            'format_counts': dict(self._format_counts),
+            'quality_levels': dict(self._quality_level_counts),
+            'average_compression': float(np.frombuffer(self._compression_ratios, dtype=np.float64).mean())
         }
 
-        compression_ratios = []
-
-        for image in self.processed_images.values():
-            stats['total_original_size'] += image.original_file_size
-            stats['total_final_size'] += image.final_file_size
-
-            # Count formats
-            fmt = image.final_format
-            stats['format_counts'][fmt] = stats['format_counts'].get(fmt, 0) + 1
-
-            # Count quality levels
-            ql = image.quality_level
-            stats['quality_levels'][ql] = stats['quality_levels'].get(ql, 0) + 1
-
-            compression_ratios.append(image.compression_ratio)
-
-        if compression_ratios:
-            stats['average_compression'] = sum(compression_ratios) / len(compression_ratios)
-
         # Calculate overall compression
         if stats['total_original_size'] > 0:
             stats['overall_compression'] = stats['total_final_size'] / stats['total_original_size']
@@ -453,12 +867,19 @@ class ImageProcessor:
 
             for image_id, image in self.processed_images.items():
                 filename = f"{image_id}.{image.final_format}"
-                file_path = output_dir / filename
-
-                with open(file_path, 'wb') as f:
-                    f.write(image.processed_data)
-
-                image_paths[image_id] = str(file_path)
+                image_paths[image_id] = output_dir / filename
+
+            # File writes release the GIL, so many small images write in parallel
+            if image_paths:
+                with ThreadPoolExecutor(max_workers=min(_SAVE_MAX_WORKERS, len(image_paths))) as executor:
+                    futures = [
+                        executor.submit(file_path.write_bytes, self.processed_images[image_id].processed_data)
+                        for image_id, file_path in image_paths.items()
+                    ]
+                    for future in futures:
+                        future.result()
+
+            image_paths = {image_id: str(file_path) for image_id, file_path in image_paths.items()}
 
             self.logger.info(f"Saved {len(image_paths)} images to {output_dir}")
             return image_paths
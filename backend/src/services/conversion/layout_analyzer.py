@@ -9,12 +9,30 @@ This module provides sophisticated layout analysis for PDF documents including:
 """
 
 import logging
+import os
+import weakref
+from bisect import bisect_left
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from typing import Dict, List, Optional, Tuple, Any
 
+import numpy as np
 import pdfplumber
+from pdfplumber.utils.text import LIGATURES
 from utils.logging_config import get_logger
 
+# Word grouping tolerances in points, as passed to pdfplumber's extract_words
+_WORD_X_TOLERANCE = 1
+_WORD_Y_TOLERANCE = 1
+
+# Ruling segments shorter than this many points are ignored by table detection;
+# they are figure and glyph decoration, and pdfplumber drops edges this short anyway
+_TABLE_RULING_MIN_LENGTH = 3
+
+# Documents with fewer pages than this are analyzed in-process; pool dispatch would cost more
+_PARALLEL_MIN_PAGES = 4
+
 
 @dataclass
 class TextRegion:
@@ -55,11 +73,109 @@ class TableInfo:
     cells: List[List[str]]
 
 
+def _extract_words(page: pdfplumber.Page) -> List[Dict]:
+    """
+    Group a page's characters into words the way page.extract_words does
+
+    Works on arrays of the character coordinates instead of pdfplumber's
+    per-character Python loop, and adds each word's font size (from its first
+    character). Pages with rotated text fall back to extract_words.
+    """
+    chars = page.chars
+    if not chars:
+        return []
+    if not all(char['upright'] for char in chars):
+        return page.extract_words(x_tolerance=_WORD_X_TOLERANCE, y_tolerance=_WORD_Y_TOLERANCE)
+
+    count = len(chars)
+    x0 = np.fromiter((char['x0'] for char in chars), dtype=np.float64, count=count)
+    x1 = np.fromiter((char['x1'] for char in chars), dtype=np.float64, count=count)
+    top = np.fromiter((char['top'] for char in chars), dtype=np.float64, count=count)
+    bottom = np.fromiter((char['bottom'] for char in chars), dtype=np.float64, count=count)
+    doctop = np.fromiter((char['doctop'] for char in chars), dtype=np.float64, count=count)
+
+    # Lines: sorted distinct doctops chained while each is within tolerance of the last
+    levels = np.unique(doctop)
+    level_line = np.concatenate(([0], np.cumsum(levels[1:] > levels[:-1] + _WORD_Y_TOLERANCE)))
+    line = level_line[np.searchsorted(levels, doctop)]
+
+    # Read line by line, left to right; lexsort is stable, keeping ties in page order
+    order = np.lexsort((x0, line))
+    x0, x1, top, bottom, doctop = x0[order], x1[order], top[order], bottom[order], doctop[order]
+    texts = [chars[index]['text'] for index in order.tolist()]
+    sizes = [chars[index]['size'] for index in order.tolist()]
+
+    # Whitespace ends a word and is dropped; otherwise a character starts a new
+    # word when it steps back, leaves a gap, or drops below the previous one
+    is_space = np.fromiter((text.isspace() for text in texts), dtype=bool, count=count)
+    starts = np.ones(count, dtype=bool)
+    starts[1:] = (is_space[:-1] | (x0[1:] < x0[:-1]) | (x0[1:] > x1[:-1] + _WORD_X_TOLERANCE)
+                  | (top[1:] > top[:-1] + _WORD_Y_TOLERANCE))
+    kept = np.flatnonzero(~is_space)
+    if not len(kept):
+        return []
+    first = np.flatnonzero(starts[kept])
+    bounds = np.append(first, len(kept)).tolist()
+
+    word_x0 = np.minimum.reduceat(x0[kept], first).tolist()
+    word_x1 = np.maximum.reduceat(x1[kept], first).tolist()
+    word_top = np.minimum.reduceat(top[kept], first).tolist()
+    word_bottom = np.maximum.reduceat(bottom[kept], first).tolist()
+    first_chars = kept[first]
+    doctop_offsets = (doctop[first_chars] - top[first_chars]).tolist()
+    kept_texts = [LIGATURES.get(texts[index], texts[index]) for index in kept.tolist()]
+
+    words = []
+    for i, char_index in enumerate(first_chars.tolist()):
+        words.append({
+            'text': ''.join(kept_texts[bounds[i]:bounds[i + 1]]),
+            'x0': word_x0[i],
+            'x1': word_x1[i],
+            'top': word_top[i],
+            'doctop': word_top[i] + doctop_offsets[i],
+            'bottom': word_bottom[i],
+            'upright': True,
+            'direction': 1,
+            'size': sizes[char_index],
+        })
+    return words
+
+
+# Analyzer and ((path, mtime, size), open document) reused by every page a pool worker handles
+_worker_analyzer = None
+_worker_pdf = None
+
+
+def _analyze_page_worker(pdf_path: str, page_num: int) -> Tuple[int, int]:
+    """Worker: analyze one page and return its (column count, table count)"""
+    global _worker_analyzer, _worker_pdf
+    if _worker_analyzer is None:
+        _worker_analyzer = LayoutAnalyzer()
+    # pdfplumber objects don't pickle, so each worker opens the document itself;
+    # a file rewritten under the same path must not be served from the old one
+    stat = os.stat(pdf_path)
+    file_key = (pdf_path, stat.st_mtime_ns, stat.st_size)
+    if _worker_pdf is None or _worker_pdf[0] != file_key:
+        if _worker_pdf is not None:
+            _worker_pdf[1].close()
+        _worker_pdf = (file_key, pdfplumber.open(pdf_path))
+
+    page = _worker_pdf[1].pages[page_num]
+    try:
+        columns, _, tables = _worker_analyzer.analyze_page_layout(page, page_num)
+    finally:
+        page.flush_cache()
+    return len(columns), len(tables)
+
+
 class LayoutAnalyzer:
     """Advanced layout analyzer using pdfplumber for precise layout detection"""
 
     def __init__(self):
         self.logger = get_logger("layout_analyzer")
+        # page -> (page_num, layout) of pages already analyzed; extract_words and
+        # find_tables walk pdfminer's object tree again on every call
+        self._page_layouts = weakref.WeakKeyDictionary()
 
     def analyze_page_layout(self, page: pdfplumber.Page, page_num: int) -> Tuple[List[ColumnInfo], List[TextRegion], List[TableInfo]]:
         """
@@ -72,11 +188,15 @@ class LayoutAnalyzer:
         Returns:
             Tuple of (columns, text_regions, tables)
         """
+        cached = self._page_layouts.get(page)
+        if cached is not None and cached[0] == page_num:
+            return cached[1]
+
         try:
             self.logger.debug(f"Analyzing layout for page {page_num}")
 
             # Extract words with precise positions
-            words = page.extract_words(x_tolerance=1, y_tolerance=1)
+            words = _extract_words(page)
 
             if not words:
                 return [], [], []
@@ -91,7 +211,9 @@ class LayoutAnalyzer:
             tables = self._detect_tables(page, page_num)
 
             self.logger.debug(f"Page {page_num}: {len(columns)} columns, {len(text_regions)} regions, {len(tables)} tables")
-            return columns, text_regions, tables
+            layout = (columns, text_regions, tables)
+            self._page_layouts[page] = (page_num, layout)
+            return layout
 
         except Exception as e:
             self.logger.error(f"Layout analysis failed for page {page_num}: {str(e)}")
@@ -102,38 +224,25 @@ class LayoutAnalyzer:
         if not words:
             return []
 
-        # Analyze x-coordinate distribution
-        x_coords = [word['x0'] for word in words]
-        x_coords.sort()
+        # Analyze x-coordinate distribution, keeping each word's x1 alongside its x0
+        x0 = np.fromiter((word['x0'] for word in words), dtype=np.float64, count=len(words))
+        x1 = np.fromiter((word['x1'] for word in words), dtype=np.float64, count=len(words))
+        order = np.argsort(x0, kind='stable')
+        x0 = x0[order]
+        x1 = x1[order]
 
         # Find column boundaries using gaps in text
         min_gap = 20  # Minimum gap between columns (in points)
-        column_boundaries = []
+        boundaries = np.flatnonzero(np.diff(x0) > min_gap)
 
-        current_x = x_coords[0]
-        column_start = current_x
-
-        for i in range(1, len(x_coords)):
-            if x_coords[i] - current_x > min_gap:
-                # Found a column boundary
-                column_end = current_x
-                column_boundaries.append((column_start, column_end))
-                column_start = x_coords[i]
-            current_x = x_coords[i]
-
-        # Add last column
-        column_boundaries.append((column_start, x_coords[-1]))
+        # Each column is a run of sorted words between two gaps
+        first = np.concatenate(([0], boundaries + 1))
+        # Find the furthest x coordinate in each column
+        column_x_ends = np.maximum.reduceat(x1, first)
 
         # Create ColumnInfo objects
         columns = []
-        for i, (x_start, x_end) in enumerate(column_boundaries):
-            # Find the furthest x coordinate in this column
-            column_words = [w for w in words if x_start <= w['x0'] <= x_end]
-            if column_words:
-                actual_x_end = max(w['x1'] for w in column_words)
-            else:
-                actual_x_end = x_end
-
+        for i, (x_start, actual_x_end) in enumerate(zip(x0[first].tolist(), column_x_ends.tolist())):
             column_info = ColumnInfo(
                 column_number=i,
                 x_start=x_start,
@@ -153,7 +262,15 @@ class LayoutAnalyzer:
             return text_regions
 
         # Sort words by reading order (top to bottom, left to right)
-        words.sort(key=lambda w: (w['top'], w['left']))
+        words.sort(key=lambda w: (w['top'], w['x0']))
+
+        # Columns come sorted by x_start; reach[i] is the furthest x_end among
+        # columns 0..i, so the first column containing an x is one bisect away
+        col_starts = [col.x_start for col in columns]
+        col_reach = []
+        for col in columns:
+            col_reach.append(max(col.x_end, col_reach[-1]) if col_reach else col.x_end)
+        column_bounds = (col_starts, col_reach)
 
         # Group consecutive words into lines and regions
         current_line_words = []
@@ -164,7 +281,7 @@ class LayoutAnalyzer:
             if abs(word['top'] - current_top) > line_tolerance:
                 # New line, process previous line
                 if current_line_words:
-                    line_regions = self._process_line(page, current_line_words, columns)
+                    line_regions = self._process_line(page, current_line_words, columns, column_bounds)
                     text_regions.extend(line_regions)
                 current_line_words = [word]
                 current_top = word['top']
@@ -173,7 +290,7 @@ class LayoutAnalyzer:
 
         # Process last line
         if current_line_words:
-            line_regions = self._process_line(page, current_line_words, columns)
+            line_regions = self._process_line(page, current_line_words, columns, column_bounds)
             text_regions.extend(line_regions)
 
         # Assign reading order
@@ -182,23 +299,23 @@ class LayoutAnalyzer:
 
         return text_regions
 
-    def _process_line(self, page: pdfplumber.Page, line_words: List[Dict], columns: List[ColumnInfo]) -> List[TextRegion]:
+    def _process_line(self, page: pdfplumber.Page, line_words: List[Dict], columns: List[ColumnInfo],
+                      column_bounds: Tuple[List[float], List[float]]) -> List[TextRegion]:
         """Process a line of words and create text regions"""
         if not line_words:
             return []
 
         # Sort words by x position
-        line_words.sort(key=lambda w: w['left'])
+        line_words.sort(key=lambda w: w['x0'])
 
-        # Group words by column
-        column_groups = {}
+        # Group words by the first column whose span contains them
+        col_starts, col_reach = column_bounds
+        column_groups = defaultdict(list)
         for word in line_words:
-            for col in columns:
-                if col.x_start <= word['x0'] <= col.x_end:
-                    if col.column_number not in column_groups:
-                        column_groups[col.column_number] = []
-                    column_groups[col.column_number].append(word)
-                    break
+            x0 = word['x0']
+            index = bisect_left(col_reach, x0)
+            if index < len(col_starts) and col_starts[index] <= x0:
+                column_groups[columns[index].column_number].append(word)
 
         # Create text regions for each column
         regions = []
@@ -257,38 +374,41 @@ class LayoutAnalyzer:
         if len(words) < 3:
             return False
 
-        # Check for regular spacing between words
-        positions = [word['x0'] for word in words]
-        positions.sort()
-
-        # Look for at least 2 regular gaps
-        gaps = []
-        for i in range(1, len(positions)):
-            gaps.append(positions[i] - positions[i-1])
+        # Check for regular spacing between words; three or more words give at
+        # least 2 gaps. Lines are a handful of words, where plain Python beats
+        # building NumPy arrays
+        positions = sorted(word['x0'] for word in words)
+        gaps = [right - left for left, right in zip(positions, positions[1:])]
 
         # Check if gaps are somewhat regular
-        if len(gaps) >= 2:
-            avg_gap = sum(gaps) / len(gaps)
-            variance = sum((gap - avg_gap) ** 2 for gap in gaps) / len(gaps)
-            std_dev = variance ** 0.5
-
-            # If standard deviation is small relative to gap size, likely tabular
-            if std_dev < avg_gap * 0.3:
-                return True
+        avg_gap = sum(gaps) / len(gaps)
+        variance = sum((gap - avg_gap) ** 2 for gap in gaps) / len(gaps)
+        std_dev = variance ** 0.5
 
-        return False
+        # If standard deviation is small relative to gap size, likely tabular
+        return std_dev < avg_gap * 0.3
 
     def _detect_tables(self, page: pdfplumber.Page, page_num: int) -> List[TableInfo]:
         """Detect tables in the page"""
         tables = []
 
         try:
+            # Candidate rulings: page.edges already holds the straight segments of
+            # every line, rect and curve, so curves need not be passed again
+            vertical_lines = []
+            horizontal_lines = []
+            for edge in page.edges:
+                if edge['orientation'] == 'v' and edge['height'] >= _TABLE_RULING_MIN_LENGTH:
+                    vertical_lines.append(edge)
+                elif edge['orientation'] == 'h' and edge['width'] >= _TABLE_RULING_MIN_LENGTH:
+                    horizontal_lines.append(edge)
+
             # Use pdfplumber's table detection
             tables_settings = {
                 "vertical_strategy": "text",
                 "horizontal_strategy": "text",
-                "explicit_vertical_lines": page.curves + page.edges,
-                "explicit_horizontal_lines": page.curves + page.edges,
+                "explicit_vertical_lines": vertical_lines,
+                "explicit_horizontal_lines": horizontal_lines,
             }
 
             detected_tables = page.find_tables(tables_settings)
@@ -337,26 +457,29 @@ class LayoutAnalyzer:
         if not text_regions:
             return text_regions
 
+        # Coordinates are pulled into arrays once and ordered with a stable
+        # lexsort, which keeps ties in their original order as sorted() did
         if len(columns) <= 1:
             # Single column - sort by y position
-            return sorted(text_regions, key=lambda r: (r.y0, r.x0))
+            count = len(text_regions)
+            y0 = np.fromiter((r.y0 for r in text_regions), dtype=np.float64, count=count)
+            x0 = np.fromiter((r.x0 for r in text_regions), dtype=np.float64, count=count)
+            return [text_regions[i] for i in np.lexsort((x0, y0)).tolist()]
 
         # Multi-column - determine column order first, then sort within columns
-        sorted_regions = []
-
         # Sort columns by x position
-        sorted_columns = sorted(columns, key=lambda c: c.x_start)
-
-        # Process each column
-        for col in sorted_columns:
-            # Get regions in this column
-            col_regions = [r for r in text_regions if r.column_number == col.column_number]
+        column_rank = {}
+        for rank, col in enumerate(sorted(columns, key=lambda c: c.x_start)):
+            column_rank.setdefault(col.column_number, rank)
 
-            # Sort regions within column by y position
-            col_regions.sort(key=lambda r: r.y0)
+        # Regions outside every detected column are left out
+        placed = [r for r in text_regions if r.column_number in column_rank]
+        count = len(placed)
+        ranks = np.fromiter((column_rank[r.column_number] for r in placed), dtype=np.int64, count=count)
+        y0 = np.fromiter((r.y0 for r in placed), dtype=np.float64, count=count)
 
-            # Add to final list
-            sorted_regions.extend(col_regions)
+        # Column by column, top to bottom within each
+        sorted_regions = [placed[i] for i in np.lexsort((y0, ranks)).tolist()]
 
         # Update reading order numbers
         for i, region in enumerate(sorted_regions):
@@ -364,12 +487,17 @@ class LayoutAnalyzer:
 
         return sorted_regions
 
-    def analyze_document_structure(self, pages: List[pdfplumber.Page]) -> Dict[str, Any]:
+    def analyze_document_structure(self, pages: List[pdfplumber.Page], pdf_path: Optional[str] = None,
+                                   executor: Optional[ProcessPoolExecutor] = None) -> Dict[str, Any]:
         """
         Analyze overall document structure across all pages
 
         Args:
             pages: List of pdfplumber Page objects
+            pdf_path: Path of the document the pages belong to; with an
+                executor, workers reopen it to analyze pages in parallel
+            executor: Process pool owned by the caller; pages are analyzed
+                in-process when it is None
 
         Returns:
             Dictionary with document structure analysis
@@ -384,29 +512,54 @@ class LayoutAnalyzer:
             'column_consistency': True
         }
 
-        all_column_counts = []
+        # One row of (column count, table count) per page
+        counts = np.array(self._page_counts(pages, pdf_path, executor), dtype=np.int32).reshape(-1, 2)
+        if len(counts):
+            column_counts, table_counts = counts[:, 0], counts[:, 1]
+            multi_column_pages = int(np.count_nonzero(column_counts > 1))
 
-        for page_num, page in enumerate(pages):
-            columns, text_regions, tables = self.analyze_page_layout(page, page_num)
+            structure_analysis['multi_column_pages'] = multi_column_pages
+            structure_analysis['single_column_pages'] = len(counts) - multi_column_pages
+            structure_analysis['pages_with_tables'] = int(np.count_nonzero(table_counts))
+            structure_analysis['total_tables'] = int(table_counts.sum())
 
-            column_count = len(columns)
-            all_column_counts.append(column_count)
-
-            if column_count > 1:
-                structure_analysis['multi_column_pages'] += 1
-            else:
-                structure_analysis['single_column_pages'] += 1
-
-            if tables:
-                structure_analysis['pages_with_tables'] += 1
-                structure_analysis['total_tables'] += len(tables)
-
-        # Calculate statistics
-        if all_column_counts:
-            structure_analysis['average_columns_per_page'] = sum(all_column_counts) / len(all_column_counts)
+            # Calculate statistics
+            structure_analysis['average_columns_per_page'] = float(column_counts.mean())
 
             # Check column consistency
-            unique_counts = set(all_column_counts)
-            structure_analysis['column_consistency'] = len(unique_counts) <= 2
-
-        return structure_analysis
\ No newline at end of file
+            structure_analysis['column_consistency'] = len(np.unique(column_counts)) <= 2
+
+        return structure_analysis
+
+    def _page_counts(self, pages: List[pdfplumber.Page], pdf_path: Optional[str],
+                     executor: Optional[ProcessPoolExecutor] = None) -> List[Tuple[int, int]]:
+        """(column count, table count) of each page, from the caller's pool when worth it"""
+        futures = None
+        if (executor is not None and pdf_path is not None and len(pages) >= _PARALLEL_MIN_PAGES
+                and (os.cpu_count() or 1) >= 2):
+            futures = []
+            try:
+                for page in pages:
+                    futures.append(executor.submit(_analyze_page_worker, str(pdf_path), page.page_number - 1))
+            except Exception as e:
+                # A broken or shut down pool is the owner's to replace
+                self.logger.warning(f"Layout pool unavailable, analyzing in-process: {str(e)}")
+                for future in futures:
+                    future.cancel()
+                futures = None
+
+        if futures is None:
+            counts = []
+            for page_num, page in enumerate(pages):
+                columns, _, tables = self.analyze_page_layout(page, page_num)
+                counts.append((len(columns), len(tables)))
+            return counts
+
+        counts = []
+        for page_num, future in enumerate(futures):
+            try:
+                counts.append(future.result())
+            except Exception as e:
+                self.logger.error(f"Layout analysis failed for page {page_num}: {str(e)}")
+                counts.append((0, 0))
+        return counts
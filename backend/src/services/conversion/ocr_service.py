@@ -8,18 +8,123 @@ This module provides OCR capabilities for scanned PDF documents including:
 - Text extraction from scanned pages
 """
 
+import hashlib
 import logging
-import re
+import os
+import queue
+import tempfile
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Any, Union
 
+import numpy as np
 import pytesseract
-from PIL import Image, ImageFilter, ImageEnhance
+from lxml import html as lxml_html
+from PIL import Image, ImageEnhance
 from utils.logging_config import get_logger
 
 # Import configuration
-from config import OCR_CONFIDENCE_THRESHOLD, TESSERACT_LANGUAGE_MODELS
+from config import OCR_CONFIDENCE_THRESHOLD, OCR_LAYOUT_CACHE_SIZE, TESSERACT_LANGUAGE_MODELS
+
+# Assume uniform text, default OCR engine
+_OCR_CONFIG = '--psm 6 --oem 3'
+
+# Language is detected on a full-width band through the middle of the page, this
+# fraction of its height; a page decides the language once its sample has more than
+# the given number of Chinese characters or Latin letters
+_LANGUAGE_SAMPLE_FRACTION = 0.25
+_LANGUAGE_MIN_CHINESE_CHARS = 10
+_LANGUAGE_MIN_LATIN_CHARS = 40
+
+# Pages whose text layer holds at least this many characters per square point
+# (about 240 on a Letter page) are born-digital and read without OCR
+_DIGITAL_TEXT_MIN_DENSITY = 0.0005
+
+# Pages are OCR'd at the first resolution; those read with low confidence are
+# rendered and OCR'd again at the second. Tesseract time grows with pixel count
+_OCR_DPI = 200
+_OCR_RETRY_DPI = 300
+
+# Pages OCR'd by one Tesseract run; each run pays the process start and model load
+_OCR_BATCH_PAGES = 8
+
+# Prepared pages buffered ahead of OCR; a render thread fills the buffer while
+# Tesseract reads the pages already in it
+_PREFETCH_PAGES = 2
+
+# Gray level at or above which a preprocessed pixel becomes paper rather than ink
+_BINARIZE_THRESHOLD = 128
+
+
+@lru_cache(maxsize=None)
+def _tesseract_version() -> str:
+    """
+    Tesseract's version, probed once per process
+
+    Each probe starts a `tesseract --version` subprocess. Failures raise and
+    are not cached, so a missing binary is looked for again on the next call.
+    """
+    return str(pytesseract.get_tesseract_version())
+
+
+def _code_points(text: str) -> np.ndarray:
+    """Code points of a string as a uint32 array"""
+    return np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+
+
+def _count_cjk(text: str) -> int:
+    """Number of CJK unified ideographs (U+4E00 to U+9FFF) in a string"""
+    codes = _code_points(text)
+    return int(np.count_nonzero((codes >= 0x4E00) & (codes <= 0x9FFF)))
+
+
+def _count_latin(text: str) -> int:
+    """Number of ASCII letters in a string"""
+    codes = _code_points(text)
+    return int(np.count_nonzero(((codes >= 0x41) & (codes <= 0x5A)) | ((codes >= 0x61) & (codes <= 0x7A))))
+
+
+def _hocr_text(hocr: bytes) -> str:
+    """
+    Plain text of a Tesseract hOCR page
+
+    Words are joined by spaces, lines by newlines and paragraphs by blank
+    lines, as in image_to_string output.
+    """
+    paragraphs = []
+    for paragraph in lxml_html.fromstring(hocr).xpath("//*[@class='ocr_par']"):
+        lines = []
+        # Lines are ocr_line, ocr_caption, ocr_header or ocr_textfloat spans
+        for line in paragraph.xpath(".//span[starts-with(@class, 'ocr_')]"):
+            words = [word.text_content().strip() for word in line.xpath("./span[@class='ocrx_word']")]
+            line_text = ' '.join(word for word in words if word)
+            if line_text:
+                lines.append(line_text)
+        if lines:
+            paragraphs.append('\n'.join(lines))
+    return '\n\n'.join(paragraphs) + '\n' if paragraphs else ''
+
+
+def _binarize_and_denoise(gray: Image.Image) -> Image.Image:
+    """
+    Threshold a grayscale page and 3x3 median filter the result in one NumPy pass
+
+    The median of nine 0/1 values is 1 when five or more are set, so summing
+    shifted views of the edge-padded threshold mask matches point() thresholding
+    followed by ImageFilter.MedianFilter(3), without building the bilevel image
+    in between.
+    """
+    pixels = (np.asarray(gray, dtype=np.uint8) >= _BINARIZE_THRESHOLD).view(np.uint8)
+    height, width = pixels.shape
+    padded = np.pad(pixels, 1, mode='edge')
+    votes = np.zeros_like(pixels)
+    for dy in range(3):
+        for dx in range(3):
+            votes += padded[dy:dy + height, dx:dx + width]
+    return Image.fromarray(votes >= 5)
 
 
 @dataclass
@@ -49,11 +154,14 @@ class OCRService:
     def __init__(self):
         self.logger = get_logger("ocr_service")
         self.supported_languages = self._parse_language_models(TESSERACT_LANGUAGE_MODELS)
+        # (text, hOCR, language) of recent layout-aware OCR calls, keyed by
+        # (image digest, requested language), least recently used first
+        self._layout_cache = OrderedDict()
+        self._layout_cache_lock = threading.Lock()
 
         # Verify Tesseract is available
         try:
-            pytesseract.get_tesseract_version()
-            self.logger.info(f"Tesseract version: {pytesseract.get_tesseract_version()}")
+            self.logger.info(f"Tesseract version: {_tesseract_version()}")
         except Exception as e:
             self.logger.error(f"Tesseract not available: {str(e)}")
             raise RuntimeError("Tesseract OCR engine not found")
@@ -91,30 +199,34 @@ class OCRService:
             ocr_result = self._perform_ocr(processed_image, detected_language)
             processing_time = time.time() - start_time
 
-            # Create result
-            page_result = PageOCRResult(
-                page_num=page_num,
-                result=ocr_result,
-                image_size=image.size,
-                dpi=dpi,
-                warnings=[]
-            )
-
-            # Add warnings if confidence is low
-            if ocr_result.confidence < OCR_CONFIDENCE_THRESHOLD:
-                page_result.warnings.append(
-                    f"Low OCR confidence ({ocr_result.confidence:.1f}% < {OCR_CONFIDENCE_THRESHOLD}%)"
-                )
-
-            self.logger.debug(f"Page {page_num} OCR complete: {len(ocr_result.text)} chars, "
-                             f"confidence: {ocr_result.confidence:.1f}%")
-
-            return page_result
+            return self._page_result(page_num, image.size, dpi, ocr_result)
 
         except Exception as e:
             self.logger.error(f"OCR processing failed for page {page_num}: {str(e)}")
             raise RuntimeError(f"OCR processing failed: {str(e)}")
 
+    def _page_result(self, page_num: int, image_size: Tuple[int, int], dpi: int,
+                     ocr_result: OCRResult) -> PageOCRResult:
+        """Wrap a page's OCR result, warning when its confidence is low"""
+        page_result = PageOCRResult(
+            page_num=page_num,
+            result=ocr_result,
+            image_size=image_size,
+            dpi=dpi,
+            warnings=[]
+        )
+
+        # Add warnings if confidence is low
+        if ocr_result.confidence < OCR_CONFIDENCE_THRESHOLD:
+            page_result.warnings.append(
+                f"Low OCR confidence ({ocr_result.confidence:.1f}% < {OCR_CONFIDENCE_THRESHOLD}%)"
+            )
+
+        self.logger.debug(f"Page {page_num} OCR complete: {len(ocr_result.text)} chars, "
+                         f"confidence: {ocr_result.confidence:.1f}%")
+
+        return page_result
+
     def _preprocess_image(self, image: Image.Image) -> Tuple[Image.Image, List[str]]:
         """
         Apply image preprocessing to improve OCR accuracy
@@ -126,7 +238,8 @@ class OCRService:
             Tuple of (processed_image, applied_steps)
         """
         applied_steps = []
-        processed_image = image.convert('RGB')  # Ensure RGB mode
+        # Grayscale and RGB input are used as is; everything else is made RGB
+        processed_image = image if image.mode in ('L', 'RGB') else image.convert('RGB')
 
         try:
             # Check if image needs deskewing
@@ -134,22 +247,20 @@ class OCRService:
                 processed_image = self._deskew_image(processed_image)
                 applied_steps.append("deskew")
 
+            # Convert to grayscale for better OCR; the contrast check reads
+            # this single channel
+            if processed_image.mode != 'L':
+                processed_image = processed_image.convert('L')
+
             # Enhance contrast
             if self._needs_contrast_enhancement(processed_image):
                 enhancer = ImageEnhance.Contrast(processed_image)
                 processed_image = enhancer.enhance(1.5)
                 applied_steps.append("contrast_enhance")
 
-            # Convert to grayscale for better OCR
-            processed_image = processed_image.convert('L')
-
-            # Apply thresholding (binarization)
-            processed_image = self._apply_threshold(processed_image)
-            applied_steps.append("threshold")
-
-            # Denoise
-            processed_image = processed_image.filter(ImageFilter.MedianFilter(size=3))
-            applied_steps.append("denoise")
+            # Apply thresholding (binarization) and denoise
+            processed_image = _binarize_and_denoise(processed_image)
+            applied_steps.extend(["threshold", "denoise"])
 
         except Exception as e:
             self.logger.warning(f"Image preprocessing failed: {str(e)}")
@@ -190,19 +301,6 @@ class OCRService:
         except Exception:
             return False
 
-    def _apply_threshold(self, image: Image.Image) -> Image.Image:
-        """Apply thresholding to binarize image"""
-        try:
-            # Convert to grayscale if not already
-            if image.mode != 'L':
-                image = image.convert('L')
-
-            # Apply adaptive threshold
-            threshold = 128
-            return image.point(lambda x: 0 if x < threshold else 255, '1')
-        except Exception:
-            return image
-
     def _detect_language(self, image: Image.Image) -> str:
         """
         Detect the primary language in the image
@@ -210,27 +308,46 @@ class OCRService:
         Returns:
             Language code (e.g., 'chi_sim', 'eng')
         """
+        # Fallback to English
+        return self._sample_language(image) or 'eng'
+
+    def _sample_language(self, image: Image.Image) -> Optional[str]:
+        """
+        Detect the language from a band through the middle of the image
+
+        Returns:
+            Language code, or None when the sample holds too little text to tell
+        """
         try:
             # Quick OCR for language detection
             config = '--psm 6'  # Assume uniform block of text
 
+            # Body text usually runs through the middle of the page, and OCR
+            # time grows with the area read
+            band_height = int(image.height * _LANGUAGE_SAMPLE_FRACTION)
+            if band_height > 0:
+                top = (image.height - band_height) // 2
+                image = image.crop((0, top, image.width, top + band_height))
+
             # Try Chinese first
             try:
-                chinese_result = pytesseract.image_to_string(
+                sample_result = pytesseract.image_to_string(
                     image, lang='chi_sim+chi_tra', config=config
                 )
-                chinese_text = re.sub(r'[^\u4e00-\u9fff]', '', chinese_result)
-                if len(chinese_text) > 10:
-                    return 'chi_sim+chi_tra'
             except Exception:
-                pass
+                return None
+
+            if _count_cjk(sample_result) > _LANGUAGE_MIN_CHINESE_CHARS:
+                return 'chi_sim+chi_tra'
 
-            # Fallback to English
-            return 'eng'
+            if _count_latin(sample_result) > _LANGUAGE_MIN_LATIN_CHARS:
+                return 'eng'
+
+            return None
 
         except Exception as e:
             self.logger.warning(f"Language detection failed: {str(e)}")
-            return 'eng'  # Default to English
+            return None
 
     def _perform_ocr(self, image: Image.Image, language: str) -> OCRResult:
         """
@@ -244,67 +361,104 @@ class OCRService:
             OCRResult with text and confidence scores
         """
         try:
-            # Configure Tesseract
-            config = '--psm 6 --oem 3'  # Assume uniform text, default OCR engine
-
             # Get word-level data with confidence
             data = pytesseract.image_to_data(
-                image, lang=language, config=config, output_type=pytesseract.Output.DICT
-            )
-
-            # Extract text and confidences
-            text_parts = []
-            word_confidences = []
-            total_confidence = 0
-            word_count = 0
-
-            for i in range(len(data['text'])):
-                word = data['text'][i].strip()
-                if word:
-                    conf = int(data['conf'][i])
-                    text_parts.append(word)
-                    word_confidences.append((word, conf))
-                    total_confidence += conf
-                    word_count += 1
-
-            # Calculate overall confidence
-            overall_confidence = (total_confidence / word_count) if word_count > 0 else 0
-
-            # Combine text
-            full_text = ' '.join(text_parts)
-
-            return OCRResult(
-                text=full_text,
-                confidence=overall_confidence,
-                language=language,
-                word_confidences=word_confidences,
-                preprocessing_applied=[],  # Will be set by caller
-                processing_time=0  # Will be set by caller
+                image, lang=language, config=_OCR_CONFIG, output_type=pytesseract.Output.DICT
             )
+            return self._build_ocr_result(zip(data['text'], data['conf']), language)
 
         except Exception as e:
             self.logger.error(f"OCR processing failed: {str(e)}")
             raise RuntimeError(f"OCR processing failed: {str(e)}")
 
-    def process_document(self, pdf_path: Path, page_range: Optional[Tuple[int, int]] = None) -> List[PageOCRResult]:
+    def _perform_ocr_batch(self, images: List[Image.Image], language: str) -> List[OCRResult]:
+        """
+        Perform OCR on several processed images with a single Tesseract run
+
+        Tesseract reads a text file listing image paths as a multi-page input,
+        so the batch shares one process start and one model load. Returns one
+        OCRResult per image, in order.
+        """
+        if len(images) == 1:
+            return [self._perform_ocr(images[0], language)]
+
+        try:
+            with tempfile.TemporaryDirectory(prefix='ocr_batch_') as batch_dir:
+                image_paths = []
+                for index, image in enumerate(images):
+                    image_path = os.path.join(batch_dir, f"page_{index:04d}.png")
+                    image.save(image_path, format='PNG')
+                    image_paths.append(image_path)
+
+                list_path = os.path.join(batch_dir, 'pages.txt')
+                with open(list_path, 'w') as f:
+                    f.write('\n'.join(image_paths) + '\n')
+
+                data = pytesseract.image_to_data(
+                    list_path, lang=language, config=_OCR_CONFIG, output_type=pytesseract.Output.DICT
+                )
+
+            # Rows carry the 1-based position of their image in the list
+            words_by_image = [[] for _ in images]
+            for page, word, conf in zip(data['page_num'], data['text'], data['conf']):
+                words_by_image[page - 1].append((word, conf))
+
+            return [self._build_ocr_result(words, language) for words in words_by_image]
+
+        except Exception as e:
+            self.logger.error(f"Batched OCR processing failed: {str(e)}")
+            raise RuntimeError(f"OCR processing failed: {str(e)}")
+
+    def _build_ocr_result(self, words: Iterable[Tuple[str, Any]], language: str) -> OCRResult:
+        """Combine Tesseract's (text, confidence) rows into an OCRResult"""
+        # Extract text and confidences
+        text_parts = []
+        word_confidences = []
+        total_confidence = 0
+        word_count = 0
+
+        for word, conf in words:
+            word = word.strip()
+            if word:
+                conf = int(conf)
+                text_parts.append(word)
+                word_confidences.append((word, conf))
+                total_confidence += conf
+                word_count += 1
+
+        # Calculate overall confidence
+        overall_confidence = (total_confidence / word_count) if word_count > 0 else 0
+
+        # Combine text
+        full_text = ' '.join(text_parts)
+
+        return OCRResult(
+            text=full_text,
+            confidence=overall_confidence,
+            language=language,
+            word_confidences=word_confidences,
+            preprocessing_applied=[],  # Will be set by caller
+            processing_time=0  # Will be set by caller
+        )
+
+    def process_document(self, pdf_path: Union[Path, bytes, BinaryIO], page_range: Optional[Tuple[int, int]] = None) -> List[PageOCRResult]:
         """
         Process an entire PDF document using OCR
 
         Args:
-            pdf_path: Path to PDF file
+            pdf_path: Path to PDF file, or the PDF already loaded in memory
             page_range: Optional tuple (start_page, end_page) to process specific pages
 
         Returns:
             List of PageOCRResult objects
         """
         try:
-            self.logger.info(f"Starting OCR processing for {pdf_path.name}")
+            self.logger.info(f"Starting OCR processing for {getattr(pdf_path, 'name', 'in-memory PDF')}")
 
             # Import here to avoid circular imports
             from pdf_parser import PDFParser
 
             pdf_parser = PDFParser()
-            results = []
 
             # Validate PDF first
             validation = pdf_parser.validate_pdf(pdf_path)
@@ -320,22 +474,36 @@ class OCRService:
             else:
                 start_page, end_page = 0, total_pages - 1
 
-            # Process each page
-            for page_num in range(start_page, end_page + 1):
-                try:
-                    # Render page as image
-                    image_bytes = pdf_parser.render_page_as_image(pdf_path, page_num, dpi=300)
-
-                    if image_bytes:
-                        page_result = self.process_page_image(image_bytes, page_num, dpi=300)
-                        results.append(page_result)
-                    else:
-                        self.logger.warning(f"Failed to render page {page_num} as image")
-
-                except Exception as e:
-                    self.logger.error(f"Failed to process page {page_num}: {str(e)}")
-                    # Continue with other pages
-                    continue
+            # One open document serves the text layer check and every page render
+            doc = pdf_parser.open_document(pdf_path)
+            try:
+                # Pages with a real text layer need no rendering or OCR
+                digital_results = self._digital_page_results(doc, start_page, end_page, dpi=_OCR_DPI)
+                results_by_page = dict(digital_results)
+
+                scanned_pages = [page_num for page_num in range(start_page, end_page + 1)
+                                 if page_num not in digital_results]
+                prepared = self._prefetch_pages(self._prepare_pages(pdf_parser, doc, scanned_pages, _OCR_DPI))
+                for page_result in self._ocr_prepared_pages(prepared, _OCR_DPI):
+                    results_by_page[page_result.page_num] = page_result
+
+                # Pages read poorly at the lower resolution get a second pass at full resolution,
+                # keeping whichever read is more confident
+                low_confidence = {
+                    page_num: page_result.result.language
+                    for page_num, page_result in results_by_page.items()
+                    if page_result.result.confidence < OCR_CONFIDENCE_THRESHOLD
+                }
+                if low_confidence:
+                    prepared = self._prefetch_pages(self._prepare_pages(pdf_parser, doc, sorted(low_confidence),
+                                                                        _OCR_RETRY_DPI, languages=low_confidence))
+                    for page_result in self._ocr_prepared_pages(prepared, _OCR_RETRY_DPI):
+                        if page_result.result.confidence >= results_by_page[page_result.page_num].result.confidence:
+                            results_by_page[page_result.page_num] = page_result
+            finally:
+                doc.close()
+
+            results = [results_by_page[page_num] for page_num in sorted(results_by_page)]
 
             self.logger.info(f"OCR processing complete: {len(results)} pages processed")
             return results
@@ -344,10 +512,175 @@ class OCRService:
             self.logger.error(f"Document OCR processing failed: {str(e)}")
             raise RuntimeError(f"Document OCR processing failed: {str(e)}")
 
+    def _digital_page_results(self, doc, start_page: int, end_page: int, dpi: int) -> Dict[int, PageOCRResult]:
+        """
+        Read born-digital pages from their embedded text layer
+
+        Args:
+            doc: Open PyMuPDF document
+
+        Returns:
+            PageOCRResult by page number for pages dense enough in text to skip
+            OCR, with full confidence; every other page is left out
+        """
+        digital_results = {}
+        zoom = dpi / 72.0
+        for page_num in range(start_page, end_page + 1):
+            try:
+                page = doc[page_num]
+                words = [word[4] for word in page.get_text("words")]
+                area = page.rect.width * page.rect.height
+                if not area or sum(len(word) for word in words) / area < _DIGITAL_TEXT_MIN_DENSITY:
+                    continue
+
+                text = ' '.join(words)
+                ocr_result = OCRResult(
+                    text=text,
+                    confidence=100.0,
+                    language='chi_sim+chi_tra' if _count_cjk(text) > _LANGUAGE_MIN_CHINESE_CHARS else 'eng',
+                    word_confidences=[(word, 100.0) for word in words],
+                    preprocessing_applied=[],
+                    processing_time=0
+                )
+                # Size the page would have rendered at, as OCR'd pages report
+                rendered = (page.rect * zoom).irect
+                image_size = (rendered.width, rendered.height)
+                digital_results[page_num] = self._page_result(page_num, image_size, dpi, ocr_result)
+            except Exception as e:
+                self.logger.warning(f"Text layer check failed for page {page_num}: {str(e)}")
+
+        if digital_results:
+            self.logger.info(f"{len(digital_results)} born-digital pages read from their text layer")
+        return digital_results
+
+    def _prepare_pages(self, pdf_parser, doc, page_nums: List[int],
+                       dpi: int, languages: Optional[Dict[int, str]] = None
+                       ) -> Iterator[Tuple[int, Tuple[int, int], Image.Image, str]]:
+        """
+        Render and preprocess pages for OCR, one at a time
+
+        Args:
+            doc: Open PyMuPDF document to render from
+            languages: OCR language per page; when not given it is detected
+
+        Yields:
+            Tuples of (page_num, image size, processed image, language); pages
+            that fail to render or preprocess are logged and skipped
+        """
+        # Documents are usually in one language, so the first page whose
+        # sample decides it sets the language for the pages after it
+        document_language = None
+        for page_num in page_nums:
+            try:
+                # Render page as image; OCR only needs the gray levels
+                image_bytes = pdf_parser.render_page_as_image(doc, page_num, dpi=dpi, grayscale=True)
+
+                if not image_bytes:
+                    self.logger.warning(f"Failed to render page {page_num} as image")
+                    continue
+
+                image = Image.open(io.BytesIO(image_bytes))
+                processed_image, _ = self._preprocess_image(image)
+                if languages is not None:
+                    language = languages[page_num]
+                else:
+                    language = document_language
+                    if language is None:
+                        document_language = self._sample_language(processed_image)
+                        language = document_language or 'eng'
+
+            except Exception as e:
+                self.logger.error(f"Failed to process page {page_num}: {str(e)}")
+                # Continue with other pages
+                continue
+
+            yield page_num, image.size, processed_image, language
+
+    def _prefetch_pages(self, prepared: Iterator[Tuple[int, Tuple[int, int], Image.Image, str]]
+                        ) -> Iterator[Tuple[int, Tuple[int, int], Image.Image, str]]:
+        """
+        Prepare pages on a render thread, up to _PREFETCH_PAGES ahead of the caller
+
+        Rendering runs in MuPDF and Tesseract in a subprocess, so with the next
+        pages rendered while the current ones are OCR'd a page costs the longer
+        of the two rather than their sum.
+        """
+        page_queue = queue.Queue(maxsize=_PREFETCH_PAGES)
+        stopped = threading.Event()
+
+        def render_pages() -> None:
+            try:
+                for page in prepared:
+                    if stopped.is_set():
+                        return
+                    page_queue.put(page)
+            except Exception as e:
+                page_queue.put(e)
+            finally:
+                page_queue.put(None)
+
+        threading.Thread(target=render_pages, daemon=True).start()
+        page = None
+        try:
+            while (page := page_queue.get()) is not None:
+                if isinstance(page, Exception):
+                    raise page
+                yield page
+        finally:
+            # Let the render thread finish if the caller stops early
+            if page is not None:
+                stopped.set()
+                while page_queue.get() is not None:
+                    pass
+
+    def _ocr_prepared_pages(self, prepared: Iterable[Tuple[int, Tuple[int, int], Image.Image, str]],
+                            dpi: int) -> List[PageOCRResult]:
+        """OCR prepared pages, batching consecutive pages in the same language"""
+        results = []
+        # (page_num, image size, processed image) of pages waiting for a Tesseract run
+        batch = []
+        batch_language = None
+        for page_num, image_size, processed_image, language in prepared:
+            if batch and (language != batch_language or len(batch) >= _OCR_BATCH_PAGES):
+                results.extend(self._ocr_page_batch(batch, batch_language, dpi))
+                batch = []
+            batch.append((page_num, image_size, processed_image))
+            batch_language = language
+
+        if batch:
+            results.extend(self._ocr_page_batch(batch, batch_language, dpi))
+        return results
+
+    def _ocr_page_batch(self, batch: List[Tuple[int, Tuple[int, int], Image.Image]], language: str,
+                        dpi: int) -> List[PageOCRResult]:
+        """OCR a batch of prepared pages, falling back to one page at a time if the batch fails"""
+        ocr_results = None
+        if len(batch) > 1:
+            try:
+                ocr_results = self._perform_ocr_batch([image for _, _, image in batch], language)
+            except Exception:
+                # Already logged; retry page by page so one bad page costs only itself
+                pass
+
+        if ocr_results is None:
+            ocr_results = []
+            for page_num, _, image in batch:
+                try:
+                    ocr_results.append(self._perform_ocr(image, language))
+                except Exception as e:
+                    self.logger.error(f"Failed to process page {page_num}: {str(e)}")
+                    ocr_results.append(None)
+
+        return [
+            self._page_result(page_num, image_size, dpi, ocr_result)
+            for (page_num, image_size, _), ocr_result in zip(batch, ocr_results)
+            if ocr_result is not None
+        ]
+
     def is_available(self) -> bool:
         """Check if OCR service is available"""
         try:
-            pytesseract.get_tesseract_version()
+            _tesseract_version()
             return True
         except Exception:
             return False
@@ -368,16 +701,33 @@ class OCRService:
             Dictionary with text and layout information
         """
         try:
-            if not language:
-                language = self._detect_language(image)
+            # Repeated calls on the same image skip language detection and Tesseract
+            digest = hashlib.blake2b(repr((image.mode, image.size)).encode(), digest_size=16)
+            digest.update(image.tobytes())
+            cache_key = (digest.digest(), language or None)
+            with self._layout_cache_lock:
+                cached = self._layout_cache.get(cache_key)
+                if cached is not None:
+                    self._layout_cache.move_to_end(cache_key)
+            if cached is not None:
+                text, hocr, language = cached
+            else:
+                if not language:
+                    language = self._detect_language(image)
 
-            # Use hOCR output to preserve layout
-            hocr = pytesseract.image_to_pdf_or_hocr(
-                image, lang=language, extension='hocr', config='--psm 6'
-            )
+                # Use hOCR output to preserve layout
+                hocr = pytesseract.image_to_pdf_or_hocr(
+                    image, lang=language, extension='hocr', config='--psm 6'
+                )
+
+                # Regular text is read from the hOCR rather than a second Tesseract run
+                text = _hocr_text(hocr)
 
-            # Also get regular text for comparison
-            text = pytesseract.image_to_string(image, lang=language, config='--psm 6')
+                if OCR_LAYOUT_CACHE_SIZE > 0:
+                    with self._layout_cache_lock:
+                        self._layout_cache[cache_key] = (text, hocr, language)
+                        while len(self._layout_cache) > OCR_LAYOUT_CACHE_SIZE:
+                            self._layout_cache.popitem(last=False)
 
             return {
                 'text': text,
@@ -9,16 +9,54 @@ This module provides high-quality PDF parsing capabilities including:
 - Scan detection
 """
 
+import atexit
+import hashlib
 import logging
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Any, Union
 
 import fitz  # PyMuPDF
+import numpy as np
 from utils.logging_config import get_logger
 
+# A PDF given as a file path, its raw bytes, or a binary file object
+PDFSource = Union[Path, bytes, BinaryIO]
 
-@dataclass
+# Bytes read from each end of the file by peek_header
+_PEEK_SIZE = 1024
+
+# PyMuPDF's "dict" extraction flags without image blocks; only text blocks are
+# read from it, and image blocks carry their decoded image data
+_TEXT_DICT_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+
+# Open documents kept for reuse across calls, least recently used first; each
+# reopen re-reads the xref table and loses the fonts MuPDF has already loaded.
+# Entries are (path, document, lock) keyed by (path, mtime, size)
+_DOCUMENT_CACHE_SIZE = 4
+_document_cache = OrderedDict()
+_document_cache_lock = threading.Lock()
+
+
+def close_cached_documents() -> None:
+    """Close and forget every document kept by the document cache"""
+    with _document_cache_lock:
+        entries = list(_document_cache.values())
+        _document_cache.clear()
+    for _, doc, lock in entries:
+        with lock:
+            doc.close()
+
+
+atexit.register(close_cached_documents)
+
+
+# Slotted: documents yield one instance per text span, and parse workers pickle them back
+@dataclass(slots=True)
 class TextBlock:
     """Represents a block of text with position and font information"""
     text: str
@@ -32,6 +70,16 @@ class TextBlock:
     page_num: int
     block_id: int
 
+    def __reduce__(self):
+        # Positional constructor arguments pickle faster than the slot state dataclass provides
+        return TextBlock, (self.text, self.x0, self.y0, self.x1, self.y1, self.font_name,
+                           self.font_size, self.is_bold, self.page_num, self.block_id)
+
+
+def text_block_lengths(text_blocks: List[TextBlock]) -> np.ndarray:
+    """Character count of every text block, as an int32 array"""
+    return np.fromiter((len(block.text) for block in text_blocks), dtype=np.int32, count=len(text_blocks))
+
 
 @dataclass
 class PDFMetadata:
@@ -68,48 +116,148 @@ class PDFParser:
     def __init__(self):
         self.logger = get_logger("pdf_parser")
 
-    def parse_pdf(self, pdf_path: Path) -> Tuple[PDFMetadata, List[TextBlock], List[ImageInfo]]:
+    def parse_pdf(self,
+                  pdf_path: PDFSource,
+                  page_range: Optional[Tuple[int, int]] = None,
+                  text_detail: bool = True) -> Tuple[PDFMetadata, List[TextBlock], List[ImageInfo]]:
         """
         Parse PDF and extract metadata, text blocks, and images
 
         Args:
-            pdf_path: Path to PDF file
+            pdf_path: Path to PDF file, or the PDF already loaded in memory
+            page_range: Optional tuple (start_page, end_page), inclusive and
+                0-indexed, to parse only part of the document
+            text_detail: Extract positioned text blocks; when False only the
+                amount of text is measured, for the scan probability
 
         Returns:
-            Tuple of (metadata, text_blocks, images)
+            Tuple of (metadata, text_blocks, images). The scan probability
+            covers the parsed pages only; text_blocks is empty without
+            text_detail.
 
         Raises:
             ValueError: If PDF cannot be parsed
             IOError: If file cannot be read
         """
         try:
-            doc = fitz.open(str(pdf_path))
-            self.logger.info(f"Parsing PDF: {pdf_path.name}, pages: {len(doc)}")
+            with self._cached_document(pdf_path) as doc:
+                self.logger.info(f"Parsing PDF: {getattr(pdf_path, 'name', 'in-memory PDF')}, pages: {len(doc)}")
+
+                # Extract metadata
+                metadata = self._extract_metadata(doc)
+
+                # Determine page range
+                if page_range:
+                    start_page = max(0, page_range[0])
+                    end_page = min(len(doc) - 1, page_range[1])
+                else:
+                    start_page, end_page = 0, len(doc) - 1
+                page_numbers = range(start_page, end_page + 1)
+
+                # Extract text blocks from the selected pages
+                text_blocks = []
+                if text_detail:
+                    for page_num in page_numbers:
+                        page = doc[page_num]
+                        blocks = self._extract_text_blocks(page, page_num)
+                        text_blocks.extend(blocks)
+
+                # Extract images
+                images = self._extract_images(doc, page_numbers)
+
+                # Calculate scan probability
+                if text_detail:
+                    metadata.scan_probability = self._calculate_scan_probability(text_blocks, len(page_numbers))
+                else:
+                    total_text_length = sum(self._count_text_chars(doc[page_num]) for page_num in page_numbers)
+                    metadata.scan_probability = self.estimate_scan_probability(total_text_length, len(page_numbers))
+
+                self.logger.info(f"Parsing complete: {len(text_blocks)} text blocks, {len(images)} images")
+                return metadata, text_blocks, images
 
-            # Extract metadata
-            metadata = self._extract_metadata(doc)
+        except Exception as e:
+            self.logger.error(f"Failed to parse PDF {getattr(pdf_path, 'name', 'in-memory PDF')}: {str(e)}")
+            raise ValueError(f"PDF parsing failed: {str(e)}")
 
-            # Extract text blocks from all pages
-            text_blocks = []
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                blocks = self._extract_text_blocks(page, page_num)
-                text_blocks.extend(blocks)
+    def get_page_count(self, pdf_path: PDFSource) -> int:
+        """Return the number of pages without parsing page content"""
+        with self._cached_document(pdf_path) as doc:
+            return len(doc)
 
-            # Extract images
-            images = self._extract_images(doc)
+    def get_page_stream_hashes(self, pdf_source: PDFSource) -> List[str]:
+        """
+        Fingerprint each page by its size, content stream and XObject streams
 
-            # Calculate scan probability
-            metadata.scan_probability = self._calculate_scan_probability(text_blocks, len(doc))
+        Returns:
+            One blake2b hex digest per page; unchanged pages keep their digest
+            when other pages of the document are edited
+        """
+        with self._cached_document(pdf_source) as doc:
+            page_hashes = []
+            for page in doc:
+                digest = hashlib.blake2b(repr(tuple(page.rect)).encode(), digest_size=16)
+                digest.update(page.read_contents())
+                for xref in [image[0] for image in page.get_images(full=True)] + \
+                        [xobject[0] for xobject in page.get_xobjects()]:
+                    digest.update(doc.xref_stream_raw(xref) or b'')
+                page_hashes.append(digest.hexdigest())
+            return page_hashes
+
+    def open_document(self, pdf_source: PDFSource) -> fitz.Document:
+        """Open a PDF from a path, from bytes, or from a binary file object"""
+        if isinstance(pdf_source, (bytes, bytearray)):
+            return fitz.open(stream=pdf_source, filetype="pdf")
+        if hasattr(pdf_source, 'read'):
+            pdf_source.seek(0)
+            return fitz.open(stream=pdf_source.read(), filetype="pdf")
+        return fitz.open(str(pdf_source))
+
+    @contextmanager
+    def _cached_document(self, pdf_source: PDFSource) -> Iterator[fitz.Document]:
+        """
+        Open a PDF through the document cache, holding the document's lock while in use
 
-            doc.close()
+        The document stays open for later calls and must not be closed by the
+        caller. In-memory sources are opened afresh each time and closed
+        afterwards: file objects may be read again between calls, and a cached
+        bytes document would pin a whole PDF in memory after its conversion.
+        """
+        if isinstance(pdf_source, (bytes, bytearray)) or hasattr(pdf_source, 'read'):
+            doc = self.open_document(pdf_source)
+            try:
+                yield doc
+            finally:
+                doc.close()
+            return
+        else:
+            stat = os.stat(pdf_source)
+            key = (os.fspath(pdf_source), stat.st_mtime_ns, stat.st_size)
+
+        evicted = []
+        with _document_cache_lock:
+            entry = _document_cache.get(key)
+            if entry is not None:
+                _document_cache.move_to_end(key)
+            else:
+                entry = (pdf_source, self.open_document(pdf_source), threading.Lock())
+                _document_cache[key] = entry
+                while len(_document_cache) > _DOCUMENT_CACHE_SIZE:
+                    evicted.append(_document_cache.popitem(last=False)[1])
+
+        for _, doc, lock in evicted:
+            with lock:
+                doc.close()
 
-            self.logger.info(f"Parsing complete: {len(text_blocks)} text blocks, {len(images)} images")
-            return metadata, text_blocks, images
+        with entry[2]:
+            yield entry[1]
 
-        except Exception as e:
-            self.logger.error(f"Failed to parse PDF {pdf_path}: {str(e)}")
-            raise ValueError(f"PDF parsing failed: {str(e)}")
+    def _source_size(self, pdf_source: PDFSource) -> int:
+        """Size of the PDF source in bytes"""
+        if isinstance(pdf_source, (bytes, bytearray)):
+            return len(pdf_source)
+        if hasattr(pdf_source, 'seek'):
+            return pdf_source.seek(0, 2)
+        return Path(pdf_source).stat().st_size
 
     def _extract_metadata(self, doc: fitz.Document) -> PDFMetadata:
         """Extract PDF metadata"""
@@ -135,7 +283,7 @@ class PDFParser:
 
         try:
             # Get text blocks with position information
-            blocks = page.get_text("dict")
+            blocks = page.get_text("dict", flags=_TEXT_DICT_FLAGS)
 
             for block in blocks.get("blocks", []):
                 if block.get("type") == 0:  # Text block
@@ -170,11 +318,32 @@ class PDFParser:
 
         return text_blocks
 
-    def _extract_images(self, doc: fitz.Document) -> List[ImageInfo]:
-        """Extract all images from PDF"""
+    def _count_text_chars(self, page: fitz.Page) -> int:
+        """
+        Number of characters in a page's text layer, without building text blocks
+
+        Line breaks are not counted, so the total matches the text blocks of
+        the page when each line is a single span.
+        """
+        try:
+            text = page.get_text("text")
+            return len(text) - text.count('\n')
+        except Exception as e:
+            self.logger.warning(f"Error counting text on page {page.number}: {str(e)}")
+            return 0
+
+    def _extract_images(self, doc: fitz.Document, page_numbers: Optional[range] = None) -> List[ImageInfo]:
+        """Extract all images from PDF, optionally limited to some pages"""
         images = []
 
-        for page_num in range(len(doc)):
+        if page_numbers is None:
+            page_numbers = range(len(doc))
+
+        # Images placed on several pages (logos, headers) share one xref and are
+        # decoded once; every placement shares the same image bytes
+        extracted_images = {}
+
+        for page_num in page_numbers:
             page = doc[page_num]
             try:
                 # Get image list from page
@@ -184,7 +353,10 @@ class PDFParser:
                     try:
                         # Extract image
                         xref = img[0]
-                        base_image = doc.extract_image(xref)
+                        if xref in extracted_images:
+                            base_image = extracted_images[xref]
+                        else:
+                            base_image = extracted_images[xref] = doc.extract_image(xref)
 
                         if base_image:
                             # Get image position
@@ -217,6 +389,20 @@ class PDFParser:
         """
         Calculate probability that PDF is scanned based on text extraction results
 
+        Returns:
+            Float between 0.0 (definitely digital) and 1.0 (definitely scanned)
+        """
+        total_text_length = int(text_block_lengths(text_blocks).sum())
+        return self.estimate_scan_probability(total_text_length, page_count)
+
+    def estimate_scan_probability(self, total_text_length: int, page_count: int) -> float:
+        """
+        Estimate scan probability from the amount of extracted text
+
+        Args:
+            total_text_length: Number of characters extracted from the pages
+            page_count: Number of pages the text was extracted from
+
         Returns:
             Float between 0.0 (definitely digital) and 1.0 (definitely scanned)
         """
@@ -224,7 +410,6 @@ class PDFParser:
             return 1.0
 
         # Calculate average text per page
-        total_text_length = sum(len(block.text) for block in text_blocks)
         avg_text_per_page = total_text_length / page_count
 
         # If very little text extracted, likely scanned
@@ -258,45 +443,84 @@ class PDFParser:
             self.logger.warning(f"Failed to extract bookmarks: {str(e)}")
             return []
 
-    def render_page_as_image(self, pdf_path: Path, page_num: int, dpi: int = 200) -> Optional[bytes]:
+    def render_page_as_image(self, pdf_path: Union[PDFSource, fitz.Document], page_num: int, dpi: int = 200,
+                             grayscale: bool = False) -> Optional[bytes]:
         """
         Render a specific page as an image for OCR processing
 
         Args:
-            pdf_path: Path to PDF file
+            pdf_path: Path to PDF file, the PDF already loaded in memory, or an
+                open document, which callers rendering many pages pass to
+                avoid reopening the source
             page_num: Page number to render (0-indexed)
             dpi: Resolution for rendering
+            grayscale: Render a single gray channel instead of RGB
 
         Returns:
             Image bytes as PNG, or None if rendering fails
         """
         try:
-            doc = fitz.open(str(pdf_path))
+            if isinstance(pdf_path, fitz.Document):
+                pix = self._render_pixmap(pdf_path, page_num, dpi, grayscale)
+            else:
+                with self._cached_document(pdf_path) as doc:
+                    pix = self._render_pixmap(doc, page_num, dpi, grayscale)
 
-            if page_num >= len(doc):
-                doc.close()
+            if pix is None:
                 return None
 
-            page = doc[page_num]
-
-            # Set zoom level based on DPI
-            zoom = dpi / 72.0  # Default PDF is 72 DPI
-            matrix = fitz.Matrix(zoom, zoom)
-
-            # Render page to pixmap
-            pix = page.get_pixmap(matrix=matrix, alpha=False)
-
             # Convert to PNG bytes
-            img_bytes = pix.tobytes("png")
-
-            doc.close()
-            return img_bytes
+            return pix.tobytes("png")
 
         except Exception as e:
             self.logger.error(f"Failed to render page {page_num} as image: {str(e)}")
             return None
 
-    def validate_pdf(self, pdf_path: Path) -> Dict[str, Any]:
+    def _render_pixmap(self, doc: fitz.Document, page_num: int, dpi: int, grayscale: bool) -> Optional[fitz.Pixmap]:
+        """Rasterize one page of an open document, or None past the last page"""
+        if page_num >= len(doc):
+            return None
+
+        page = doc[page_num]
+
+        # Set zoom level based on DPI
+        zoom = dpi / 72.0  # Default PDF is 72 DPI
+        matrix = fitz.Matrix(zoom, zoom)
+
+        # Render page to pixmap
+        colorspace = fitz.csGRAY if grayscale else fitz.csRGB
+        return page.get_pixmap(matrix=matrix, colorspace=colorspace, alpha=False)
+
+    def peek_header(self, pdf_source: PDFSource) -> Dict[str, bool]:
+        """
+        Cheap pre-check that only looks at the first and last 1 KB of the file
+
+        Returns:
+            Dictionary with 'has_pdf_header' (the %PDF- magic) and
+            'has_encrypt_marker' (/Encrypt in the trailer)
+        """
+        if isinstance(pdf_source, (bytes, bytearray)):
+            head, tail = pdf_source[:_PEEK_SIZE], pdf_source[-_PEEK_SIZE:]
+        elif hasattr(pdf_source, 'read'):
+            head, tail = self._peek_stream(pdf_source)
+        else:
+            with open(pdf_source, 'rb') as f:
+                head, tail = self._peek_stream(f)
+
+        return {
+            'has_pdf_header': b'%PDF-' in head,
+            'has_encrypt_marker': b'/Encrypt' in tail
+        }
+
+    def _peek_stream(self, stream: BinaryIO) -> Tuple[bytes, bytes]:
+        """Read the first and last 1 KB of a binary stream"""
+        stream.seek(0)
+        head = stream.read(_PEEK_SIZE)
+        size = stream.seek(0, 2)
+        stream.seek(max(0, size - _PEEK_SIZE))
+        return head, stream.read(_PEEK_SIZE)
+
+    def validate_pdf(self, pdf_path: PDFSource) -> Dict[str, Any]:
         """
         Validate PDF file and return analysis
 
@@ -304,27 +528,25 @@ class PDFParser:
             Dictionary with validation results
         """
         try:
-            doc = fitz.open(str(pdf_path))
-
-            result = {
-                'is_valid': True,
-                'page_count': len(doc),
-                'is_encrypted': doc.needs_pass,
-                'has_bookmarks': len(doc.get_toc()) > 0,
-                'file_size': pdf_path.stat().st_size,
-                'version': getattr(doc, 'pdf_version', 'unknown')
-            }
-
-            # Quick text extraction test
-            try:
-                first_page = doc[0]
-                text_sample = first_page.get_text()
-                result['has_text'] = len(text_sample.strip()) > 10
-            except:
-                result['has_text'] = False
-
-            doc.close()
-            return result
+            with self._cached_document(pdf_path) as doc:
+                result = {
+                    'is_valid': True,
+                    'page_count': len(doc),
+                    'is_encrypted': doc.needs_pass,
+                    'has_bookmarks': len(doc.get_toc()) > 0,
+                    'file_size': self._source_size(pdf_path),
+                    'version': getattr(doc, 'pdf_version', 'unknown')
+                }
+
+                # Quick text extraction test
+                try:
+                    first_page = doc[0]
+                    text_sample = first_page.get_text()
+                    result['has_text'] = len(text_sample.strip()) > 10
+                except:
+                    result['has_text'] = False
+
+                return result
 
         except Exception as e:
             return {
@@ -931,7 +931,7 @@ class ConversionService:
             self.logger.info(f"Starting enhanced PDF to EPUB conversion: {pdf_path.name}")
 
             # Use enhanced pipeline
-            result = self.enhanced_pipeline.convert_pdf_to_epub(pdf_path, epub_path)
+            result = await self.enhanced_pipeline.aconvert_pdf_to_epub(pdf_path, epub_path)
 
             if result.success:
                 self.logger.info(f"Enhanced conversion successful: {result.method_used}, "
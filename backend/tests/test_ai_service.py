@@ -1,7 +1,7 @@
 import pytest
 import asyncio
 from unittest.mock import Mock, patch, AsyncMock
-from services.ai_service import AIService, AIResult
+from services.ai_service import AIService, AIResult, RetryableAPIError
 from utils.exceptions import AIServiceError
 
 
@@ -133,6 +133,22 @@ class TestGenerateSummary:
             with pytest.raises(AIServiceError, match="AI processing failed"):
                 await ai_service.generate_summary("Test text")
 
+    @pytest.mark.asyncio
+    async def test_generate_summary_retries_rate_limited_call(self, ai_service):
+        """Test a rate-limited request is retried with backoff"""
+        with patch.object(ai_service, "_call_openai_compatible_api", new_callable=AsyncMock) as mock_call, \
+                patch("services.ai_service.asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+            mock_call.side_effect = [
+                RetryableAPIError("HTTP 429: Rate limit exceeded"),
+                ("Summary.", {})
+            ]
+
+            result = await ai_service.generate_summary("Test text")
+
+            assert result.content == "Summary."
+            assert mock_call.call_count == 2
+            mock_sleep.assert_awaited_with(1.0)
+
     @pytest.mark.asyncio
     async def test_generate_summary_truncates_long_text(self, ai_service):
         """Test that long input text is truncated to 2000 characters"""
@@ -272,6 +288,36 @@ class TestBatchProcessTexts:
             assert isinstance(results[1], AIServiceError)
             assert isinstance(results[2], AIResult)
 
+    @pytest.mark.asyncio
+    async def test_batch_process_respects_provider_concurrency(self, mock_ai_config):
+        """Test concurrent batches share the provider's request limit"""
+        mock_ai_config.get_provider_config.return_value = {
+            "api_key": "test-api-key",
+            "base_url": "https://api.deepseek.com",
+            "model": "deepseek-chat",
+            "api_type": "openai",
+            "max_concurrency": 2
+        }
+        service = AIService()
+        in_flight = 0
+        peak = 0
+
+        async def fake_summary(text, **kwargs):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return AIResult(text, "deepseek", "deepseek-chat", 0.01)
+
+        with patch.object(service, "generate_summary", side_effect=fake_summary):
+            await asyncio.gather(
+                service.batch_process_texts(["a", "b", "c"]),
+                service.batch_process_texts(["d", "e", "f"])
+            )
+
+        assert peak == 2
+
 
 class TestOpenAICompatibleAPI:
     """Test _call_openai_compatible_api method"""
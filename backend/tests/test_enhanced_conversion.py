@@ -8,19 +8,33 @@ This module contains comprehensive tests for the enhanced conversion system:
 - Fallback mechanism tests
 """
 
+import io
+import os
+import fitz
+import numpy as np
 import pytest
+import queue
 import tempfile
+import threading
+import zipfile
+from datetime import datetime
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 from unittest.mock import Mock, patch
 
+from ebooklib import epub
+from PIL import Image
+
 # Test the individual components
-from services.conversion.pdf_parser import PDFParser
-from services.conversion.layout_analyzer import LayoutAnalyzer
+from services.conversion.pdf_parser import PDFParser, ImageInfo
+from services.conversion.layout_analyzer import LayoutAnalyzer, _analyze_page_worker
+from services.conversion.ocr_service import OCRService
 from services.conversion.chapter_detector import ChapterDetector
 from services.conversion.image_processor import ImageProcessor
-from services.conversion.epub_generator import EpubGenerator
+from services.conversion.epub_generator import EpubGenerator, EpubChapter, EpubMetadata
 from services.conversion.calibre_fallback import CalibreFallback
 from services.conversion.conversion_pipeline import ConversionPipeline
+from services.conversion.conversion_cache import ConversionCache
 
 
 class TestPDFParser:
@@ -42,6 +56,26 @@ class TestPDFParser:
         assert not result['is_valid']
         assert 'error' in result
 
+    def test_peek_header(self):
+        """Test cheap header check on in-memory data"""
+        result = self.parser.peek_header(b"%PDF-1.7\n...\ntrailer << /Encrypt 5 0 R >>\n%%EOF")
+        assert result['has_pdf_header']
+        assert result['has_encrypt_marker']
+        assert not self.parser.peek_header(b"not a pdf")['has_pdf_header']
+
+    def test_bytes_sources_are_not_cached(self):
+        """Test in-memory PDFs are not kept open after the call"""
+        from services.conversion import pdf_parser
+
+        doc = fitz.open()
+        doc.new_page()
+        pdf_bytes = doc.tobytes()
+        doc.close()
+
+        cached = len(pdf_parser._document_cache)
+        assert self.parser.get_page_count(pdf_bytes) == 1
+        assert len(pdf_parser._document_cache) == cached
+
 
 class TestLayoutAnalyzer:
     """Test Layout Analyzer functionality"""
@@ -57,6 +91,58 @@ class TestLayoutAnalyzer:
         assert result['multi_column_pages'] == 0
         assert result['single_column_pages'] == 0
 
+    def test_page_worker_reopens_rewritten_file(self):
+        """Test a worker does not serve pages from a stale copy of a rewritten path"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            pdf_path = str(Path(temp_dir) / "book.pdf")
+            for page_count in (1, 2):
+                doc = fitz.open()
+                for _ in range(page_count):
+                    doc.new_page().insert_text((72, 72), "Chapter text")
+                doc.save(pdf_path)
+                doc.close()
+
+                # The second file's last page only exists if the path was reopened
+                assert len(_analyze_page_worker(pdf_path, page_count - 1)) == 2
+
+
+class TestOCRService:
+    """Test OCR Service functionality"""
+
+    def setup_method(self):
+        with patch('services.conversion.ocr_service._tesseract_version', return_value="5.3.0"):
+            self.service = OCRService()
+        self.pages = [Image.new("L", (40 + page_num, 20), 255) for page_num in range(3)]
+
+    def test_batch_ocr_splits_rows_by_page(self):
+        """Test one batched Tesseract run is split back into one result per image"""
+        data = {
+            'page_num': [1, 1, 1, 2, 3, 3],
+            'text': ["", "First", "page", "", "Third", "page"],
+            'conf': [-1, 90, 80, -1, 70, 60],
+        }
+        with patch('services.conversion.ocr_service.pytesseract.image_to_data', return_value=data) as image_to_data:
+            results = self.service._perform_ocr_batch(self.pages, "eng")
+
+        image_to_data.assert_called_once()
+        assert image_to_data.call_args.args[0].endswith("pages.txt")
+        assert [result.text for result in results] == ["First page", "", "Third page"]
+        assert [result.confidence for result in results] == [85, 0, 65]
+
+    def test_page_batch_falls_back_to_single_pages(self):
+        """Test a failed batch is retried page by page, dropping only the pages that fail"""
+        def image_to_data(image, **kwargs):
+            if isinstance(image, str) or image is self.pages[1]:
+                raise RuntimeError("tesseract failed")
+            return {'text': ["Page", f"{self.pages.index(image)}"], 'conf': [90, 90]}
+
+        batch = [(page_num, image.size, image) for page_num, image in enumerate(self.pages)]
+        with patch('services.conversion.ocr_service.pytesseract.image_to_data', side_effect=image_to_data):
+            results = self.service._ocr_page_batch(batch, "eng", 200)
+
+        assert [result.page_num for result in results] == [0, 2]
+        assert [result.result.text for result in results] == ["Page 0", "Page 2"]
+
 
 class TestChapterDetector:
     """Test Chapter Detector functionality"""
@@ -70,6 +156,21 @@ class TestChapterDetector:
         assert len(result.chapters) == 0
         assert result.total_confidence == 0.0
 
+    def test_largest_per_page_prefers_first_block_on_ties(self):
+        """Test per-page font size argmax keeps the earliest block on ties"""
+        from services.conversion.chapter_detector import TextBlockColumns
+
+        blocks = [
+            Mock(text="a", font_size=12.0, is_bold=False, page_num=0, y0=10.0),
+            Mock(text="b", font_size=18.0, is_bold=True, page_num=0, y0=20.0),
+            Mock(text="c", font_size=18.0, is_bold=True, page_num=0, y0=30.0),
+            Mock(text="d", font_size=10.0, is_bold=False, page_num=2, y0=40.0),
+        ]
+        columns = TextBlockColumns.from_blocks(blocks)
+
+        best = columns.largest_per_page(np.arange(len(blocks)))
+        assert best == {0: 1, 2: 3}
+
 
 class TestImageProcessor:
     """Test Image Processor functionality"""
@@ -82,6 +183,55 @@ class TestImageProcessor:
         result = self.processor.process_images([], [], "standard")
         assert len(result) == 0
 
+    def test_process_images_without_pool_when_submit_fails(self):
+        """Test images are processed serially when the caller's pool is unusable"""
+        images = []
+        for shade in range(4):
+            buffer = io.BytesIO()
+            Image.new("RGB", (32, 32), (shade * 60, 0, 0)).save(buffer, format="PNG")
+            images.append(ImageInfo(0, 0, 0, 32, 32, 32, 32, "png", buffer.getvalue(), True))
+        executor = Mock()
+        executor.submit.side_effect = RuntimeError("cannot schedule new futures after shutdown")
+
+        with patch('services.conversion.image_processor.os.cpu_count', return_value=4):
+            result = self.processor.process_images(images, [], "standard", executor=executor)
+
+        executor.submit.assert_called_once()
+        assert [image.image_id for image in result] == ["img_0001", "img_0002", "img_0003", "img_0004"]
+
+    def test_repeated_images_processed_once(self):
+        """Test repeats of an image share one processed result and one image id"""
+        images = []
+        for shade in (0, 120, 0, 0):
+            buffer = io.BytesIO()
+            Image.new("RGB", (32, 32), (shade, 0, 0)).save(buffer, format="PNG")
+            images.append(ImageInfo(len(images), 0, 0, 32, 32, 32, 32, "png", buffer.getvalue(), True))
+
+        with patch.object(self.processor, '_process_single_image',
+                          wraps=self.processor._process_single_image) as process:
+            result = self.processor.process_images(images, [], "standard")
+
+        assert process.call_count == 2
+        assert [image.image_id for image in result] == ["img_0001", "img_0002", "img_0001", "img_0001"]
+        assert [image.position_info['page_num'] for image in result] == [0, 1, 2, 3]
+
+    def test_empty_alt_text_is_not_cached(self):
+        """Test an empty AI description is retried on the next run instead of cached"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            ai_service = Mock(spec=['analyze_image'])
+            ai_service.analyze_image.side_effect = ["  ", "A red square"]
+            processor = ImageProcessor(ai_service, cache=ConversionCache(Path(temp_dir), enabled=True))
+            image = Mock(processed_data=b"image bytes", ai_thumbnail_bytes=b"thumbnail",
+                         associated_text=None, image_id="img_0001")
+
+            processor.generate_alt_text([image])
+            assert image.alt_text is None
+            processor.generate_alt_text([image])
+            assert image.alt_text == "A red square"
+            processor.generate_alt_text([image])
+
+        assert ai_service.analyze_image.call_count == 2
+
     def test_get_image_statistics(self):
         """Test image statistics"""
         stats = self.processor.get_image_statistics()
@@ -107,6 +257,32 @@ class TestEpubGenerator:
         assert 'font-family' in css
         assert 'line-height' in css
 
+    def test_generated_epub_stores_images_and_round_trips(self):
+        """Test images are stored uncompressed, XHTML is deflated, and chapters read back intact"""
+        buffer = io.BytesIO()
+        Image.new("RGB", (32, 32), (200, 0, 0)).save(buffer, format="PNG")
+        chapters = [
+            EpubChapter(f"chapter_{i:03d}", f"Chapter {i}", f"Body text of chapter {i} & more. " * 40,
+                        f"chapter_{i:03d}.xhtml", 1, i, [])
+            for i in (1, 2)
+        ]
+        created = datetime(2024, 1, 1)
+        metadata = EpubMetadata("Title", "Author", "en", "urn:uuid:test", "Publisher", "", created, created, [], {})
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_path = Path(temp_dir) / "book.epub"
+            assert self.generator.generate_epub(output_path, chapters, metadata, {"img_0001": buffer.getvalue()})
+
+            with zipfile.ZipFile(output_path) as archive:
+                compress_types = {info.filename: info.compress_type for info in archive.infolist()}
+            assert compress_types["EPUB/images/img_0001.png"] == zipfile.ZIP_STORED
+            assert compress_types["EPUB/chapter_001.xhtml"] == zipfile.ZIP_DEFLATED
+
+            book = epub.read_epub(str(output_path))
+            for chapter in chapters:
+                content = book.get_item_with_href(chapter.file_name).get_content().decode("utf-8")
+                assert f"Body text of chapter {chapter.page_num} &amp; more." in content
+
 
 class TestCalibreFallback:
     """Test Calibre Fallback functionality"""
@@ -142,6 +318,149 @@ class TestConversionPipeline:
         assert 'pipeline_stages' in stats
         assert len(stats['pipeline_stages']) == 5
 
+    def test_owner_password_only_pdf_is_suitable(self):
+        """Test a PDF encrypted with only an owner password stays on the custom pipeline"""
+        doc = fitz.open()
+        doc.new_page().insert_text((72, 72), "Chapter 1")
+        owner_only = doc.tobytes(encryption=fitz.PDF_ENCRYPT_AES_256, owner_pw="owner")
+        locked = doc.tobytes(encryption=fitz.PDF_ENCRYPT_AES_256, owner_pw="owner", user_pw="user")
+        doc.close()
+
+        assert self.pipeline.pdf_parser.peek_header(owner_only)['has_encrypt_marker']
+        assert self.pipeline._is_custom_pipeline_suitable(owner_only)
+        assert not self.pipeline._is_custom_pipeline_suitable(locked)
+
+    def test_extraction_returns_when_ocr_submit_fails(self):
+        """Test a failing OCR submit ends the run instead of hanging it"""
+        chunks = [
+            Mock(page_range=(start, start + 7), metadata=Mock(has_bookmarks=False),
+                 total_text_len=0, block_count=0, images=[], shared_images=None)
+            for start in range(0, 48, 8)
+        ]
+        parsed = iter(chunks)
+        run_inline = self.pipeline._submit
+        results = []
+        with patch.object(self.pipeline.pdf_parser, 'get_page_count', return_value=48), \
+             patch.object(self.pipeline, '_get_page_ranges', return_value=[c.page_range for c in chunks]), \
+             patch.object(self.pipeline, '_get_page_hashes', return_value=[]), \
+             patch.object(self.pipeline, '_submit_page_ocr', side_effect=RuntimeError("pool is gone")), \
+             patch.object(self.pipeline, '_submit',
+                          side_effect=lambda executor, worker, *args: run_inline(None, lambda *_: next(parsed))), \
+             patch('services.conversion.conversion_pipeline.progress_tracker'):
+            worker = threading.Thread(target=lambda: results.append(
+                self.pipeline._run_extraction_stages(Path("book.pdf"), b"", "standard", "task", "hash")
+            ), daemon=True)
+            worker.start()
+            worker.join(timeout=10)
+
+        assert not worker.is_alive()
+        assert results[0] == (None, [], "", [], [])
+
+    def test_ocr_deferred_while_fast_path_holds(self):
+        """Test OCR is held back for ranges parsed while the document qualifies for the fast path"""
+        from services.conversion.conversion_pipeline import _OCR_DEFERRED
+
+        digital = Mock(has_bookmarks=True, scan_probability=0.1)
+        scanned = Mock(has_bookmarks=True, scan_probability=0.9)
+        chunks = [
+            Mock(page_range=(0, 7), metadata=digital, total_text_len=0, block_count=0),
+            Mock(page_range=(8, 15), metadata=scanned, total_text_len=0, block_count=0),
+            Mock(page_range=(16, 23), metadata=digital, total_text_len=0, block_count=0),
+        ]
+        parse_queue, ocr_queue = queue.Queue(), queue.Queue()
+        for chunk in chunks + [None]:
+            parse_queue.put(chunk)
+
+        with patch.object(self.pipeline, '_get_page_hashes', return_value=[]), \
+             patch.object(self.pipeline, '_submit_page_ocr', return_value="job"):
+            self.pipeline._stage_2_ocr_dispatch(b"", None, parse_queue, ocr_queue)
+
+        jobs = [ocr_queue.get()[1] for _ in chunks]
+        assert jobs == [_OCR_DEFERRED, "job", "job"]
+        assert ocr_queue.get() is None
+
+    def test_deferred_ocr_runs_when_fast_path_fails(self):
+        """Test ranges spared OCR for the fast path get it once the fast path fails"""
+        chunks = [
+            Mock(page_range=(0, 7), total_text_len=0, block_count=0, text_blocks=[]),
+            Mock(page_range=(8, 15), total_text_len=0, block_count=0, text_blocks=[]),
+        ]
+        ocr_jobs = iter([({0: "第一章 scanned"}, [], {}), ({8: "第二章 scanned"}, [], {})])
+
+        with patch.object(self.pipeline, '_get_page_hashes', return_value=[]), \
+             patch.object(self.pipeline, '_submit_page_ocr',
+                          side_effect=lambda *args: next(ocr_jobs)) as submit_ocr:
+            text = self.pipeline._run_deferred_ocr(Path("book.pdf"), b"", chunks, "")
+
+        assert submit_ocr.call_count == 2
+        assert text == "第一章 scanned 第二章 scanned"
+
+    def test_submit_replaces_broken_pool(self):
+        """Test a pool broken by a crashed worker is replaced on the next submit"""
+        self.pipeline.close()
+        broken = Mock()
+        broken.submit.side_effect = BrokenProcessPool("worker died")
+        fresh = Mock()
+        self.pipeline.executor = broken
+
+        with patch('services.conversion.conversion_pipeline._create_executor', return_value=fresh):
+            self.pipeline._submit(broken, len, "abc")
+            # A thread still holding the old pool does not replace the new one
+            self.pipeline._replace_broken_executor(broken)
+
+        assert self.pipeline.executor is fresh
+        broken.shutdown.assert_called_once()
+        fresh.submit.assert_called_once_with(len, "abc")
+
+    def test_executor_falls_back_to_spawn(self):
+        """Test the pool uses spawn where forkserver is unavailable"""
+        from services.conversion.conversion_pipeline import _create_executor
+
+        with patch('multiprocessing.get_all_start_methods', return_value=['spawn']):
+            executor = _create_executor()
+        try:
+            assert executor._mp_context.get_start_method() == "spawn"
+        finally:
+            executor.shutdown()
+
+
+class TestConversionCache:
+    """Test Conversion Cache functionality"""
+
+    def setup_method(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = ConversionCache(Path(self.temp_dir.name), enabled=True)
+
+    def teardown_method(self):
+        self.temp_dir.cleanup()
+
+    def test_text_round_trip(self):
+        """Test cached OCR text is returned on a later lookup"""
+        assert self.cache.load_text("abc.0-3") is None
+        self.cache.save_text("abc.0-3", "第一章 text")
+        assert self.cache.load_text("abc.0-3") == "第一章 text"
+
+    def test_prune_evicts_least_recently_used(self):
+        """Test entries are evicted oldest-use first once the size limit is exceeded"""
+        for age, key in enumerate(("c", "a", "b")):
+            self.cache.save_object(key, b"x" * 400 * 1024)
+            path = self.cache._path(f"{key}.pkl")
+            os.utime(path, (path.stat().st_mtime - 100 * (age + 1),) * 2)
+        self.cache.load_object("b")
+
+        # A cache opened with a smaller limit prunes the shared directory
+        ConversionCache(Path(self.temp_dir.name), enabled=True, max_size_mb=1)
+        assert self.cache.load_object("a") is None
+        assert self.cache.load_object("b") is not None
+        assert self.cache.load_object("c") is not None
+
+    def test_failed_write_leaves_no_temp_file(self):
+        """Test a failed write removes its temporary file"""
+        with patch('services.conversion.conversion_cache.os.replace', side_effect=OSError("disk full")):
+            self.cache.save_text("abc.0-3", "text")
+        assert list(Path(self.temp_dir.name).iterdir()) == []
+        assert self.cache.load_text("abc.0-3") is None
+
 
 # Integration tests
 class TestEnhancedConversionIntegration: